@@ -1,28 +1,20 @@
-from typing import Callable
+import atexit
 import argparse
 import logging
+import signal
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
-from . import common
-from . import convert_0_9_x
-from . import convert_0_10_0
-from . import convert_0_10_1
-from . import convert_0_10_2
-
-VERSIONS = [
-    "0.9.x",
-    "0.10.0",
-    "0.10.1",
-    "0.10.2",
-    "0.11.0",
-]
-
-CONVERTERS = {
-    "0.9.x":  convert_0_9_x.convert,
-    "0.10.0": convert_0_10_0.convert,
-    "0.10.1": convert_0_10_1.convert,
-    "0.10.2": convert_0_10_2.convert,
-}
+from . import convert_0_9_x, watch, server, estimate, verify, integrity, mirror, lock, status, sizing, trace, common, throttle
+from .catalog import Catalog
+from .output_cache import OutputCache
+from .chain import convert_chain, run_chain
+from .chain import CONVERTERS, chain_versions, convert_container_chain
+from .failures import CONTAINER, DEFAULT_RETRY_FILE, PROJECT, Failures, load_retry
+from .rids import Rids, parse_timestamp
+from .context import ConversionContext
+from .memory import MemoryBudget, parse_size
+from .tuning import AutoTuner
 
 def setup_logging(verbose: bool):
     """Setup logging.
@@ -35,35 +27,6 @@ def setup_logging(verbose: bool):
         logger = logging.getLogger()
         logger.setLevel(logging.INFO)
 
-def convert_chain(initial: str, final: str) -> list[Callable]:
-    """Creates a chain of converters
-
-    Args:
-        initial (str): Initial version.
-        final (str): Final version.
-        
-    Returns:
-        list[Callable]: List of callables to convert from initial to final version.
-    """
-    try:
-        initial_idx = VERSIONS.index(initial)
-    except ValueError:
-        raise ValueError("Invalid initial verison")
-    
-    try:
-        final_idx = VERSIONS.index(final)
-    except ValueError:
-        raise ValueError("Invalid final version")
-    
-    if initial == "0.9.x":
-        # handle exceptional case of `0.9.x` translating directly to `0.11.0`.
-        idx_11 = VERSIONS.index("0.11.0")
-        converters_11 = [CONVERTERS[version] for version in VERSIONS[idx_11:final_idx]]
-        return [CONVERTERS["0.9.x"]] + converters_11
-    else:
-        return [CONVERTERS[version] for version in VERSIONS[initial_idx:final_idx]]
-    
-
 parser = argparse.ArgumentParser(
     prog="Syre version converter",
     description="Converts Syre projects between version.",
@@ -73,20 +36,329 @@ parser.add_argument("initial", help="Current version. (x.y.z)")
 parser.add_argument("final", help="Final version. (x.y.z)")
 parser.add_argument("--project", "-p", help="Only convert the project at the given path.")
 parser.add_argument("--verbose", "-v", action="store_true", help="Output more info.")
+parser.add_argument(
+    "--config-dir",
+    help="Syre local config dir. Defaults to the dir of the current system.",
+)
+parser.add_argument(
+    "--jobs",
+    "-j",
+    default="1",
+    help="Number of containers to convert in parallel, "
+    "or `auto` to tune it to the observed throughput.",
+)
+parser.add_argument(
+    "--max-memory",
+    help="Memory budget, e.g. `512M` or `2G`. "
+    "Queues, workers, and large files are adapted to stay under it.",
+)
+parser.add_argument(
+    "--trace-allocations",
+    action="store_true",
+    help="Measure memory use for `--max-memory` with `tracemalloc` on systems "
+    "without `/proc/self/statm`, e.g. macOS and Windows. Slows the conversion down.",
+)
+parser.add_argument(
+    "--lock-timeout",
+    type=float,
+    default=lock.DEFAULT_TIMEOUT,
+    help="Seconds to wait for a project or container locked by another converter. "
+    "Negative waits indefinitely.",
+)
+parser.add_argument(
+    "--container-locks",
+    action="store_true",
+    help="Also lock each container while converting it.",
+)
+parser.add_argument(
+    "--output",
+    "-o",
+    help="Write converted projects into this folder instead of converting them in place. "
+    "Data files are hardlinked into the converted project.",
+)
+parser.add_argument(
+    "--verify",
+    action="store_true",
+    help="Verify projects against the schema of `final` instead of converting them.",
+)
+parser.add_argument(
+    "--check-references",
+    action="store_true",
+    help="Check projects for dangling and duplicate rids instead of converting them.",
+)
+parser.add_argument(
+    "--estimate",
+    action="store_true",
+    help="Estimate the duration, files touched, and bytes written of the conversion "
+    "from a sample of containers instead of converting.",
+)
+parser.add_argument(
+    "--samples",
+    type=int,
+    default=estimate.DEFAULT_WALKS,
+    help=f"Random walks through the containers of each project with `--estimate`. "
+    f"Defaults to {estimate.DEFAULT_WALKS}.",
+)
+parser.add_argument(
+    "--seed",
+    type=int,
+    help="Seed of the sample taken with `--estimate`.",
+)
+parser.add_argument(
+    "--serve",
+    help="Serve conversion, plan, status, and verify jobs on the given Unix socket "
+    "instead of converting. Jobs convert to `final` unless they give a version.",
+)
+parser.add_argument(
+    "--watch",
+    action="store_true",
+    help="Keep running, converting projects from `initial` or newer as they are registered or modified.",
+)
+parser.add_argument(
+    "--interval", type=float, default=5.0, help="Polling interval of `--watch` in seconds."
+)
+parser.add_argument(
+    "--catalog",
+    help="SQLite catalog of project trees, created if it does not exist. "
+    "Containers are looked up in the catalog instead of walking each project.",
+)
+parser.add_argument(
+    "--output-cache",
+    help="Directory of a cache of converted container files, created if it does not exist. "
+    "Containers with the same files as one converted before are not converted again.",
+)
+parser.add_argument(
+    "--output-cache-size",
+    default="1G",
+    help="Size the output cache is kept under, least recently used entries are evicted first. "
+    "Defaults to `1G`.",
+)
+parser.add_argument(
+    "--io-ops",
+    type=float,
+    help="Maximum filesystem operations per second, e.g. opens, renames, and directory listings.",
+)
+parser.add_argument(
+    "--io-bytes",
+    help="Maximum bytes read and written per second, e.g. `10M`.",
+)
+parser.add_argument(
+    "--io-control",
+    help="JSON file with `ops_per_second` and `bytes_per_second` limits, "
+    "re-read when it is modified or on `SIGHUP`.",
+)
+parser.add_argument(
+    "--keep-going",
+    action="store_true",
+    help="Keep converting other containers and projects when one fails. "
+    "Failed units are written to `--retry-file`.",
+)
+parser.add_argument(
+    "--retry-file",
+    default=DEFAULT_RETRY_FILE,
+    help=f"File failed units are written to with `--keep-going`. Defaults to `{DEFAULT_RETRY_FILE}`.",
+)
+parser.add_argument(
+    "--retry-from",
+    help="Only convert the units that failed in a previous run, as listed in its retry file.",
+)
+parser.add_argument(
+    "--deterministic",
+    action="store_true",
+    help="Derive the rids of new resources from their project and path, "
+    "and give them all the same creation time, so converting the same projects gives identical output.",
+)
+parser.add_argument(
+    "--timestamp",
+    type=parse_timestamp,
+    help="Creation time of new resources with `--deterministic`, e.g. `2024-01-01T00:00:00Z`. "
+    "Defaults to `SOURCE_DATE_EPOCH` if set, otherwise the time the run started.",
+)
+parser.add_argument(
+    "--trace",
+    help="Write a timeline of the run to the given file in the Chrome trace event format.",
+)
+parser.add_argument(
+    "--status",
+    action="store_true",
+    help="Print the format version, containers, and assets of projects instead of converting them.",
+)
+
+
+def main():
+    """Runs the command line interface."""
+    args = parser.parse_args()
+    if args.samples < 1:
+        parser.error(f"argument --samples: must be at least 1, got {args.samples}")
+
+    setup_logging(args.verbose)
+    if args.trace is not None:
+        trace.enable()
+        atexit.register(trace.write, args.trace)
+    if args.io_ops is not None or args.io_bytes is not None or args.io_control is not None:
+        throttle.enable(
+            ops_per_second=args.io_ops,
+            bytes_per_second=None if args.io_bytes is None else parse_size(args.io_bytes),
+            control=args.io_control,
+        )
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: throttle.reload())
+    logger = logging.getLogger(__name__)
+    memory = (
+        None
+        if args.max_memory is None
+        else MemoryBudget(parse_size(args.max_memory), trace_allocations=args.trace_allocations)
+    )
+    tuner = AutoTuner() if args.jobs == "auto" else None
+    ctx = ConversionContext(
+        config_dir=args.config_dir,
+        jobs=int(args.jobs) if tuner is None else tuner.max_workers,
+        memory=memory,
+        lock_timeout=None if args.lock_timeout < 0 else args.lock_timeout,
+        container_locks=args.container_locks,
+        catalog=None if args.catalog is None else Catalog(args.catalog),
+        tuner=tuner,
+        failures=Failures() if args.keep_going else None,
+        rids=Rids(deterministic=args.deterministic, timestamp=args.timestamp),
+        output_cache=(
+            None
+            if args.output_cache is None
+            else OutputCache(args.output_cache, parse_size(args.output_cache_size))
+        ),
+    )
+
+    runs = run_chain(args.initial, args.final)
+    if args.status:
+        projects = ctx.projects if args.project is None else [args.project]
+        status.print_status(projects, ctx)
+    elif args.verify:
+        projects = ctx.projects if args.project is None else [args.project]
+        report = verify.verify(projects, args.final, ctx)
+        if not verify.print_report(report):
+            sys.exit(1)
+    elif args.check_references:
+        projects = ctx.projects if args.project is None else [args.project]
+        report = integrity.check(projects, ctx)
+        if not verify.print_report(report):
+            sys.exit(1)
+    elif args.estimate:
+        projects = ctx.projects if args.project is None else [args.project]
+        estimates = estimate.estimate(projects, args.final, ctx, walks=args.samples, seed=args.seed)
+        estimate.print_estimates(estimates)
+    elif args.serve is not None:
+        server.serve(args.serve, ctx, args.final)
+    elif args.watch:
+        watch.watch(args.initial, args.final, project=args.project, interval=args.interval, ctx=ctx)
+    else:
+        if args.retry_from is None and len(convert_chain(args.initial, args.final)) == 0:
+            raise ValueError("No conversion to perform.")
+
+        def convert_project(project: str, initial: str = args.initial):
+            logger.info(f"[{project}]")
+            version = initial
+            try:
+                with trace.span("project", "project", path=project):
+                    if args.output is not None:
+                        with trace.span("mirror", "project", path=project):
+                            project = mirror.mirror_project(
+                                project, mirror.destination_of(project, args.output)
+                            )
+
+                    with lock.Lock(project, timeout=ctx.lock_timeout, system=ctx.system):
+                        for version in chain_versions(initial, args.final):
+                            convert = CONVERTERS[version]
+                            stage = convert.__module__.rsplit(".", 1)[-1]
+                            with trace.span(stage, "stage", path=project):
+                                if memory is None:
+                                    convert(project, ctx)
+                                else:
+                                    with memory.stage(stage):
+                                        convert(project, ctx)
+            except Exception as err:
+                if ctx.failures is None:
+                    raise
+
+                ctx.failures.record(PROJECT, project, version, err)
+
+        def retry_unit(unit: dict):
+            if unit["unit"] == PROJECT:
+                initial = common.project_format_version(unit["path"]) or unit["version"]
+                convert_project(unit["path"], initial)
+                return
+
+            logger.info(f"[{unit['path']}]")
+            try:
+                convert_container_chain(unit["path"], unit["version"], args.final, ctx)
+            except Exception as err:
+                if ctx.failures is None:
+                    raise
+
+                ctx.failures.record(CONTAINER, unit["path"], unit["version"], err)
+
+        if args.retry_from is None:
+            projects = ctx.projects if args.project is None else [args.project]
+            units = None
+        else:
+            (final, units) = load_retry(args.retry_from)
+            if final != args.final:
+                raise ValueError(f"retry file converts to `{final}`, not `{args.final}`")
+
+            projects = [unit["path"] for unit in units if unit["unit"] == PROJECT]
+
+        if args.output is not None:
+            mirror.check_destinations(projects, args.output)
+
+        for stage in runs:
+            name = f"{stage.__module__.rsplit('.', 1)[-1]}.{stage.__name__}"
+            logger.info(f"[run] {name}")
+            with trace.span(name, "stage"):
+                ctx.run_once(stage)
+
+        # NOTE: Projects share the context's slots, so containers in flight across all of them
+        # stay within `--jobs`. With a tuner, only as many are started as it allows at first.
+        project_jobs = ctx.jobs if tuner is None else tuner.limit
+        try:
+            if units is not None:
+                for unit in units:
+                    retry_unit(unit)
+            elif project_jobs <= 1 or len(projects) <= 1:
+                for project in projects:
+                    convert_project(project)
+            else:
+                # NOTE: Projects are started largest first so a large project
+                # started last does not determine the total run time.
+                projects = sizing.largest_first(projects, ctx)
+                with ThreadPoolExecutor(max_workers=min(project_jobs, len(projects))) as executor:
+                    futures = [executor.submit(convert_project, project) for project in projects]
+                    try:
+                        for future in futures:
+                            future.result()
+                    except BaseException:
+                        executor.shutdown(cancel_futures=True)
+                        raise
+        finally:
+            lock.release_all()
+            if ctx.failures is not None:
+                ctx.failures.write(args.retry_file, args.final)
+
+        if memory is not None:
+            memory.log_peaks()
+        lock.METRICS.log()
+        convert_0_9_x.METADATA_CACHE.log()
+        if tuner is not None:
+            tuner.print_summary()
+
+    if ctx.output_cache is not None:
+        ctx.output_cache.log()
+    if ctx.catalog is not None:
+        ctx.catalog.log()
+        ctx.catalog.close()
+
+    if ctx.failures is not None and ctx.failures.units:
+        logger.error(f"{len(ctx.failures.units)} units failed, see `{args.retry_file}`")
+        sys.exit(1)
+
 
-args = parser.parse_args()
-setup_logging(args.verbose)
-logger = logging.getLogger(__name__)
-
-convert_chain = convert_chain(args.initial, args.final)
-if len(convert_chain) == 0:
-    raise ValueError("No conversion to perform.")
-
-if args.project is None:
-    for project in common.project_paths():
-        logger.info(f"[{project}]")
-        for convert in convert_chain:
-            convert(project)
-else:
-    for convert in convert_chain:
-        convert(args.project)
+# NOTE: Guarded so processes started by `verify` do not run the command line interface again.
+if __name__ == "__main__":
+    main()
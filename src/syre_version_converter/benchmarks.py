@@ -0,0 +1,68 @@
+"""
+Memory benchmarks of the in-memory model.
+
+Run `python -m syre_version_converter.benchmarks [count]`.
+"""
+import sys
+import datetime as dt
+import tracemalloc
+from uuid import uuid4 as uuid
+from typing import Any, Callable
+
+from .model import Asset
+
+
+def measure(build: Callable[[int], list[Any]], count: int) -> int:
+    """
+    Args:
+        build (Callable[[int], list[Any]]): Builds a list of assets.
+        count (int): Number of assets to build.
+
+    Returns:
+        int: Bytes allocated for the assets.
+    """
+    tracemalloc.start()
+    try:
+        (before, _) = tracemalloc.get_traced_memory()
+        assets = build(count)
+        (after, _) = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del assets
+    return after - before
+
+
+def _sample_assets(count: int, compact: bool) -> list[Any]:
+    created = dt.datetime.now().isoformat(timespec="seconds") + "Z"
+    creator = ("Script", str(uuid()))
+    assets = []
+    for idx in range(count):
+        asset = Asset(
+            rid=str(uuid()),
+            path=f"file_{idx}.csv",
+            created=created,
+            creator=creator,
+            name=f"asset {idx}",
+        )
+        assets.append(asset if compact else asset.to_json())
+
+    return assets
+
+
+def benchmark(count: int = 100_000):
+    """Prints the memory used by assets held as plain dicts and in the compact model.
+
+    Args:
+        count (int, optional): Number of assets. Defaults to 100_000.
+    """
+    as_dicts = measure(lambda n: _sample_assets(n, compact=False), count)
+    as_model = measure(lambda n: _sample_assets(n, compact=True), count)
+    print(f"{count} assets")
+    print(f"    dict:    {as_dicts / 1024**2:8.1f} MiB, {as_dicts / count:6.0f} B/asset")
+    print(f"    compact: {as_model / 1024**2:8.1f} MiB, {as_model / count:6.0f} B/asset")
+    print(f"    saved:   {1 - as_model / as_dicts:8.1%}")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
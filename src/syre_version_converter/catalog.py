@@ -0,0 +1,401 @@
+"""
+Persistent catalog of project trees.
+
+Records every directory walked, the files in its `.syre` and `.thot` folders,
+and the assets of each container in a SQLite database,
+so later stages and runs look up containers instead of listing directories.
+
+A directory is only listed again if its modification time changed,
+so entries are kept up to date incrementally.
+Modification times too close to the time of a scan are not trusted,
+as further changes within the file system's timestamp resolution would go unnoticed.
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Iterator, Optional
+
+from . import common, throttle
+
+logger = logging.getLogger(__name__)
+
+METADATA_FOLDERS = (".syre", ".thot")
+
+# Modification times within this many nanoseconds of a scan are not trusted.
+RACY_NS = 2 * 10**9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    parent TEXT,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE TABLE IF NOT EXISTS files (
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    PRIMARY KEY (dir, name)
+);
+CREATE TABLE IF NOT EXISTS assets (
+    dir TEXT NOT NULL,
+    rid TEXT,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS assets_dir ON assets (dir);
+CREATE TABLE IF NOT EXISTS assets_files (
+    dir TEXT PRIMARY KEY,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+"""
+
+# Number of directories refreshed between commits.
+COMMIT_INTERVAL = 1000
+
+
+class Catalog:
+    """SQLite catalog of directories, metadata files, and assets.
+    Safe to share between threads.
+    """
+
+    def __init__(self, db_path: str):
+        """
+        Args:
+            db_path (str): Path to the database file. Created if it does not exist.
+        """
+        self.db_path = db_path
+        self.scanned = 0
+        self.reused = 0
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.execute("PRAGMA synchronous = NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        """Commits pending changes and closes the database."""
+        with self._lock:
+            self._db.commit()
+            self._db.close()
+
+    def find_files(self, root: str, relative_path: str) -> Iterator[str]:
+        """Finds a relative path in the root and all of its descendant directories.
+        Equivalent to `common.find_files`, but uses the catalog to avoid listing
+        directories that have not changed.
+
+        Args:
+            root (str): Directory to search.
+            relative_path (str): Path relative to each directory to search for.
+
+        Yields:
+            str: Paths to the matches.
+        """
+        stack = [root]
+        refreshed = 0
+        try:
+            while stack:
+                path = stack.pop()
+                with self._lock:
+                    children = self._refresh_dir(path)
+                    if children is None:
+                        continue
+
+                    found = self._has(path, relative_path)
+                    refreshed += 1
+                    if refreshed % COMMIT_INTERVAL == 0:
+                        self._db.commit()
+
+                if found:
+                    yield os.path.join(path, relative_path)
+
+                stack.extend(os.path.join(path, child) for child in reversed(children))
+        finally:
+            with self._lock:
+                self._db.commit()
+
+    def touch_dir(self, path: str):
+        """Records a change to a directory made by the converter,
+        so it is not listed again.
+        Only valid if no entries other than metadata folders were added or removed.
+
+        Args:
+            path (str): Directory that changed.
+        """
+        key = os.path.abspath(path)
+        with self._lock:
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except OSError:
+                self._forget(key)
+                return
+
+            self._db.execute(
+                "UPDATE dirs SET mtime_ns = ? WHERE path = ?",
+                (None if _is_racy(mtime_ns) else mtime_ns, key),
+            )
+            self._refresh_metadata(key, path)
+            self._db.commit()
+
+    def assets(self, container: str, metadata_folder: str = ".syre") -> list[tuple[str, str]]:
+        """Assets of a container.
+        The assets file is only read if it changed since it was last cataloged.
+
+        Args:
+            container (str): Path to the container.
+            metadata_folder (str, optional): Name of the container's metadata folder.
+                Defaults to ".syre".
+
+        Returns:
+            list[tuple[str, str]]: Resource id and path of each asset.
+        """
+        key = os.path.abspath(container)
+        assets_path = os.path.join(container, metadata_folder, "assets.json")
+        try:
+            stat = os.stat(assets_path)
+        except OSError:
+            return []
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT size, mtime_ns FROM assets_files WHERE dir = ?", (key,)
+            ).fetchone()
+            if row == (stat.st_size, stat.st_mtime_ns):
+                return self._db.execute(
+                    "SELECT rid, path FROM assets WHERE dir = ?", (key,)
+                ).fetchall()
+
+        assets = []
+        for (_, asset) in common.iter_json_items(assets_path):
+            if not isinstance(asset, dict):
+                continue
+
+            path = asset.get("path")
+            if isinstance(path, dict):
+                path = next(iter(path.values()), None)
+
+            assets.append((asset.get("rid"), path))
+
+        mtime_ns = None if _is_racy(stat.st_mtime_ns) else stat.st_mtime_ns
+        with self._lock:
+            self._db.execute("DELETE FROM assets WHERE dir = ?", (key,))
+            self._db.executemany(
+                "INSERT INTO assets (dir, rid, path) VALUES (?, ?, ?)",
+                [(key, rid, path) for (rid, path) in assets],
+            )
+            self._db.execute(
+                "INSERT OR REPLACE INTO assets_files (dir, size, mtime_ns) VALUES (?, ?, ?)",
+                (key, stat.st_size, mtime_ns),
+            )
+            self._db.commit()
+
+        return assets
+
+    def subtree_cost(self, root: str) -> Optional[tuple[int, int]]:
+        """Estimates the cost of converting a tree from the catalog.
+        Trees without cataloged containers, e.g. `0.9.x` projects,
+        count each directory as a container.
+
+        Args:
+            root (str): Root of the tree.
+
+        Returns:
+            Optional[tuple[int, int]]: Number of containers and bytes of metadata in the tree,
+                or `None` if the tree has not been cataloged.
+        """
+        key = os.path.abspath(root)
+        (start, end) = _descendants(key)
+        with self._lock:
+            if self._db.execute("SELECT 1 FROM dirs WHERE path = ?", (key,)).fetchone() is None:
+                return None
+
+            (containers, metadata_bytes) = self._db.execute(
+                "SELECT COUNT(DISTINCT dir), COALESCE(SUM(size), 0) FROM files "
+                "WHERE (dir = ? OR (dir >= ? AND dir < ?))",
+                (key, start, end),
+            ).fetchone()
+            if containers == 0:
+                (containers,) = self._db.execute(
+                    "SELECT COUNT(*) FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                    (key, start, end),
+                ).fetchone()
+
+        return (containers, metadata_bytes)
+
+    def log(self):
+        """Logs how many directories were listed and how many were reused from the catalog."""
+        logger.info(f"catalog: {self.scanned} directories listed, {self.reused} reused")
+
+    def _refresh_dir(self, path: str) -> Optional[list[str]]:
+        """Updates a directory's entry if it changed.
+
+        Args:
+            path (str): Directory to refresh.
+
+        Returns:
+            Optional[list[str]]: Names of the directory's non-hidden subdirectories,
+                or `None` if it does not exist.
+        """
+        key = os.path.abspath(path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            self._forget(key)
+            return None
+
+        row = self._db.execute("SELECT mtime_ns FROM dirs WHERE path = ?", (key,)).fetchone()
+        if row is not None and row[0] == mtime_ns:
+            self.reused += 1
+            self._refresh_metadata(key, path)
+            return [
+                os.path.basename(child)
+                for (child,) in self._db.execute(
+                    "SELECT path FROM dirs WHERE parent = ? ORDER BY rowid", (key,)
+                )
+            ]
+
+        self.scanned += 1
+        try:
+            with throttle.scandir(path) as entries:
+                children = [
+                    entry.name
+                    for entry in entries
+                    if not entry.name.startswith(".") and entry.is_dir()
+                ]
+        except OSError:
+            self._forget(key)
+            return None
+
+        known = {
+            child
+            for (child,) in self._db.execute("SELECT path FROM dirs WHERE parent = ?", (key,))
+        }
+        current = {os.path.join(key, child) for child in children}
+        for removed in known - current:
+            self._forget(removed)
+
+        self._db.executemany(
+            "INSERT OR IGNORE INTO dirs (path, parent, mtime_ns) VALUES (?, ?, NULL)",
+            [(os.path.join(key, child), key) for child in children],
+        )
+        self._db.execute(
+            "INSERT INTO dirs (path, parent, mtime_ns) VALUES (?, ?, ?) "
+            "ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns",
+            (key, os.path.dirname(key), None if _is_racy(mtime_ns) else mtime_ns),
+        )
+        self._refresh_metadata(key, path)
+        return children
+
+    def _refresh_metadata(self, key: str, path: str):
+        """Updates the files of a directory's metadata folders if they changed.
+
+        Args:
+            key (str): Catalog key of the directory.
+            path (str): Directory to refresh.
+        """
+        for folder in METADATA_FOLDERS:
+            folder_path = os.path.join(path, folder)
+            row = self._db.execute(
+                "SELECT mtime_ns FROM files WHERE dir = ? AND name = ?", (key, folder)
+            ).fetchone()
+            try:
+                mtime_ns = os.stat(folder_path).st_mtime_ns
+            except OSError:
+                if row is not None:
+                    self._db.execute(
+                        "DELETE FROM files WHERE dir = ? AND (name = ? OR name LIKE ?)",
+                        (key, folder, f"{folder}/%"),
+                    )
+                continue
+
+            if row is not None and row[0] == mtime_ns:
+                continue
+
+            files = []
+            try:
+                with throttle.scandir(folder_path) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            stat = entry.stat()
+                            files.append((f"{folder}/{entry.name}", stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                continue
+
+            self._db.execute(
+                "DELETE FROM files WHERE dir = ? AND (name = ? OR name LIKE ?)",
+                (key, folder, f"{folder}/%"),
+            )
+            self._db.executemany(
+                "INSERT INTO files (dir, name, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                [(key, name, size, mtime) for (name, size, mtime) in files],
+            )
+            self._db.execute(
+                "INSERT INTO files (dir, name, size, mtime_ns) VALUES (?, ?, 0, ?)",
+                (key, folder, None if _is_racy(mtime_ns) else mtime_ns),
+            )
+
+    def _has(self, path: str, relative_path: str) -> bool:
+        """
+        Args:
+            path (str): Directory.
+            relative_path (str): Path relative to the directory.
+
+        Returns:
+            bool: If the relative path exists in the directory.
+                Metadata files are looked up in the catalog, other paths on disk.
+        """
+        name = relative_path.replace(os.sep, "/")
+        if name.split("/", 1)[0] not in METADATA_FOLDERS:
+            return os.path.exists(os.path.join(path, relative_path))
+
+        row = self._db.execute(
+            "SELECT 1 FROM files WHERE dir = ? AND name = ?", (os.path.abspath(path), name)
+        ).fetchone()
+        return row is not None
+
+    def _forget(self, key: str):
+        """Removes a directory and its descendants from the catalog.
+
+        Args:
+            key (str): Catalog key of the directory.
+        """
+        (start, end) = _descendants(key)
+        for (table, column) in [
+            ("dirs", "path"),
+            ("files", "dir"),
+            ("assets", "dir"),
+            ("assets_files", "dir"),
+        ]:
+            self._db.execute(
+                f"DELETE FROM {table} WHERE {column} = ? OR ({column} >= ? AND {column} < ?)",
+                (key, start, end),
+            )
+
+
+def _descendants(key: str) -> tuple[str, str]:
+    """
+    Args:
+        key (str): Catalog key of a directory.
+
+    Returns:
+        tuple[str, str]: Range of the keys of the directory's descendants, end exclusive.
+    """
+    # NOTE: Descendants are matched by range rather than `LIKE`,
+    # as paths may contain its wildcards.
+    start = os.path.join(key, "")
+    end = start[:-1] + chr(ord(start[-1]) + 1)
+    return (start, end)
+
+
+def _is_racy(mtime_ns: int) -> bool:
+    """
+    Args:
+        mtime_ns (int): Modification time in nanoseconds.
+
+    Returns:
+        bool: If the modification time is too recent to be trusted.
+    """
+    return time.time_ns() - mtime_ns < RACY_NS
@@ -0,0 +1,133 @@
+"""
+Versions and the converters between them.
+"""
+from typing import Any, Callable
+
+from . import common, lock
+from . import convert_0_9_x
+from . import convert_0_10_0
+from . import convert_0_10_1
+from . import convert_0_10_2
+from .context import ConversionContext
+
+VERSIONS = [
+    "0.9.x",
+    "0.10.0",
+    "0.10.1",
+    "0.10.2",
+    "0.11.0",
+]
+
+CONVERTERS = {
+    "0.9.x":  convert_0_9_x.convert,
+    "0.10.0": convert_0_10_0.convert,
+    "0.10.1": convert_0_10_1.convert,
+    "0.10.2": convert_0_10_2.convert,
+}
+
+RUN_CONVERTERS = {
+    "0.10.2": convert_0_10_2.convert_config,
+}
+
+CONTAINER_CONVERTERS = {
+    "0.10.0": convert_0_10_0.convert_container,
+    "0.10.1": convert_0_10_1.convert_container,
+    "0.10.2": convert_0_10_2.convert_container,
+}
+
+
+def chain_versions(initial: str, final: str) -> list[str]:
+    """Versions converted from on the way from the initial to the final version.
+
+    Args:
+        initial (str): Initial version.
+        final (str): Final version.
+
+    Returns:
+        list[str]: Versions whose converters are run, in order.
+    """
+    try:
+        initial_idx = VERSIONS.index(initial)
+    except ValueError:
+        raise ValueError("Invalid initial verison")
+    
+    try:
+        final_idx = VERSIONS.index(final)
+    except ValueError:
+        raise ValueError("Invalid final version")
+    
+    if initial == "0.9.x":
+        # handle exceptional case of `0.9.x` translating directly to `0.11.0`.
+        idx_11 = VERSIONS.index("0.11.0")
+        return ["0.9.x"] + VERSIONS[idx_11:final_idx]
+    else:
+        return VERSIONS[initial_idx:final_idx]
+
+
+def convert_chain(initial: str, final: str) -> list[Callable]:
+    """Creates a chain of converters
+
+    Args:
+        initial (str): Initial version.
+        final (str): Final version.
+        
+    Returns:
+        list[Callable]: List of callables to convert from initial to final version.
+    """
+    return [CONVERTERS[version] for version in chain_versions(initial, final)]
+
+
+def convert_container_chain(
+    container: str, initial: str, final: str, ctx: ConversionContext
+):
+    """Converts a single container, e.g. one that failed during a project's conversion.
+    `0.9.x` containers are converted along with their descendants.
+    The container is locked while it is converted,
+    and its descendants are locked as they are converted if `ctx.container_locks` is set.
+
+    Args:
+        container (str): Path to the container.
+        initial (str): Version of the container.
+        final (str): Final version.
+        ctx (ConversionContext): Conversion context.
+
+    Raises:
+        ValueError: If the project of a `0.9.x` container can not be found.
+    """
+    if initial == "0.9.x":
+        # NOTE: Create `.syre` first so the lock does not create it unhidden.
+        convert_0_9_x.mkdir_syre(container, ctx)
+
+    with lock.Lock(container, timeout=ctx.lock_timeout, system=ctx.system):
+        for version in chain_versions(initial, final):
+            if version == "0.9.x":
+                project = common.project_of(container)
+                if project is None:
+                    raise ValueError(f"could not find the project of `{container}`")
+
+                # NOTE: The container is already locked, so is converted unlocked.
+                analysis_map = convert_0_9_x.get_analysis_map(project)
+                children = convert_0_9_x.convert_container_unlocked(container, analysis_map, ctx)
+                for child in children:
+                    convert_0_9_x.convert_container_recursive(child, analysis_map, ctx)
+            else:
+                CONTAINER_CONVERTERS[version](container)
+
+
+def run_chain(initial: str, final: str) -> list[Callable[[ConversionContext], Any]]:
+    """Creates the chain of run level stages.
+    These convert state shared by all projects, e.g. the config,
+    and are run once per run before any project is converted.
+
+    Args:
+        initial (str): Initial version.
+        final (str): Final version.
+
+    Returns:
+        list[Callable[[ConversionContext], Any]]: Run level stages, in order.
+    """
+    return [
+        RUN_CONVERTERS[version]
+        for version in chain_versions(initial, final)
+        if version in RUN_CONVERTERS
+    ]
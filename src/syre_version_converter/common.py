@@ -1,9 +1,20 @@
 import os
 import io
+import re
 import json
-from typing import Optional, Any
+import codecs
+import mmap
+import subprocess
+import textwrap
+from contextlib import contextmanager
+from typing import Optional, Any, Callable, Iterable, Iterator, Union
 
-from . import paths
+from . import paths, throttle, trace
+from .model import json_default
+
+
+def hide_dir(path: str):
+    subprocess.run(["attrib", "+H", path], check=True)
 
 
 def project_data_path(project_path: str) -> Optional[str]:
@@ -15,9 +26,7 @@ def project_data_path(project_path: str) -> Optional[str]:
     Returns:
         Optional[str]: Relative path to the project's data root.
     """
-    with open(paths.project_properties_of(project_path), "r") as f:
-        project = json.load(f)
-
+    project = load_json(paths.project_properties_of(project_path))
     data_root = project["data_root"]
     if not data_root:
         return None
@@ -25,28 +34,591 @@ def project_data_path(project_path: str) -> Optional[str]:
     return os.path.join(project_path, data_root)
 
 
-def project_paths() -> list[str]:
+def project_of(path: str) -> Optional[str]:
+    """Finds the project a path belongs to.
+
+    Args:
+        path (str): Path inside a project.
+
+    Returns:
+        Optional[str]: Path to the project's root, or `None` if the path is not in a project.
     """
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(paths.project_properties_of(path)):
+            return path
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+
+        path = parent
+
+
+def project_paths(manifest: Optional[str] = None) -> list[str]:
+    """
+    Args:
+        manifest (Optional[str], optional): Path to the project manifest.
+            Defaults to the manifest of the current system.
+
     Returns:
         list[str]: All registered project paths.
     """
-    with open(paths.config_project_manifest(), "r") as f:
-        projects = json.load(f)
+    if manifest is None:
+        manifest = paths.config_project_manifest()
+
+    return load_json(manifest)
+
+def project_format_version(project_path: str) -> Optional[str]:
+    """Detects the format version of a project from its files.
+
+    Args:
+        project_path (str): Path to the project's root.
+
+    Returns:
+        Optional[str]: Format version of the project, or `None` if it could not be determined.
+    """
+    if os.path.exists(os.path.join(project_path, ".thot")):
+        return "0.10.0"
+
+    syre_path = paths.syre_dir_of(project_path)
+    if not os.path.exists(syre_path):
+        return "0.9.x"
+
+    settings_path = paths.project_settings_of(project_path)
+    if os.path.exists(settings_path):
+        settings = load_json(settings_path)
+        if str(settings.get("local_format_version", "")).startswith("0.11."):
+            return "0.11.0"
+
+    properties_path = paths.project_properties_of(project_path)
+    if not os.path.exists(properties_path):
+        return "0.9.x"
+
+    if os.path.exists(os.path.join(syre_path, "scripts.json")):
+        return "0.10.1"
+
+    if "created" in load_json(properties_path):
+        return "0.10.2"
 
-    return projects
+    return None
 
-def current_user() -> Optional[str]:
+
+def current_user(local_settings: Optional[str] = None) -> Optional[str]:
     """
+    Args:
+        local_settings (Optional[str], optional): Path to the local config file.
+            Defaults to the local config of the current system.
+
     Returns:
         Optional[str]: Current user.
     """
-    with open(paths.config_local_settings(), "r") as f:
-        config = json.load(f)
-        return config["user"]
+    if local_settings is None:
+        local_settings = paths.config_local_settings()
+
+    config = load_json(local_settings)
+    return config["user"]
+
+@contextmanager
+def map_file(path: str) -> Iterator[Union[mmap.mmap, bytes]]:
+    """Memory-maps a file for reading.
+
+    Args:
+        path (str): Path to the file.
+
+    Yields:
+        Union[mmap.mmap, bytes]: Read-only view of the file's bytes.
+            Empty files can not be mapped, so yield `b""` instead.
+    """
+    with throttle.open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            yield b""
+            return
+
+        throttle.charge(ops=0, nbytes=size)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def load_json(path: str) -> Any:
+    """Loads a JSON file, parsing directly from its memory-mapped bytes.
+    Skips the text mode decoding layer of `open`.
+
+    Args:
+        path (str): Path to the JSON file.
+
+    Returns:
+        Any: Deserialized contents.
+    """
+    with trace.span("json.load", "json", path=path):
+        with map_file(path) as buf:
+            return parse_json(buf)
+
+
+def parse_json(buf: Union[mmap.mmap, bytes]) -> Any:
+    """Parses a JSON document from a buffer.
+    The buffer is decoded in place, without first being copied into `bytes`.
+
+    Args:
+        buf (Union[mmap.mmap, bytes]): The document's bytes.
+
+    Returns:
+        Any: Deserialized contents.
+    """
+    # NOTE: Decodes as `json.loads` does for `bytes`.
+    encoding = json.detect_encoding(buf[:4])
+    with memoryview(buf) as view:
+        return json.loads(codecs.decode(view, encoding, "surrogatepass"))
+
+
+def json_leading_byte(path: str) -> Optional[bytes]:
+    """
+    Args:
+        path (str): Path to a JSON file.
+
+    Returns:
+        Optional[bytes]: First non-whitespace byte of the file,
+            e.g. `b"["` for an array. `None` if the file is blank.
+    """
+    with map_file(path) as buf:
+        for idx in range(len(buf)):
+            byte = buf[idx : idx + 1]
+            if not byte.isspace():
+                return byte
+
+    return None
+
+
+# A JSON string token, including its quotes.
+JSON_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+
+def patch_json(
+    buf: Union[mmap.mmap, bytes],
+    pattern: re.Pattern,
+    depth: int,
+    replace: Callable[[re.Match], bytes],
+) -> Optional[tuple[bytes, int]]:
+    """Edits the bytes of a JSON document without parsing it.
+    Each match of the pattern is replaced, leaving the rest of the document as is.
+
+    + Each match must start outside of strings, at the given nesting depth,
+    e.g. `1` for the keys of the root object.
+    Otherwise the document is not patched.
+
+    Args:
+        buf (Union[mmap.mmap, bytes]): The document's bytes.
+        pattern (re.Pattern): Bytes pattern to replace.
+            Must start at a token and end outside of strings and at the depth it started.
+        depth (int): Nesting depth every match must start at.
+        replace (Callable[[re.Match], bytes]): Replacement of a match.
+
+    Returns:
+        Optional[tuple[bytes, int]]: Patched document and number of replacements,
+            or `None` if a match is not where it is expected.
+    """
+    parts = []
+    level = 0
+    pos = 0
+    for match in pattern.finditer(buf):
+        segment = buf[pos : match.start()]
+        structure = JSON_STRING.sub(b"", segment)
+        if b'"' in structure:
+            # NOTE: The match starts inside a string.
+            return None
+
+        level += structure.count(b"{") + structure.count(b"[")
+        level -= structure.count(b"}") + structure.count(b"]")
+        if level != depth:
+            return None
+
+        parts.append(segment)
+        parts.append(replace(match))
+        pos = match.end()
+
+    parts.append(buf[pos:])
+    return (b"".join(parts), (len(parts) - 1) // 2)
+
+
+def write_json(path: str, obj: Any):
+    """Write the JSON serialization of the object to a file, replacing its contents.
+
+    Args:
+        path (str): Path to the file.
+        obj (Any): Object to serialize.
+    """
+    with trace.span("json.dump", "json", path=path):
+        with throttle.open(path, "w") as f:
+            json.dump(obj, f, indent=4, default=json_default)
+
+
+def write_json_array(path: str, items: Iterable[Any]):
+    """Write items to a file as a JSON array, one at a time, replacing its contents.
+    The file is replaced once all items are written, so they may be read from it lazily.
+
+    Args:
+        path (str): Path to the file.
+        items (Iterable[Any]): Items of the array.
+    """
+    path_tmp = path + ".tmp"
+    try:
+        with trace.span("json.dump", "json", path=path):
+            with throttle.open(path_tmp, "w") as f:
+                writer = JsonArrayWriter(f)
+                for item in items:
+                    writer.write(item)
+
+                writer.close()
+    except BaseException:
+        try:
+            os.remove(path_tmp)
+        except FileNotFoundError:
+            pass
+
+        raise
+
+    throttle.replace(path_tmp, path)
+
+
+def write_document(path: str, document: Any):
+    """Write a document to a file, replacing its contents.
+
+    Args:
+        path (str): Path to the file.
+        document (Any): Object to serialize.
+            `bytes` are written as is, and iterators are written as a JSON array item by item.
+    """
+    if isinstance(document, bytes):
+        write_bytes(path, document)
+    elif isinstance(document, Iterator):
+        write_json_array(path, document)
+    else:
+        write_json(path, document)
+
+
+def write_bytes(path: str, data: bytes):
+    """Write bytes to a file, replacing its contents.
+
+    Args:
+        path (str): Path to the file.
+        data (bytes): Contents.
+    """
+    with trace.span("write", "json", path=path):
+        with throttle.open(path, "wb") as f:
+            f.write(data)
+
+
+def find_files(root: str, relative_path: str) -> Iterator[str]:
+    """Lazily finds a relative path in the root and all of its descendant directories.
+    Equivalent to `glob(os.path.join(root, "**", relative_path), recursive=True)`,
+    but yields matches as they are found.
+
+    + Hidden directories are not descended into.
+
+    Args:
+        root (str): Directory to search.
+        relative_path (str): Path relative to each directory to search for.
+
+    Yields:
+        str: Paths to the matches.
+    """
+    stack = [root]
+    while stack:
+        path = stack.pop()
+        match = os.path.join(path, relative_path)
+        if os.path.exists(match):
+            yield match
+
+        try:
+            entries = throttle.scandir(path)
+        except OSError:
+            continue
+
+        with entries:
+            children = [
+                entry.path
+                for entry in entries
+                if not entry.name.startswith(".") and entry.is_dir()
+            ]
+
+        stack.extend(reversed(children))
+
+
+STREAM_CHUNK_SIZE = 1024 * 1024
+_JSON_DECODER = json.JSONDecoder()
+
+
+def iter_json_items(
+    path: str,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    opener: Optional[Callable[[str, int], int]] = None,
+) -> Iterator[tuple[Optional[str], Any]]:
+    """Lazily parses the items of a top level JSON array or object,
+    holding at most a few items in memory at once.
+
+    Args:
+        path (str): Path to the JSON file.
+        chunk_size (int, optional): Number of characters to read at once.
+            Defaults to STREAM_CHUNK_SIZE.
+        opener (Optional[Callable[[str, int], int]], optional): Opener passed to `open`,
+            e.g. `Directory.opener`. Defaults to None.
+
+    Yields:
+        tuple[Optional[str], Any]: Key and value of each item. The key is `None` for arrays.
+
+    Raises:
+        ValueError: If the file is not a JSON array or object.
+    """
+    with throttle.open(path, "r", opener=opener) as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+
+            chunk = f.read(chunk_size)
+            if chunk == "":
+                eof = True
+                return False
+
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def decode() -> Any:
+            nonlocal pos
+            while True:
+                try:
+                    (value, end) = _JSON_DECODER.raw_decode(buf, pos)
+                    # NOTE: A value not followed by a delimiter may be truncated, e.g. a number.
+                    delimiter = end
+                    while delimiter < len(buf) and buf[delimiter].isspace():
+                        delimiter += 1
+                    if eof or (delimiter < len(buf) and buf[delimiter] in ",:]}"):
+                        pos = end
+                        return value
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+
+                fill()
+
+        def expect(chars: str) -> str:
+            nonlocal pos
+            skip_whitespace()
+            if pos >= len(buf) or buf[pos] not in chars:
+                found = buf[pos : pos + 1] or "end of file"
+                raise ValueError(f"[{path}] expected one of `{chars}`, found `{found}`")
+
+            pos += 1
+            return buf[pos - 1]
+
+        opening = expect("[{")
+        closing = "]" if opening == "[" else "}"
+        skip_whitespace()
+        if buf[pos : pos + 1] == closing:
+            return
+
+        while True:
+            key = None
+            skip_whitespace()
+            if opening == "{":
+                key = decode()
+                expect(":")
+
+            skip_whitespace()
+            yield (key, decode())
+            if expect("," + closing) == closing:
+                return
+
+
+class JsonArrayWriter:
+    """Writes a JSON array one item at a time.
+    The output is identical to `json.dump(items, f, indent=4)`.
+    """
+
+    def __init__(self, f: io.TextIOWrapper):
+        """
+        Args:
+            f (io.TextIOWrapper): File to write to.
+        """
+        self._f = f
+        self._count = 0
+
+    def write(self, item: Any):
+        """
+        Args:
+            item (Any): Item to append to the array.
+        """
+        prefix = "[\n" if self._count == 0 else ",\n"
+        self._f.write(
+            prefix + textwrap.indent(json.dumps(item, indent=4, default=json_default), "    ")
+        )
+        self._count += 1
+
+    def close(self):
+        """Terminates the array."""
+        self._f.write("\n]" if self._count > 0 else "[]")
+
 
 def json_overwrite(obj: Any, f: io.TextIOWrapper):
     """Overwrite a file's contents with the JSON serialization of the object.
     """
-    f.seek(0)
-    json.dump(obj, f, indent=4)
-    f.truncate()
\ No newline at end of file
+    with trace.span("json.dump", "json", path=f.name):
+        f.seek(0)
+        json.dump(obj, f, indent=4, default=json_default)
+        f.truncate()
+
+
+DIR_FD_SUPPORTED = (
+    hasattr(os, "O_DIRECTORY")
+    and {os.open, os.stat, os.mkdir, os.rename, os.unlink, os.rmdir} <= os.supports_dir_fd
+    and os.scandir in os.supports_fd
+)
+
+
+class Directory:
+    """A directory opened once, with file operations relative to it.
+
+    Relative operations are resolved from the directory's file descriptor,
+    so the path to the directory is only looked up when it is opened
+    and renames higher up the tree do not affect them.
+    Where `dir_fd` is not supported, e.g. on Windows, paths are joined instead.
+    """
+
+    def __init__(self, path: str, dir_fd: Optional[int] = None):
+        """
+        Args:
+            path (str): Path to the directory.
+                Relative to `dir_fd` if given, only used for messages otherwise.
+            dir_fd (Optional[int], optional): Descriptor of the directory `path` is relative to.
+                Defaults to None.
+        """
+        self.path = path
+        self.fd: Optional[int] = None
+        if DIR_FD_SUPPORTED:
+            self.fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY, dir_fd=dir_fd)
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self) -> "Directory":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def join(self, name: str) -> str:
+        """
+        Args:
+            name (str): Path relative to the directory.
+
+        Returns:
+            str: Path of the entry.
+        """
+        return os.path.join(self.path, name)
+
+    def opener(self, name: str, flags: int) -> int:
+        """Opener for `open`, resolving paths relative to the directory."""
+        if self.fd is None:
+            return os.open(self.join(name), flags, 0o666)
+
+        return os.open(name, flags, 0o666, dir_fd=self.fd)
+
+    def open(self, name: str, mode: str = "r") -> io.IOBase:
+        """Opens a file relative to the directory. See `open`."""
+        return throttle.open(name, mode, opener=self.opener)
+
+    def scandir(self) -> Iterator[os.DirEntry]:
+        """See `os.scandir`."""
+        return throttle.scandir(self.path if self.fd is None else self.fd)
+
+    def listdir(self) -> list[str]:
+        """See `os.listdir`."""
+        return throttle.listdir(self.path if self.fd is None else self.fd)
+
+    def stat(self, name: str) -> os.stat_result:
+        """See `os.stat`."""
+        if self.fd is None:
+            return os.stat(self.join(name))
+
+        return os.stat(name, dir_fd=self.fd)
+
+    def exists(self, name: str) -> bool:
+        """See `os.path.exists`."""
+        try:
+            self.stat(name)
+        except (OSError, ValueError):
+            return False
+
+        return True
+
+    def mkdir(self, name: str):
+        """See `os.mkdir`."""
+        if self.fd is None:
+            os.mkdir(self.join(name))
+        else:
+            os.mkdir(name, dir_fd=self.fd)
+
+    def rename(self, src: str, dst: str):
+        """See `os.rename`."""
+        if self.fd is None:
+            throttle.rename(self.join(src), self.join(dst))
+        else:
+            throttle.rename(src, dst, src_dir_fd=self.fd, dst_dir_fd=self.fd)
+
+    def replace(self, src: str, dst: str):
+        """See `os.replace`."""
+        if self.fd is None:
+            throttle.replace(self.join(src), self.join(dst))
+        else:
+            throttle.replace(src, dst, src_dir_fd=self.fd, dst_dir_fd=self.fd)
+
+    def remove(self, name: str):
+        """See `os.remove`."""
+        if self.fd is None:
+            os.remove(self.join(name))
+        else:
+            os.unlink(name, dir_fd=self.fd)
+
+    def rmdir(self, name: str):
+        """See `os.rmdir`."""
+        if self.fd is None:
+            os.rmdir(self.join(name))
+        else:
+            os.rmdir(name, dir_fd=self.fd)
+
+
+@contextmanager
+def open_dir(path: str, directory: Optional[Directory] = None) -> Iterator[Directory]:
+    """Opens a directory, unless it is already open.
+
+    Args:
+        path (str): Path to the directory.
+        directory (Optional[Directory], optional): The directory, if already open.
+            It is not closed on exit. Defaults to None.
+
+    Yields:
+        Directory: The open directory.
+    """
+    if directory is not None:
+        yield directory
+        return
+
+    with Directory(path) as directory:
+        yield directory
@@ -0,0 +1,162 @@
+"""
+Run-wide state shared by all converters.
+"""
+import threading
+from functools import cached_property
+from typing import Any, Callable, Iterator, Optional
+
+from . import paths, common, lock
+from .memory import MemoryBudget
+from .catalog import Catalog
+from .output_cache import OutputCache
+from .tuning import AutoTuner, Slots
+from .failures import Failures
+from .rids import Rids
+
+
+class ConversionContext:
+    """Resolves the system, config paths, and current user once per run.
+
+    Values are resolved lazily, so a run that never needs the config
+    does not require it to exist.
+    """
+
+    def __init__(
+        self,
+        config_dir: Optional[str] = None,
+        system: Optional[str] = None,
+        jobs: int = 1,
+        memory: Optional[MemoryBudget] = None,
+        lock_timeout: Optional[float] = lock.DEFAULT_TIMEOUT,
+        container_locks: bool = False,
+        catalog: Optional[Catalog] = None,
+        tuner: Optional[AutoTuner] = None,
+        failures: Optional[Failures] = None,
+        rids: Optional[Rids] = None,
+        output_cache: Optional[OutputCache] = None,
+    ):
+        """
+        Args:
+            config_dir (Optional[str], optional): Syre local config dir.
+                Defaults to the dir of the system.
+            system (Optional[str], optional): System the config belongs to.
+                Defaults to the current system.
+            jobs (int, optional): Number of containers to convert in parallel
+                across all projects, or the maximum if `tuner` is given. Defaults to 1.
+            memory (Optional[MemoryBudget], optional): Memory budget to stay under.
+                Defaults to None, for no limit.
+            lock_timeout (Optional[float], optional): Maximum time to wait for a lock in seconds.
+                `None` waits indefinitely. Defaults to `lock.DEFAULT_TIMEOUT`.
+            container_locks (bool, optional): Lock each container while converting it,
+                in addition to its project. Defaults to False.
+            catalog (Optional[Catalog], optional): Catalog of project trees
+                used to find containers. Defaults to None, to walk the trees.
+            tuner (Optional[AutoTuner], optional): Tunes the number of containers
+                converted in parallel. Defaults to None, to always use `jobs`.
+            failures (Optional[Failures], optional): Records failed containers
+                so the rest of the project can continue to be converted.
+                Defaults to None, to stop at the first error.
+            rids (Optional[Rids], optional): Creates the rids and timestamps of new resources.
+                Defaults to random rids and the current time.
+            output_cache (Optional[OutputCache], optional): Cache of converted container files.
+                Defaults to None, to convert every container.
+        """
+        self.system = paths.get_system() if system is None else system
+        self.jobs = jobs
+        self.memory = memory
+        self.lock_timeout = lock_timeout
+        self.container_locks = container_locks
+        self.catalog = catalog
+        self.tuner = tuner
+        # Bounds the containers in flight across all projects of the run.
+        self.slots: Optional[Slots] = tuner if tuner is not None else (Slots(jobs) if jobs > 1 else None)
+        self.failures = failures
+        self.rids = Rids() if rids is None else rids
+        self.output_cache = output_cache
+        self._config_dir = config_dir
+        self._run_lock = threading.Lock()
+        self._run_results: dict[Callable, Any] = {}
+
+    def run_once(self, stage: Callable[["ConversionContext"], Any]) -> Any:
+        """Runs a run level stage, unless it already ran with this context.
+        Concurrent callers wait for the first to finish.
+
+        Args:
+            stage (Callable[[ConversionContext], Any]): Stage to run.
+
+        Returns:
+            Any: Result of the stage's first run.
+        """
+        with self._run_lock:
+            if stage not in self._run_results:
+                self._run_results[stage] = stage(self)
+
+            return self._run_results[stage]
+
+    def find_files(self, root: str, relative_path: str) -> Iterator[str]:
+        """Finds a relative path in the root and all of its descendant directories,
+        using the catalog if there is one.
+        See `common.find_files`.
+
+        Args:
+            root (str): Directory to search.
+            relative_path (str): Path relative to each directory to search for.
+
+        Yields:
+            str: Paths to the matches.
+        """
+        if self.catalog is None:
+            return common.find_files(root, relative_path)
+
+        return self.catalog.find_files(root, relative_path)
+
+    @cached_property
+    def config_dir(self) -> str:
+        """
+        Returns:
+            str: Syre local config dir.
+        """
+        if self._config_dir is not None:
+            return self._config_dir
+
+        return paths.config_local_dir(self.system)
+
+    @cached_property
+    def user_manifest(self) -> str:
+        """
+        Returns:
+            str: Path to the user manifest file.
+        """
+        return paths.config_user_manifest(self.config_dir, self.system)
+
+    @cached_property
+    def project_manifest(self) -> str:
+        """
+        Returns:
+            str: Path to the project manifest file.
+        """
+        return paths.config_project_manifest(self.config_dir, self.system)
+
+    @cached_property
+    def local_settings(self) -> str:
+        """
+        Returns:
+            str: Path to the local config file.
+        """
+        return paths.config_local_settings(self.config_dir, self.system)
+
+    @cached_property
+    def user(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Current user.
+        """
+        return common.current_user(self.local_settings)
+
+    @cached_property
+    def projects(self) -> list[str]:
+        """
+        Returns:
+            list[str]: All registered project paths.
+        """
+        return common.project_paths(self.project_manifest)
@@ -8,27 +8,46 @@ Converts a Syre project to version `0.10.0`.
 """
 # %%
 import os
-import json
+import re
 import logging
-from glob import glob
+from typing import Any, Optional, Union
 
-from . import paths, common
+from . import paths, common, pipeline, throttle, trace
+from .context import ConversionContext
 
 logger = logging.getLogger(__name__)
 
+# `"path": {"Relative": <path>}`, keeping `"path": ` and `<path>`.
+RELATIVE_PATH = re.compile(
+    rb'("path"\s*:\s*)\{\s*"Relative"\s*:\s*(' + common.JSON_STRING.pattern + rb")\s*\}"
+)
+
 # %%
-def convert_thot_to_syre(root: str):
+def convert_thot_to_syre(root: str, ctx: Optional[ConversionContext] = None):
     """Convert all `.thot` folders to `.syre`.
 
     Args:
         root (str): Root path to convert. All subdirectories are converted.
+        ctx (Optional[ConversionContext], optional): Conversion context.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     logger.info("renaming `.thot` to `.syre`")
-    glob_pattern = os.path.join(root, "**", ".thot")
-    thot_paths = glob(glob_pattern, recursive=True)
-    syre_paths = [os.path.join(os.path.dirname(path), ".syre") for path in thot_paths]
-    for thot_path, syre_path in zip(thot_paths, syre_paths):
-        os.rename(thot_path, syre_path)
+    for thot_path in ctx.find_files(root, ".thot"):
+        base_path = os.path.dirname(thot_path)
+        throttle.rename(thot_path, os.path.join(base_path, ".syre"))
+        if ctx.catalog is not None:
+            ctx.catalog.touch_dir(base_path)
+
+
+def convert_container(base_path: str):
+    """Converts a Container in a project to `0.10.0`.
+
+    Args:
+        base_path (str): Path to the container's folder.
+    """
+    remove_relative_path_enum(paths.assets_of(base_path))
 
 
 def remove_relative_path_enum(assets_path: str):
@@ -37,42 +56,136 @@ def remove_relative_path_enum(assets_path: str):
     Args:
         assets (str): Path to an assets.json file.
     """
+    documents = read_assets(assets_path)
+    if documents is not None:
+        pipeline.write_documents(transform_assets(documents))
+
+
+def read_assets(assets_path: str) -> Optional[dict[str, Union[Any, bytes]]]:
+    """Reader stage.
+    Loads an assets.json file, skipping it if it has no Relative path enums.
+    If possible, the enums are removed from the file's bytes instead of loading it.
+
+    Args:
+        assets_path (str): Path to an assets.json file.
+
+    Returns:
+        Optional[dict[str, Union[Any, bytes]]]: Map from the path to the assets,
+            or to the converted bytes of the file if they could be patched.
+            `None` if there is nothing to convert.
+    """
+    with common.map_file(assets_path) as buf:
+        return load_assets(assets_path, buf)
+
+
+def load_assets(assets_path: str, buf: Any) -> Optional[dict[str, Union[Any, bytes]]]:
+    """Loads an assets.json file from its bytes. See `read_assets`.
+
+    Args:
+        assets_path (str): Path to the assets.json file.
+        buf (Any): Bytes of the file.
+
+    Returns:
+        Optional[dict[str, Union[Any, bytes]]]: See `read_assets`.
+    """
     logging.info("removing Relative enum from asset paths")
-    with open(assets_path, "r+") as f:
-        assets = json.load(f)
+    if buf.find(b'"Relative"') == -1:
+        logging.info("no Relative enums found")
+        return None
+
+    with trace.span("json.patch", "json", path=assets_path):
+        patched = patch_relative_paths(buf)
+
+    if patched is not None:
+        return {assets_path: patched}
+
+    with trace.span("json.load", "json", path=assets_path):
+        return {assets_path: common.parse_json(buf)}
+
+
+def patch_relative_paths(buf: Any) -> Optional[bytes]:
+    """Removes Relative path enums from the bytes of an assets.json file.
+
+    Args:
+        buf (Any): Bytes of the file.
+
+    Returns:
+        Optional[bytes]: The converted bytes, or `None` if the file must be loaded to convert it.
+            e.g. If `Relative` is used other than as the enum of an asset's path.
+    """
+    patched = common.patch_json(
+        buf, RELATIVE_PATH, 2, lambda match: match.group(1) + match.group(2)
+    )
+    if patched is None:
+        return None
+
+    # NOTE: Any other `"Relative"` is in a shape the pattern does not cover.
+    (patched, count) = patched
+    if count != sum(1 for _ in re.finditer(rb'"Relative"', buf)):
+        return None
+
+    return patched
+
+
+def transform_assets(documents: dict[str, Union[Any, bytes]]) -> dict[str, Union[Any, bytes]]:
+    """Transform stage. Removes Relative path enum from Asset.path.
+
+    Args:
+        documents (dict[str, Union[Any, bytes]]): Map from path to the assets of an assets.json file.
+            Files already converted as bytes are passed through.
+
+    Returns:
+        dict[str, Union[Any, bytes]]: The converted documents.
+    """
+    for assets in documents.values():
+        if isinstance(assets, bytes):
+            continue
+
         for asset in assets.values():
             if "Relative" in asset["path"]:
                 asset["path"] = asset["path"]["Relative"]
 
-        f.seek(0)
-        json.dump(assets, f, indent=4)
-        f.truncate()
-
+    return documents
 
 
-def convert_all_containers(project_path: str):
+def convert_all_containers(project_path: str, ctx: Optional[ConversionContext] = None):
     """Converts all the Containers in a project to `0.10.0`.
 
     Args:
         project_path (str): Path to the project's root.
+        ctx (Optional[ConversionContext], optional): Conversion context. Defaults to None.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     data_path = common.project_data_path(project_path)
     if data_path is None:
         raise ValueError(f"Could not retrieve data root for `{project_path}`")
 
-    glob_pattern = os.path.join(data_path, "**", paths.assets())
-    for assets_path in glob(glob_pattern, recursive=True):
+    def read(assets_path: str) -> Optional[dict[str, Any]]:
         logging.info(f"[{assets_path}]")
-        remove_relative_path_enum(assets_path)
+        return read_assets(assets_path)
+
+    pipeline.run_containers(
+        ctx.find_files(data_path, paths.assets()),
+        read,
+        transform_assets,
+        pipeline.write_documents,
+        ctx,
+        version="0.10.0",
+        files=[paths.assets()],
+        load=lambda assets_path, contents: load_assets(assets_path, contents[paths.assets()]),
+    )
 
 
-def convert(project: str):
+def convert(project: str, ctx: Optional[ConversionContext] = None):
     """Converts the project located at the given path to `0.10.0`.
 
     Args:
         project (str): Path to the project.
+        ctx (Optional[ConversionContext], optional): Conversion context.
     """
     logger.info("[0.10.0]")
-    convert_thot_to_syre(project)
-    convert_all_containers(project)
+    convert_thot_to_syre(project, ctx)
+    convert_all_containers(project, ctx)
 
@@ -10,14 +10,19 @@ Converts a Syre project from version `0.10.1` to `0.10.2`.
 """
 # %%
 import os
+import re
 import json
 import logging
-from glob import glob
+from typing import Any, Optional, Union
 
-from . import paths, common
+from . import paths, common, pipeline, throttle, trace
+from .context import ConversionContext
 
 logger = logging.getLogger(__name__)
 
+# `"scripts":`, keeping the `:`.
+SCRIPTS_KEY = re.compile(rb'"scripts"(\s*:)')
+
 # %%
 def convert_project_scripts(base_path: str):
     """Convert project .syre/scripts.json to .syre/analyses.json.
@@ -32,10 +37,10 @@ def convert_project_scripts(base_path: str):
     from_path = os.path.join(base_path, paths.SYRE_FOLDER, "scripts.json")
     analyses_path = paths.project_analyses_of(base_path)
     if  os.path.exists(from_path) and not os.path.exists(analyses_path):
-        os.rename(from_path, analyses_path)
+        throttle.rename(from_path, analyses_path)
 
     logger.info("adding type to scripts")
-    with open(analyses_path, "r+") as f:
+    with throttle.open(analyses_path, "r+") as f:
         analyses = json.load(f)
         for analysis in analyses:
             if "type" not in analysis:
@@ -53,51 +58,156 @@ def convert_project_scripts(base_path: str):
         f.truncate()
 
 
+def convert_container(base_path: str):
+    """Converts a Container in a project from `0.10.1` to `0.10.2`.
+
+    Args:
+        base_path (str): Path to the container's folder.
+    """
+    convert_container_associations(paths.container_properties_of(base_path))
+
+
 def convert_container_associations(container_properties_path: str):
     """Renames `Container.scripts` to `Container.analyses`.
 
     Args:
         container_properties_path (str): Path to the container's properties file.
     """
+    documents = transform_container(read_container(container_properties_path))
+    if documents is not None:
+        pipeline.write_documents(documents)
+
+
+def read_container(container_properties_path: str) -> dict[str, Union[Any, bytes]]:
+    """Reader stage. Loads a container properties file.
+    If possible, `scripts` is renamed in the file's bytes instead of loading it.
+
+    Args:
+        container_properties_path (str): Path to the container's properties file.
+
+    Returns:
+        dict[str, Union[Any, bytes]]: Map from the path to the container's properties,
+            or to the converted bytes of the file if they could be patched.
+    """
+    with common.map_file(container_properties_path) as buf:
+        return load_container(container_properties_path, buf)
+
+
+def load_container(container_properties_path: str, buf: Any) -> dict[str, Union[Any, bytes]]:
+    """Loads a container properties file from its bytes. See `read_container`.
+
+    Args:
+        container_properties_path (str): Path to the container's properties file.
+        buf (Any): Bytes of the file.
+
+    Returns:
+        dict[str, Union[Any, bytes]]: See `read_container`.
+    """
+    with trace.span("json.patch", "json", path=container_properties_path):
+        patched = patch_container_associations(buf)
+
+    if patched is not None:
+        return {container_properties_path: patched}
+
+    with trace.span("json.load", "json", path=container_properties_path):
+        return {container_properties_path: common.parse_json(buf)}
+
+
+def patch_container_associations(buf: Any) -> Optional[bytes]:
+    """Renames `Container.scripts` to `Container.analyses` in the bytes of a properties file.
+    The key keeps its position rather than moving to the end.
+
+    Args:
+        buf (Any): Bytes of the file.
+
+    Returns:
+        Optional[bytes]: The converted bytes, or `None` if the file must be loaded to convert it.
+            e.g. If it is already converted, or `scripts` is also used as a nested key.
+    """
+    if buf.find(b'"analyses"') != -1:
+        return None
+
+    patched = common.patch_json(buf, SCRIPTS_KEY, 1, lambda match: b'"analyses"' + match.group(1))
+    if patched is None or patched[1] != 1:
+        return None
+
+    return patched[0]
+
+
+def transform_container(
+    documents: dict[str, Union[Any, bytes]]
+) -> Optional[dict[str, Union[Any, bytes]]]:
+    """Transform stage. Renames `Container.scripts` to `Container.analyses`.
+
+    Args:
+        documents (dict[str, Union[Any, bytes]]): Map from path to container properties.
+            Files already converted as bytes are passed through.
+
+    Returns:
+        Optional[dict[str, Union[Any, bytes]]]: The converted documents, or `None` if already converted.
+    """
     logging.info("converting Container.scripts to Container.analyses")
-    with open(container_properties_path, "r+") as f:
-        container = json.load(f)
+    converted = {}
+    for (path, container) in documents.items():
+        if isinstance(container, bytes):
+            converted[path] = container
+            continue
+
         if "analyses" in container:
-            return
+            continue
         
         if "scripts" in container:
             container["analyses"] = container.pop("scripts")
         else:
             container["analyses"] = {}
 
-        f.seek(0)
-        json.dump(container, f, indent=4)
-        f.truncate()
+        converted[path] = container
+
+    if len(converted) == 0:
+        return None
+
+    return converted
 
 
-def convert_all_containers(project_path: str):
+def convert_all_containers(project_path: str, ctx: Optional[ConversionContext] = None):
     """Converts all the Containers in a project from `0.10.1` to `0.10.2`.
 
     Args:
         project_path (str): Path to the project's root.
+        ctx (Optional[ConversionContext], optional): Conversion context. Defaults to None.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     data_path = common.project_data_path(project_path)
     if data_path is None:
         raise ValueError(f"Could not retrieve data root for `{project_path}`")
 
-    glob_pattern = os.path.join(data_path, "**", paths.container_properties())
-    for container_properties_path in glob(glob_pattern, recursive=True):
+    def read(container_properties_path: str) -> dict[str, Any]:
         logging.info(f"[{container_properties_path}]")
-        convert_container_associations(container_properties_path)
+        return read_container(container_properties_path)
+
+    pipeline.run_containers(
+        ctx.find_files(data_path, paths.container_properties()),
+        read,
+        transform_container,
+        pipeline.write_documents,
+        ctx,
+        version="0.10.1",
+        files=[paths.container_properties()],
+        load=lambda path, contents: load_container(path, contents[paths.container_properties()]),
+    )
 
 
-def convert(project: str):
+def convert(project: str, ctx: Optional[ConversionContext] = None):
     """Converts the project located at the given path from `0.10.1` to `0.10.2`.
 
     Args:
         project (str): Path to the project.
+        ctx (Optional[ConversionContext], optional): Conversion context
+            used to convert the containers. Defaults to a new context.
     """
     logger.info("[0.10.1]")
     convert_project_scripts(project)
-    convert_all_containers(project)
+    convert_all_containers(project, ctx)
 
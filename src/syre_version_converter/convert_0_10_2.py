@@ -25,23 +25,36 @@ These steps must be performed manually.
 import os
 import json
 import logging
-import shutil
-from glob import glob
+from typing import Any, Iterator, Optional
 
-from . import paths, common
+from . import paths, common, pipeline, throttle
+from .context import ConversionContext
+from .memory import MemoryBudget
 
 logger = logging.getLogger(__name__)
 
-def convert_config():
-    convert_user_config()
-    convert_local_config()
+def convert_config(ctx: ConversionContext):
+    """Run level stage. Converts the config shared by all projects.
+
+    Args:
+        ctx (ConversionContext): Conversion context.
+    """
+    convert_user_config(ctx)
+    convert_local_config(ctx)
 
 
-def convert_user_config():
+def convert_user_config(ctx: ConversionContext):
     """Converts `users.json` from an object to a list.
+
+    Args:
+        ctx (ConversionContext): Conversion context.
     """
-    path = paths.config_user_manifest()
-    with open(path, "r+") as f:
+    path = ctx.user_manifest
+    if common.json_leading_byte(path) == b"[":
+        logger.info("user manifest already a list")
+        return
+
+    with throttle.open(path, "r+") as f:
         users = json.load(f)
         if isinstance(users, list):
             logger.info("user manifest already a list")
@@ -50,30 +63,33 @@ def convert_user_config():
         logger.info("backing up user manifest")
         (path_backup, ext) = os.path.splitext(path)
         path_backup = path_backup + ".0_10_2" + ext
-        shutil.copyfile(path, path_backup)
+        throttle.copyfile(path, path_backup)
         
         logger.info("converting user manifest from object to list")
         users = [user for (_, user) in users.items()]
         common.json_overwrite(users, f)
 
 
-def convert_local_config():
+def convert_local_config(ctx: ConversionContext):
     """Moves `settings.json` to `local_config.json` and removes `active_project` field.
+
+    Args:
+        ctx (ConversionContext): Conversion context.
     """
-    path = paths.config_local_settings()
+    path = ctx.local_settings
     path_old = os.path.join(os.path.dirname(path), "settings.json")
     (path_old_exists, path_exists) = (os.path.exists(path_old), os.path.exists(path))
     
     if not path_exists and path_old_exists:
         if os.path.exists(path_old):
             logger.info("converting local config")
-            with open(path_old, "r+") as f:
+            with throttle.open(path_old, "r+") as f:
                 config_old = json.load(f)
                 config = { "user": None }
                 if "active_user" in config_old:
                     config["user"] = config_old["active_user"]
                     
-            with open(path, "a") as f:
+            with throttle.open(path, "a") as f:
                 common.json_overwrite(config, f)
             
             os.remove(path_old)
@@ -91,8 +107,8 @@ def convert_project_properties(base_path: str):
     Args:
         base_path (str): Path to the project's root.
     """
-    with open(paths.project_properties_of(base_path), "r+") as f_properties:
-        with open(paths.project_settings_of(base_path), "r+") as f_settings:
+    with throttle.open(paths.project_properties_of(base_path), "r+") as f_properties:
+        with throttle.open(paths.project_settings_of(base_path), "r+") as f_settings:
             logger.info(f"converting project properties of {base_path}")
             
             properties = json.load(f_properties)
@@ -113,7 +129,7 @@ def convert_project_properties(base_path: str):
                 raise RuntimeError(f"project {base_path} config is corrupt")
 
 
-def convert_all_containers(project_path: str):
+def convert_all_containers(project_path: str, ctx: Optional[ConversionContext] = None):
     """Converts all the Containers in a project from `0.10.2` to `0.11.0`.
     Moves `creator` and `created` fields into settings.
     Converts analysis associations to a list.
@@ -123,16 +139,32 @@ def convert_all_containers(project_path: str):
 
     Args:
         project_path (str): Path to the project's root.
+        ctx (Optional[ConversionContext], optional): Conversion context. Defaults to None.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     data_path = common.project_data_path(project_path)
     if data_path is None:
         raise ValueError(f"Could not retrieve data root for `{project_path}`")
 
-    glob_pattern = os.path.join(data_path, "**", paths.container_properties())
-    for container_properties_path in glob(glob_pattern, recursive=True):
+    def read(container_properties_path: str) -> dict[str, Any]:
         container_path = os.path.dirname(os.path.dirname(container_properties_path))
         logging.info(f"[{container_path}]")
-        convert_container(container_path)
+        return read_container(container_path, ctx.memory)
+
+    pipeline.run_containers(
+        ctx.find_files(data_path, paths.container_properties()),
+        read,
+        transform_container,
+        pipeline.write_documents,
+        ctx,
+        version="0.10.2",
+        files=[paths.container_properties(), paths.container_settings(), paths.assets()],
+        load=lambda container_properties_path, contents: load_container(
+            os.path.dirname(os.path.dirname(container_properties_path)), contents
+        ),
+    )
         
 
 def convert_container(base_path: str):
@@ -146,10 +178,102 @@ def convert_container(base_path: str):
     Args:
         base_path (str): Absolute path the the container's folder.
     """
-    convert_container_properties(base_path)
-    convert_container_analysis_associations(base_path)
-    convert_container_assets(base_path)
-    convert_container_permissions(base_path)
+    documents = transform_container(read_container(base_path))
+    if documents is not None:
+        pipeline.write_documents(documents)
+
+
+def read_container(base_path: str, memory: Optional[MemoryBudget] = None) -> dict[str, Any]:
+    """Reader stage. Loads a Container's properties, settings, and assets.
+    Assets are not loaded if they are already a list.
+    Assets too large for the memory budget are not loaded either,
+    but iterated lazily so the writer stage can stream them.
+
+    Args:
+        base_path (str): Absolute path the the container's folder.
+        memory (Optional[MemoryBudget], optional): Memory budget. Defaults to None.
+
+    Returns:
+        dict[str, Any]: The container's `path`, `properties`, `settings`, and `assets`.
+    """
+    assets_path = paths.assets_of(base_path)
+    if common.json_leading_byte(assets_path) == b"[":
+        assets = None
+    elif memory is not None and memory.should_stream(os.path.getsize(assets_path)):
+        assets = common.iter_json_items(assets_path)
+    else:
+        assets = common.load_json(assets_path)
+
+    return {
+        "path": base_path,
+        "properties": common.load_json(paths.container_properties_of(base_path)),
+        "settings": common.load_json(paths.container_settings_of(base_path)),
+        "assets": assets,
+    }
+
+
+def load_container(base_path: str, contents: dict[str, bytes]) -> dict[str, Any]:
+    """Loads a Container from the bytes of its files. See `read_container`.
+    Assets are always loaded whole.
+
+    Args:
+        base_path (str): Absolute path the the container's folder.
+        contents (dict[str, bytes]): Map from path relative to the container to contents
+            of its properties, settings, and assets files.
+
+    Returns:
+        dict[str, Any]: The container's `path`, `properties`, `settings`, and `assets`.
+    """
+    assets = contents[paths.assets()]
+    return {
+        "path": base_path,
+        "properties": common.parse_json(contents[paths.container_properties()]),
+        "settings": common.parse_json(contents[paths.container_settings()]),
+        "assets": None if assets.lstrip()[:1] == b"[" else common.parse_json(assets),
+    }
+
+
+def transform_container(container: dict[str, Any]) -> Optional[dict[str, Any]]:
+    """Transform stage. Converts a Container from `0.10.2` to `0.11.0`.
+
+    Args:
+        container (dict[str, Any]): Container as returned by `read_container`.
+
+    Returns:
+        Optional[dict[str, Any]]: Map from file path to the converted documents that changed,
+            or `None` if nothing changed.
+    """
+    base_path = container["path"]
+    properties = container["properties"]
+    settings = container["settings"]
+    properties_path = paths.container_properties_of(base_path)
+    settings_path = paths.container_settings_of(base_path)
+    changed = {}
+    if transform_container_properties(properties, settings, base_path):
+        changed[properties_path] = properties
+        changed[settings_path] = settings
+
+    if transform_container_analysis_associations(properties, base_path):
+        changed[properties_path] = properties
+
+    if container["assets"] is None:
+        logger.info("assets already converted to list")
+    elif isinstance(container["assets"], Iterator):
+        logger.info(f"streaming assets of {base_path}")
+        changed[paths.assets_of(base_path)] = (asset for (_, asset) in container["assets"])
+    else:
+        assets = transform_container_assets(container["assets"], base_path)
+        if assets is not None:
+            changed[paths.assets_of(base_path)] = assets
+
+    if transform_container_permissions(settings, base_path):
+        changed[settings_path] = settings
+
+    if len(changed) == 0:
+        return None
+
+    return changed
+
     
 def convert_container_properties(base_path: str):
     """Converts a Container in a project from `0.10.2` to `0.11.0`.
@@ -158,28 +282,47 @@ def convert_container_properties(base_path: str):
     Args:
         base_path (str): Absolute path the the container's folder.
     """
-    with open(paths.container_properties_of(base_path), "r+") as f_properties:
-        with open(paths.container_settings_of(base_path), "r+") as f_settings:
-            container = json.load(f_properties)
-            settings = json.load(f_settings)
-            if "properties" in container:
-                properties = container["properties"]
-                orig_props = "created" in properties and "creator" in properties
-                orig_settings = "created" not in settings and "creator" not in settings
-                if orig_props and orig_settings:
-                    logger.info(f"converting container properties of {base_path}")
-                    settings["created"] = properties["created"]
-                    settings["creator"] = properties["creator"]["User"]
-                    del properties["created"]
-                    del properties["creator"]
-                    common.json_overwrite(container, f_properties)
-                    common.json_overwrite(settings, f_settings)
-                elif not orig_props and not orig_settings:
-                    logger.info(f"container {base_path} config already updated")
-                else:
-                    raise RuntimeError(f"container {base_path} config is corrupt")
-            else:
-                raise RuntimeError(f"container {base_path} properties is corrupt")
+    properties_path = paths.container_properties_of(base_path)
+    settings_path = paths.container_settings_of(base_path)
+    container = common.load_json(properties_path)
+    settings = common.load_json(settings_path)
+    if transform_container_properties(container, settings, base_path):
+        common.write_json(properties_path, container)
+        common.write_json(settings_path, settings)
+
+
+def transform_container_properties(
+    container: dict[str, Any], settings: dict[str, Any], base_path: str
+) -> bool:
+    """Moves `creator` and `created` fields of a Container's properties into its settings.
+
+    Args:
+        container (dict[str, Any]): Container properties document.
+        settings (dict[str, Any]): Container settings document.
+        base_path (str): Absolute path the the container's folder.
+
+    Returns:
+        bool: If the documents changed.
+    """
+    if "properties" in container:
+        properties = container["properties"]
+        orig_props = "created" in properties and "creator" in properties
+        orig_settings = "created" not in settings and "creator" not in settings
+        if orig_props and orig_settings:
+            logger.info(f"converting container properties of {base_path}")
+            settings["created"] = properties["created"]
+            settings["creator"] = properties["creator"]["User"]
+            del properties["created"]
+            del properties["creator"]
+            return True
+        elif not orig_props and not orig_settings:
+            logger.info(f"container {base_path} config already updated")
+            return False
+        else:
+            raise RuntimeError(f"container {base_path} config is corrupt")
+    else:
+        raise RuntimeError(f"container {base_path} properties is corrupt")
+
 
 def convert_container_analysis_associations(base_path: str):
     """Converts a Container in a project from `0.10.2` to `0.11.0`.
@@ -189,28 +332,45 @@ def convert_container_analysis_associations(base_path: str):
     Args:
         base_path (str): Absolute path the the container's folder.
     """
-    with open(paths.container_properties_of(base_path), "r+") as f:
-            container = json.load(f)
-            if "analyses" in container:
-                analyses = container["analyses"]
-                if isinstance(analyses, list):
-                    for assoc in analyses:
-                        if "script" in assoc:
-                            assoc["analysis"] = assoc["script"]
-                            del assoc["script"]
-                    
-                    common.json_overwrite(container, f)
-                else:
-                    logger.info(f"converting {base_path} analysis associations")
-                    updated_analyses = []
-                    for (script, assoc) in analyses.items():
-                        assoc["analysis"] = script
-                        updated_analyses.append(assoc)
-                        
-                    container["analyses"] = updated_analyses
-                    common.json_overwrite(container, f)
-            else:
-                raise RuntimeError(f"container {base_path} properties is corrupt")
+    properties_path = paths.container_properties_of(base_path)
+    container = common.load_json(properties_path)
+    if transform_container_analysis_associations(container, base_path):
+        common.write_json(properties_path, container)
+
+
+def transform_container_analysis_associations(container: dict[str, Any], base_path: str) -> bool:
+    """Converts a Container's analysis associations to a list.
+    Converts `{ "analyses": { "script": <id>, ... }` to `{ "analyses": { "analysis": <id>, ... }`
+
+    Args:
+        container (dict[str, Any]): Container properties document.
+        base_path (str): Absolute path the the container's folder.
+
+    Returns:
+        bool: If the document changed.
+    """
+    if "analyses" in container:
+        analyses = container["analyses"]
+        if isinstance(analyses, list):
+            changed = False
+            for assoc in analyses:
+                if "script" in assoc:
+                    assoc["analysis"] = assoc["script"]
+                    del assoc["script"]
+                    changed = True
+            
+            return changed
+        else:
+            logger.info(f"converting {base_path} analysis associations")
+            updated_analyses = []
+            for (script, assoc) in analyses.items():
+                assoc["analysis"] = script
+                updated_analyses.append(assoc)
+                
+            container["analyses"] = updated_analyses
+            return True
+    else:
+        raise RuntimeError(f"container {base_path} properties is corrupt")
 
 
 def convert_container_assets(base_path: str):
@@ -220,15 +380,32 @@ def convert_container_assets(base_path: str):
     Args:
         base_path (str): Absolute path the the container's folder.
     """  
-    with open(paths.assets_of(base_path), "r+") as f:
-        assets = json.load(f)
-        if isinstance(assets, list):
-            logger.info("assets already converted to list")
-            return
-            
-        logger.info(f"converting assets of {base_path}")
-        assets = [asset for (_, asset) in assets.items()]
-        common.json_overwrite(assets, f)
+    assets_path = paths.assets_of(base_path)
+    if common.json_leading_byte(assets_path) == b"[":
+        logger.info("assets already converted to list")
+        return
+
+    assets = transform_container_assets(common.load_json(assets_path), base_path)
+    if assets is not None:
+        common.write_json(assets_path, assets)
+
+
+def transform_container_assets(assets: Any, base_path: str) -> Optional[list[Any]]:
+    """Changes a Container's assets from an object to a list.
+
+    Args:
+        assets (Any): Assets document.
+        base_path (str): Absolute path the the container's folder.
+
+    Returns:
+        Optional[list[Any]]: Converted assets, or `None` if already a list.
+    """
+    if isinstance(assets, list):
+        logger.info("assets already converted to list")
+        return None
+        
+    logger.info(f"converting assets of {base_path}")
+    return [asset for (_, asset) in assets.items()]
         
         
 def convert_container_permissions(base_path: str):
@@ -243,31 +420,53 @@ def convert_container_permissions(base_path: str):
             It appears the permissions could not be associated to a user in `0.10.2`,
             so was unsure how to handle if permissions existed.
     """  
-    with open(paths.container_settings_of(base_path), "r+") as f:
-        settings = json.load(f)
-        if "permissions" not in settings:
-            raise KeyError(f"container {base_path} settings missing `permissions` key")
-        
-        permissions = settings["permissions"]
-        if isinstance(permissions, dict):
-            logger.info("permissions already converted to map")
-            return
-        
-        if len(permissions) > 0:
-            raise ValueError("expected permissions to be empty")
-        
-        logger.info(f"converting container permissions of {base_path}")
-        settings["permissions"] = {}
-        common.json_overwrite(settings, f)
+    settings_path = paths.container_settings_of(base_path)
+    settings = common.load_json(settings_path)
+    if transform_container_permissions(settings, base_path):
+        common.write_json(settings_path, settings)
+
+
+def transform_container_permissions(settings: dict[str, Any], base_path: str) -> bool:
+    """Changes a Container's permissions from a list to a map.
 
+    Args:
+        settings (dict[str, Any]): Container settings document.
+        base_path (str): Absolute path the the container's folder.
 
-def convert(project: str):
+    Returns:
+        bool: If the document changed.
+
+    Raises:
+        ValueError: If permissions are not empty.
+    """
+    if "permissions" not in settings:
+        raise KeyError(f"container {base_path} settings missing `permissions` key")
+    
+    permissions = settings["permissions"]
+    if isinstance(permissions, dict):
+        logger.info("permissions already converted to map")
+        return False
+    
+    if len(permissions) > 0:
+        raise ValueError("expected permissions to be empty")
+    
+    logger.info(f"converting container permissions of {base_path}")
+    settings["permissions"] = {}
+    return True
+
+
+def convert(project: str, ctx: Optional[ConversionContext] = None):
     """Converts the config and project located at the given path from `0.10.2` to `0.11.0`.
 
     Args:
         project (str): Path to the project.
+        ctx (Optional[ConversionContext], optional): Conversion context.
+            Defaults to a new context.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     logger.info("[0.10.2]")
-    convert_config()
+    ctx.run_once(convert_config)
     convert_project_properties(project)
-    convert_all_containers(project)
+    convert_all_containers(project, ctx)
@@ -9,17 +9,20 @@ This breaks the typical conversion chain by ckipping intermediate versions.
 
 # %%
 import os
-import platform
-import datetime as dt
+import sys
 import json
+import hashlib
 import logging
-import subprocess
 import warnings
 from glob import glob
-from uuid import uuid4 as uuid
-from typing import Any, Optional
+from typing import Any, Iterable, Iterator, Optional, Union
 
-from . import paths, common
+from . import paths, common, scheduler, lock, sizing, throttle, trace
+from .failures import CONTAINER
+from .rids import ANALYSIS, ASSET, CONTAINER as CONTAINER_RID
+from .model import Asset, USER_CREATOR
+from .lru import LruCache
+from .context import ConversionContext
 
 logger = logging.getLogger(__name__)
 
@@ -29,36 +32,57 @@ ASSET_PATH = "_asset.json"
 DEFAULT_DATA_DIR = "data"
 DEFAULT_ANALYSIS_DIR = "analysis"
 SCRIPTS_DIR = "scripts"
+SCRIPT_ROOT_PREFIX = "root:/../scripts/"
+METADATA_CACHE_SIZE = 4096
+
+# Flattened metadata, shared by the containers and assets of a run with the same metadata.
+# e.g. Assets whose metadata was copied from an instrument template.
+METADATA_CACHE: LruCache[dict[str, Any]] = LruCache("metadata", METADATA_CACHE_SIZE)
 
 
 # %%
-def hide_dir(path: str):
-    subprocess.run(["attrib", "+H", path], check=True)
+def is_project(path: str) -> bool:
+    """
+    Args:
+        path (str): Path to a folder.
 
+    Returns:
+        bool: If the folder has the files of a `0.9.x` project,
+            a root data container or a scripts folder.
+    """
+    return os.path.exists(os.path.join(path, DEFAULT_DATA_DIR, CONTAINER_PATH)) or os.path.isdir(
+        os.path.join(path, SCRIPTS_DIR)
+    )
 
-def mkdir_syre(path: str) -> str:
+
+def mkdir_syre(
+    path: str, ctx: ConversionContext, directory: Optional[common.Directory] = None
+) -> str:
     """Creates a hidden `.syre` folder in the given directory.
 
     Args:
         path (str): Parent directory.
+        ctx (ConversionContext): Conversion context.
+        directory (Optional[common.Directory], optional): The parent directory, if already open.
 
     Returns:
         str: Path to `syre folder.
     """
-    syre_path = os.path.join(path, paths.SYRE_FOLDER)
-    if not os.path.exists(syre_path):
-        os.mkdir(syre_path)
-        if platform.system() == "Windows":
-            hide_dir(syre_path)
+    with common.open_dir(path, directory) as directory:
+        if not directory.exists(paths.SYRE_FOLDER):
+            directory.mkdir(paths.SYRE_FOLDER)
+            if ctx.system == "Windows":
+                common.hide_dir(directory.join(paths.SYRE_FOLDER))
 
-    return syre_path
+    return os.path.join(path, paths.SYRE_FOLDER)
 
 
-def create_project_properties(path: str):
+def create_project_properties(path: str, ctx: ConversionContext):
     """Create a `.syre/project.json` file.
 
     Args:
         path (str): Project's base path.
+        ctx (ConversionContext): Conversion context.
     """
     (head, name) = os.path.split(path)
     if name == "":
@@ -67,9 +91,9 @@ def create_project_properties(path: str):
         name = os.path.basename(head)
 
     project_path = paths.project_properties_of(path)
-    with open(project_path, "w") as f:
+    with throttle.open(project_path, "w") as f:
         properties = {
-            "rid": str(uuid()),
+            "rid": ctx.rids.project(path),
             "name": name,
             "description": None,
             "data_root": DEFAULT_DATA_DIR,
@@ -86,7 +110,7 @@ def create_project_desktop_settings(path: str):
         path (str): Project's base path.
     """
     settings_path = paths.project_desktop_settings_of(path)
-    with open(settings_path, "w") as f:
+    with throttle.open(settings_path, "w") as f:
         settings = {
             "asset_drag_drop_kind": None,
             "disable_analysis_after": None,
@@ -101,7 +125,7 @@ def create_project_runner_settings(path: str):
         path (str): Project's base path.
     """
     settings_path = paths.project_runner_settings_of(path)
-    with open(settings_path, "w") as f:
+    with throttle.open(settings_path, "w") as f:
         settings = {
             "python_path": None,
             "r_path": None,
@@ -111,7 +135,7 @@ def create_project_runner_settings(path: str):
         json.dump(settings, f, indent=4)
 
 
-def create_project_settings(path: str):
+def create_project_settings(path: str, ctx: ConversionContext):
     """Create a `.syre/project_settings.json` file.
 
     + Sets the project creation time to the current time.
@@ -119,13 +143,14 @@ def create_project_settings(path: str):
 
     Args:
         path (str): Project's base path.
+        ctx (ConversionContext): Conversion context.
     """
     settings_path = paths.project_settings_of(path)
-    user = common.current_user()
-    with open(settings_path, "w") as f:
+    user = ctx.user
+    with throttle.open(settings_path, "w") as f:
         settings = {
             "local_format_version": "0.11.1",
-            "created": dt.datetime.now().isoformat() + "Z",
+            "created": ctx.rids.timestamp(),
             "creator": {"Id": user},
             "permissions": {},
         }
@@ -140,39 +165,40 @@ def create_project_settings(path: str):
         json.dump(settings, f, indent=4)
 
 
-def create_project_analyses(path: str) -> dict[str, str]:
+def create_project_analyses(path: str, ctx: ConversionContext) -> dict[str, str]:
     """Convert analyses to `0.11.1`.
 
     Args:
         path (str): Project's base path.
+        ctx (ConversionContext): Conversion context.
 
     Returns:
         dict[str, str]: Map from analysis path to resource id.
     """
     scripts_path = os.path.join(path, SCRIPTS_DIR)
-    user = common.current_user()
+    user = ctx.user
     analyses = []
     analysis_map = {}
-    for child in os.listdir(scripts_path):
+    for child in throttle.listdir(scripts_path):
         if not child.endswith(".py"):
             # NOTE: Only Python scripts were supported in `0.9.x`.
             continue
 
-        rid = uuid()
+        rid = ctx.rids.resource(ANALYSIS, os.path.join(scripts_path, child))
         analysis_map[child] = rid
         analysis = {
             "type": "Script",
-            "rid": str(rid),
+            "rid": rid,
             "path": child,
             "name": None,
             "description": None,
             "env": {"language": "Python", "cmd": "python3", "args": [], "env": {}},
             "creator": user,
-            "created": dt.datetime.now().isoformat() + "Z",
+            "created": ctx.rids.timestamp(),
         }
         analyses.append(analysis)
 
-    with open(paths.project_analyses_of(path), "w") as f:
+    with throttle.open(paths.project_analyses_of(path), "w") as f:
         json.dump(analyses, f, indent=4)
 
 
@@ -184,13 +210,11 @@ def get_analysis_map(path: str) -> dict[str, str]:
     Returns:
         Map from analysis paths to resource ids.
     """
-    with open(paths.project_analyses_of(path), "r") as f:
-        analyses = json.load(f)
-
+    analyses = common.load_json(paths.project_analyses_of(path))
     return {analysis["path"]: analysis["rid"] for analysis in analyses}
 
 
-def create_project(path: str):
+def create_project(path: str, ctx: ConversionContext):
     """Create the project `.syre` folder.
 
     + Create a `.syre` folder.
@@ -199,28 +223,29 @@ def create_project(path: str):
 
     Args:
         path (str): Project root path.
+        ctx (ConversionContext): Conversion context.
     """
     if not os.path.exists(path):
         raise RuntimeError(f"Project `{path}` does not exist")
 
-    children = os.listdir(path)
+    children = throttle.listdir(path)
     if paths.SYRE_FOLDER not in children:
-        syre_path = mkdir_syre(path)
+        syre_path = mkdir_syre(path, ctx)
     else:
         syre_path = paths.syre_dir_of(path)
 
-    children_syre = os.listdir(syre_path)
+    children_syre = throttle.listdir(syre_path)
     if paths.PROJECT_PROPERTIES_FILE not in children_syre:
-        create_project_properties(path)
+        create_project_properties(path, ctx)
     if paths.PROJECT_DESKTOP_SETTINGS_FILE not in children_syre:
         create_project_desktop_settings(path)
     if paths.PROJECT_RUNNER_SETTINGS_FILE not in children_syre:
         create_project_runner_settings(path)
     if paths.PROJECT_SETTINGS_FILE not in children_syre:
-        create_project_settings(path)
+        create_project_settings(path, ctx)
 
 
-def convert_analyses(path: str) -> dict[str, str]:
+def convert_analyses(path: str, ctx: ConversionContext) -> dict[str, str]:
     """Convert project analyses.
 
     + Converts analyses.
@@ -228,17 +253,19 @@ def convert_analyses(path: str) -> dict[str, str]:
 
     Args:
         path (str): Project's base path.
+        ctx (ConversionContext): Conversion context.
     """
 
     if not os.path.exists(paths.project_analyses_of(path)):
-        create_project_analyses(path)
+        create_project_analyses(path, ctx)
 
-    if SCRIPTS_DIR in os.listdir(path):
+    if SCRIPTS_DIR in throttle.listdir(path):
         src = os.path.join(path, SCRIPTS_DIR)
         dst = os.path.join(path, DEFAULT_ANALYSIS_DIR)
-        os.rename(src, dst)
+        throttle.rename(src, dst)
 
 
+@trace.traced
 def convert_metadata(
     metadata: dict[str, Any], parent: Optional[str] = None
 ) -> dict[str, Any]:
@@ -256,14 +283,25 @@ def convert_metadata(
     Returns:
         dict[str,Any]: Metadata with valid values.
     """
+    # NOTE: The key is hashed from the JSON of the metadata, rather than built from its items,
+    # so values that compare equal but serialize differently, e.g. `1` and `true`, do not collide.
+    # Key order is kept, as it sets the order of the flattened keys.
+    serialized = json.dumps([parent, metadata], separators=(",", ":"))
+    key = hashlib.blake2b(serialized.encode(), digest_size=16).digest()
+    flattened = METADATA_CACHE.get_or_compute(key, lambda: flatten_metadata(metadata, parent))
+    return dict(flattened)
+
+
+def flatten_metadata(metadata: dict[str, Any], parent: Optional[str] = None) -> dict[str, Any]:
+    """Flattens metadata. See `convert_metadata`."""
     converted = {}
     for key, value in metadata.items():
         if isinstance(value, list):
             for idx, item in enumerate(value):
                 if isinstance(item, dict):
-                    converted = {**converted, **convert_metadata(item, f"{key}.{idx}")}
+                    converted = {**converted, **flatten_metadata(item, f"{key}.{idx}")}
         elif isinstance(value, dict):
-            converted = {**converted, **convert_metadata(value, key)}
+            converted = {**converted, **flatten_metadata(value, key)}
         else:
             if parent is not None:
                 key = f"{parent}.{key}"
@@ -272,7 +310,12 @@ def convert_metadata(
     return converted
 
 
-def create_container_properties(path: str, analysis_map: dict[str, str]):
+def create_container_properties(
+    path: str,
+    analysis_map: dict[str, str],
+    ctx: ConversionContext,
+    directory: Optional[common.Directory] = None,
+):
     """Create container properties from `_container.json` and `_scripts.json`.
 
     + Transfers container properties.
@@ -285,18 +328,28 @@ def create_container_properties(path: str, analysis_map: dict[str, str]):
     Args:
         path (str): Container base path.
         analysis_map (dict[str, str]): Map from analysis path to resource id.
+        ctx (ConversionContext): Conversion context.
+        directory (Optional[common.Directory], optional): The container directory, if already open.
 
     Raises:
         ValueError: If unexpected script path is encountered.
     """
-    SCRIPT_ROOT_PREFIX = "root:/../scripts/"
-
-    with open(os.path.join(path, CONTAINER_PATH), "r") as f:
-        container = json.load(f)
-
-    if SCRIPTS_PATH in os.listdir(path):
-        with open(os.path.join(path, SCRIPTS_PATH), "r") as f:
-            scripts = json.load(f)
+    with common.open_dir(path, directory) as directory:
+        _create_container_properties(path, analysis_map, ctx, directory)
+
+
+def _create_container_properties(
+    path: str, analysis_map: dict[str, str], ctx: ConversionContext, directory: common.Directory
+):
+    with trace.span("json.load", "json", path=directory.join(CONTAINER_PATH)):
+        with directory.open(CONTAINER_PATH, "r") as f:
+            container = json.load(f)
+
+    has_scripts = directory.exists(SCRIPTS_PATH)
+    if has_scripts:
+        with trace.span("json.load", "json", path=directory.join(SCRIPTS_PATH)):
+            with directory.open(SCRIPTS_PATH, "r") as f:
+                scripts = json.load(f)
     else:
         scripts = []
 
@@ -334,58 +387,77 @@ def create_container_properties(path: str, analysis_map: dict[str, str]):
             }
         )
 
-    properties = {"rid": str(uuid()), "properties": properties, "analyses": analyses}
-    with open(paths.container_properties_of(path), "w") as f:
-        json.dump(properties, f, indent=4)
+    rid = ctx.rids.resource(CONTAINER_RID, path)
+    properties = {"rid": rid, "properties": properties, "analyses": analyses}
+    properties_path = os.path.join(paths.SYRE_FOLDER, paths.CONTAINER_PROPERTIES_FILE)
+    with trace.span("json.dump", "json", path=directory.join(properties_path)):
+        with directory.open(properties_path, "w") as f:
+            json.dump(properties, f, indent=4)
 
-    os.remove(os.path.join(path, CONTAINER_PATH))
-    if SCRIPTS_PATH in os.listdir(path):
-        os.remove(os.path.join(path, SCRIPTS_PATH))
+    directory.remove(CONTAINER_PATH)
+    if has_scripts:
+        directory.remove(SCRIPTS_PATH)
 
 
-def create_container_settings(path: str):
+def create_container_settings(
+    path: str, ctx: ConversionContext, directory: Optional[common.Directory] = None
+):
     """Create container settings file.
 
     Args:
         path (str): Container base path.
+        ctx (ConversionContext): Conversion context.
+        directory (Optional[common.Directory], optional): The container directory, if already open.
     """
     settings = {
         "creator": None,
-        "created": dt.datetime.now().isoformat() + "Z",
+        "created": ctx.rids.timestamp(),
         "permissions": {},
     }
 
-    with open(paths.container_settings_of(path), "w") as f:
-        json.dump(settings, f, indent=4)
+    with common.open_dir(path, directory) as directory:
+        settings_path = os.path.join(paths.SYRE_FOLDER, paths.CONTAINER_SETTINGS_FILE)
+        with directory.open(settings_path, "w") as f:
+            json.dump(settings, f, indent=4)
 
 
-def create_container_assets(path: str, analysis_map: dict[str, str]):
-    """Move assets into base folder and transfer their properties.
-
-    + Moves asset properties into container's assets.
-    + Moves files from asset folder to container root.
-    + Removes asset folders.
+def iter_container_assets(
+    path: str,
+    analysis_map: dict[str, str],
+    asset_folders: dict[str, str],
+    ctx: ConversionContext,
+    directory: common.Directory,
+) -> Iterator[Asset]:
+    """Lazily converts the asset folders of a container into assets.
 
     Args:
         path (str): Container base path.
         analysis_map (dict[str, str]): Map from script path to analysis resource id.
+        asset_folders (dict[str, str]): Filled with a map from asset folder name to asset file
+            as assets are converted.
+        ctx (ConversionContext): Conversion context.
+        directory (common.Directory): The container directory.
+
+    Yields:
+        Asset: Converted assets.
     """
-    assets = []
-    asset_folders = {}
-    for child in os.listdir(path):
-        asset_folder = os.path.join(path, child)
-        if not os.path.isdir(asset_folder):
-            continue
-        if ASSET_PATH not in os.listdir(asset_folder):
+    creators = {}
+    with directory.scandir() as entries:
+        asset_children = [entry.name for entry in entries if entry.is_dir()]
+
+    for child in asset_children:
+        asset_path = os.path.join(child, ASSET_PATH)
+        if not directory.exists(asset_path):
             continue
 
-        with open(os.path.join(asset_folder, ASSET_PATH), "r") as f:
-            asset: dict[str, Any] = json.load(f)
+        with trace.span("json.load", "json", path=directory.join(asset_path)):
+            with directory.open(asset_path, "r") as f:
+                asset: dict[str, Any] = json.load(f)
 
         if "file" not in asset:
             print(path, child, asset)
         asset_file = asset.get("file", child)
-        creator = {"User": None}
+        creator = USER_CREATOR
         if "creator_type" in asset:
             creator_type = asset["creator_type"]
             if creator_type == "script":
@@ -393,9 +465,11 @@ def create_container_assets(path: str, analysis_map: dict[str, str]):
                 if creator_script is not None:
                     creator_script = os.path.basename(creator_script)
                     if creator_script in analysis_map:
-                        creator = {"Script": analysis_map[creator_script]}
+                        creator = creators.setdefault(
+                            creator_script, ("Script", analysis_map[creator_script])
+                        )
             elif creator_type == "user":
-                creator = {"User": None}
+                creator = USER_CREATOR
             else:
                 # NOTE: Not sure what other values exist.
                 # This is used aas a break
@@ -409,61 +483,138 @@ def create_container_assets(path: str, analysis_map: dict[str, str]):
             err.add_note(f"{path}, {child}")
             raise err
         
-        assets.append(
-            {
-                "rid": str(uuid()),
-                "properties": {
-                    "created": dt.datetime.now().isoformat(timespec="seconds") + "Z",
-                    "creator": creator,
-                    "name": asset.get("name"),
-                    "kind": asset.get("type"),
-                    "description": asset.get("description"),
-                    "tags": asset.get("tags", []),
-                    "metadata": metadata,
-                },
-                "path": asset_file,
-            }
+        asset_folders[child] = asset_file
+        yield Asset(
+            rid=ctx.rids.resource(ASSET, os.path.join(path, asset_file)),
+            path=asset_file,
+            # NOTE: Interned so assets created in the same second share the timestamp.
+            created=sys.intern(ctx.rids.timestamp(timespec="seconds")),
+            creator=creator,
+            name=asset.get("name"),
+            kind=asset.get("type"),
+            description=asset.get("description"),
+            tags=tuple(asset.get("tags", ())),
+            metadata=metadata,
         )
 
-        asset_folders[asset_folder] = asset_file
 
-    with open(paths.assets_of(path), "a+") as f:
-        f_size = f.seek(0, os.SEEK_END)
-        f.seek(0)
-        container_assets = []
-        if f_size > 0:
-            try:
-                container_assets = json.load(f)
-            except Exception as err:
-                err.add_note(f"[{paths.assets_of(path)}]")
-                raise err
+def stream_container_assets(
+    assets_path: str,
+    assets: Iterable[Union[Asset, dict[str, Any]]],
+    directory: Optional[common.Directory] = None,
+):
+    """Appends assets to an assets file without loading either into memory.
+    The file is only replaced once all assets are written.
+
+    Args:
+        assets_path (str): Path to the container's assets file.
+            Relative to `directory` if given.
+        assets (Iterable[Union[Asset, dict[str, Any]]]): Assets to append.
+        directory (Optional[common.Directory], optional): Directory the path is relative to.
+    """
+    if directory is None:
+        with common.Directory(os.path.dirname(assets_path) or os.curdir) as directory:
+            stream_container_assets(os.path.basename(assets_path), assets, directory)
+        return
+
+    assets_path_tmp = assets_path + ".tmp"
+    try:
+        with directory.open(assets_path_tmp, "w") as f:
+            writer = common.JsonArrayWriter(f)
+            if directory.exists(assets_path) and directory.stat(assets_path).st_size > 0:
+                try:
+                    for (_, asset) in common.iter_json_items(
+                        assets_path, opener=directory.opener
+                    ):
+                        writer.write(asset)
+                except Exception as err:
+                    err.add_note(f"[{directory.join(assets_path)}]")
+                    raise err
+
+            for asset in assets:
+                writer.write(asset)
+
+            writer.close()
+    except BaseException:
+        directory.remove(assets_path_tmp)
+        raise
+
+    directory.replace(assets_path_tmp, assets_path)
+
+
+@trace.traced
+def create_container_assets(
+    path: str,
+    analysis_map: dict[str, str],
+    ctx: ConversionContext,
+    directory: Optional[common.Directory] = None,
+):
+    """Move assets into base folder and transfer their properties.
+
+    + Moves asset properties into container's assets.
+    + Moves files from asset folder to container root.
+    + Removes asset folders.
+
+    Args:
+        path (str): Container base path.
+        analysis_map (dict[str, str]): Map from script path to analysis resource id.
+        ctx (ConversionContext): Conversion context.
+            If the memory budget is tight, assets are streamed into the assets file
+            rather than being collected in memory.
+        directory (Optional[common.Directory], optional): The container directory, if already open.
+    """
+    with common.open_dir(path, directory) as directory:
+        _create_container_assets(path, analysis_map, ctx, directory)
+
 
-        container_assets += assets
-        common.json_overwrite(container_assets, f)
+def _create_container_assets(
+    path: str,
+    analysis_map: dict[str, str],
+    ctx: ConversionContext,
+    directory: common.Directory,
+):
+    asset_folders = {}
+    assets = iter_container_assets(path, analysis_map, asset_folders, ctx, directory)
+    assets_path = os.path.join(paths.SYRE_FOLDER, paths.ASSETS_FILE)
+    f_size = directory.stat(assets_path).st_size if directory.exists(assets_path) else 0
+    if ctx.memory is not None and ctx.memory.should_stream(f_size):
+        stream_container_assets(assets_path, assets, directory)
+    else:
+        assets = list(assets)
+        with directory.open(assets_path, "a+") as f:
+            f_size = f.seek(0, os.SEEK_END)
+            f.seek(0)
+            container_assets = []
+            if f_size > 0:
+                try:
+                    with trace.span("json.load", "json", path=directory.join(assets_path)):
+                        container_assets = json.load(f)
+                except Exception as err:
+                    err.add_note(f"[{paths.assets_of(path)}]")
+                    raise err
+
+            container_assets += assets
+            common.json_overwrite(container_assets, f)
 
     for folder, child in asset_folders.items():
         # NOTE: Rename folder incase file has same name.
         folder_tmp = folder + ".tmp"
-        os.rename(folder, folder_tmp)
-
-        src = os.path.join(folder_tmp, child)
-        dst = os.path.join(path, child)
-        os.rename(src, dst)
-        os.remove(os.path.join(folder_tmp, ASSET_PATH))
+        directory.rename(folder, folder_tmp)
+        directory.rename(os.path.join(folder_tmp, child), child)
+        directory.remove(os.path.join(folder_tmp, ASSET_PATH))
         try:
-            os.rmdir(folder_tmp)
+            directory.rmdir(folder_tmp)
         except OSError:
             warnings.warn(
-                f"[{os.path.join(path, folder)}] Additional files found in asset folder, moving to `.syre`"
-            )
-            os.rename(
-                folder_tmp,
-                os.path.join(paths.syre_dir_of(path), os.path.basename(folder)),
+                f"[{directory.join(folder)}] Additional files found in asset folder, moving to `.syre`"
             )
+            directory.rename(folder_tmp, os.path.join(paths.SYRE_FOLDER, folder))
 
 
-def convert_container_recursive(path: str, analysis_map: dict[str, str]):
+def convert_container_recursive(path: str, analysis_map: dict[str, str], ctx: ConversionContext):
     """Converts Containers to `0.11.1` recursively.
+    Sibling subtrees are converted in parallel using `ctx.jobs` workers,
+    as many as `ctx.slots` allows, starting with the largest top level subtrees.
 
     + Creates a `.syre` folder.
     + Converts a container properties.
@@ -476,45 +627,124 @@ def convert_container_recursive(path: str, analysis_map: dict[str, str]):
     Args:
         path (str): Base path of container.
         analysis_map (dict[str, str]): Map from analysis path to resource id.
+        ctx (ConversionContext): Conversion context.
     """
-    children = os.listdir(path)
-    if (CONTAINER_PATH not in children) and (paths.SYRE_FOLDER not in children):
-        raise RuntimeError(f"Invalid container `{path}`")
+    visit = lambda container_path: convert_container(container_path, analysis_map, ctx)
+    if ctx.jobs <= 1:
+        scheduler.run_tree([path], visit)
+        return
+
+    # NOTE: The root is converted first so its subtrees can be sized and started largest first.
+    subtrees = convert_container(path, analysis_map, ctx)
+    scheduler.run_tree(
+        subtrees,
+        visit,
+        workers=ctx.jobs,
+        memory=ctx.memory,
+        slots=ctx.slots,
+        cost=lambda subtree: sizing.estimate_cost(subtree, ctx),
+    )
+
+
+def convert_container(path: str, analysis_map: dict[str, str], ctx: ConversionContext) -> list[str]:
+    """Converts a single Container to `0.11.1`.
+    The container is fully converted before its children are returned,
+    so asset relocation never races with child discovery.
 
-    if paths.SYRE_FOLDER not in children:
-        mkdir_syre(path)
+    Args:
+        path (str): Base path of container.
+        analysis_map (dict[str, str]): Map from analysis path to resource id.
+        ctx (ConversionContext): Conversion context.
 
-    if CONTAINER_PATH in children:
-        create_container_properties(path, analysis_map)
-        create_container_settings(path)
-        create_container_assets(path, analysis_map)
+    Returns:
+        list[str]: Paths of the child containers left to convert.
+    """
+    with trace.span("container", "container", path=path):
+        if ctx.failures is None:
+            return _convert_container(path, analysis_map, ctx)
+
+        try:
+            return _convert_container(path, analysis_map, ctx)
+        except Exception as err:
+            # NOTE: The container's subtree is left unconverted to be retried as a whole.
+            ctx.failures.record(CONTAINER, path, "0.9.x", err)
+            return []
 
-    for child in children:
-        child_path = os.path.join(path, child)
-        if not os.path.isdir(child_path):
-            continue
-        if CONTAINER_PATH in os.listdir(child_path):
-            convert_container_recursive(child_path, analysis_map)
 
+def _convert_container(
+    path: str, analysis_map: dict[str, str], ctx: ConversionContext
+) -> list[str]:
+    if ctx.container_locks:
+        # NOTE: Create `.syre` first so the lock does not create it unhidden.
+        if os.path.exists(os.path.join(path, CONTAINER_PATH)):
+            mkdir_syre(path, ctx)
 
-def convert_all_containers(project_path: str):
+        with lock.Lock(path, timeout=ctx.lock_timeout, system=ctx.system):
+            return convert_container_unlocked(path, analysis_map, ctx)
+
+    return convert_container_unlocked(path, analysis_map, ctx)
+
+
+def convert_container_unlocked(
+    path: str, analysis_map: dict[str, str], ctx: ConversionContext
+) -> list[str]:
+    """Converts a single Container to `0.11.1` without locking it.
+
+    Args:
+        path (str): Base path of container.
+        analysis_map (dict[str, str]): Map from analysis path to resource id.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        list[str]: Paths of the child containers left to convert.
+    """
+    # NOTE: The container is opened once and all operations are relative to it,
+    # so its path is not resolved again for each file.
+    with common.Directory(path) as directory:
+        children = directory.listdir()
+        if (CONTAINER_PATH not in children) and (paths.SYRE_FOLDER not in children):
+            raise RuntimeError(f"Invalid container `{path}`")
+
+        if paths.SYRE_FOLDER not in children:
+            mkdir_syre(path, ctx, directory)
+
+        if CONTAINER_PATH in children:
+            create_container_properties(path, analysis_map, ctx, directory)
+            create_container_settings(path, ctx, directory)
+            create_container_assets(path, analysis_map, ctx, directory)
+
+        child_containers = []
+        for child in children:
+            if directory.exists(os.path.join(child, CONTAINER_PATH)):
+                child_containers.append(os.path.join(path, child))
+
+    return child_containers
+
+
+def convert_all_containers(project_path: str, ctx: ConversionContext):
     """Converts all the Containers in a project to `0.11.1`.
 
     Args:
         project_path (str): Path to the project's root.
+        ctx (ConversionContext): Conversion context.
     """
     data_path = os.path.join(project_path, "data")
     analysis_map = get_analysis_map(project_path)
-    convert_container_recursive(data_path, analysis_map)
+    convert_container_recursive(data_path, analysis_map, ctx)
 
 
-def convert(project: str):
+def convert(project: str, ctx: Optional[ConversionContext] = None):
     """Converts the project located at the given path to `0.11.1`.
 
     Args:
         project (str): Path to the project.
+        ctx (Optional[ConversionContext], optional): Conversion context.
+            Defaults to a new context.
     """
+    if ctx is None:
+        ctx = ConversionContext()
+
     logger.info("[0.9.x] (to `0.11.1`)")
-    create_project(project)
-    convert_analyses(project)
-    convert_all_containers(project)
+    create_project(project, ctx)
+    convert_analyses(project, ctx)
+    convert_all_containers(project, ctx)
@@ -0,0 +1,418 @@
+"""
+Estimates the cost of converting projects from a sample of their containers.
+
+The number of containers is extrapolated from the fan-out of the container tree
+by random walks from the root, each taking one random child per level (Knuth's estimator).
+Each walk gives an unbiased estimate of the tree's total,
+the product of the fan-outs along the walk weighing each container visited.
+Every visited container is converted on a local copy of its metadata,
+timing the chain's transforms and counting the files touched and bytes written.
+The spread of the walks gives a confidence interval for each total.
+
++ Durations are for a single worker on local storage,
+    so exclude the latency of the projects' storage.
++ Project level files and the config are not included, as their cost does not scale.
+"""
+import os
+import time
+import math
+import random
+import shutil
+import logging
+import tempfile
+import statistics
+from uuid import uuid4 as uuid
+from typing import Optional
+
+from . import paths, common, status, throttle
+from .chain import CONTAINER_CONVERTERS, VERSIONS, chain_versions
+from .context import ConversionContext
+from . import convert_0_9_x
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WALKS = 30
+DEFAULT_CONFIDENCE = 0.95
+
+# Estimated quantities, in order.
+FIELDS = ("containers", "seconds", "files", "bytes")
+
+Sample = tuple[float, float, float, float]
+
+
+class Estimate:
+    """Mean and confidence interval of estimated totals."""
+
+    def __init__(self, means: dict[str, float], errors: dict[str, float], confidence: float):
+        """
+        Args:
+            means (dict[str, float]): Estimated total of each field.
+            errors (dict[str, float]): Standard error of each total.
+            confidence (float): Confidence level of the intervals.
+        """
+        self.means = means
+        self.errors = errors
+        self.confidence = confidence
+
+    def interval(self, field: str) -> tuple[float, float]:
+        """
+        Args:
+            field (str): Estimated quantity.
+
+        Returns:
+            tuple[float, float]: Confidence interval of the total.
+        """
+        z = statistics.NormalDist().inv_cdf(0.5 + self.confidence / 2)
+        mean = self.means[field]
+        error = self.errors[field]
+        return (max(mean - z * error, 0.0), mean + z * error)
+
+    def __add__(self, other: "Estimate") -> "Estimate":
+        return Estimate(
+            {field: self.means[field] + other.means[field] for field in FIELDS},
+            {field: math.hypot(self.errors[field], other.errors[field]) for field in FIELDS},
+            self.confidence,
+        )
+
+
+def empty_estimate(confidence: float = DEFAULT_CONFIDENCE) -> Estimate:
+    """
+    Returns:
+        Estimate: Estimate of nothing to convert.
+    """
+    zeros = {field: 0.0 for field in FIELDS}
+    return Estimate(zeros, dict(zeros), confidence)
+
+
+def snapshot(root: str) -> dict[int, tuple[str, int, int]]:
+    """
+    Args:
+        root (str): Directory to snapshot.
+
+    Returns:
+        dict[int, tuple[str, int, int]]: Map from inode to path, size, and modification time
+            of each file in the directory.
+    """
+    files = {}
+    for (dir_path, _, names) in os.walk(root):
+        for name in names:
+            path = os.path.join(dir_path, name)
+            stat = os.lstat(path)
+            files[stat.st_ino] = (path, stat.st_size, stat.st_mtime_ns)
+
+    return files
+
+
+def changes(
+    before: dict[int, tuple[str, int, int]], after: dict[int, tuple[str, int, int]]
+) -> tuple[int, int]:
+    """Compares two snapshots.
+    Moved files are touched, but not written. Replaced files are only counted once.
+
+    Returns:
+        tuple[int, int]: Number of files touched, and bytes written.
+    """
+    after_paths = {path for (path, _, _) in after.values()}
+    touched = 0
+    written = 0
+    for (ino, (path, size, mtime)) in after.items():
+        old = before.get(ino)
+        if old is None or old[1:] != (size, mtime):
+            touched += 1
+            written += size
+        elif old[0] != path:
+            touched += 1
+
+    for (ino, (path, _, _)) in before.items():
+        if ino not in after and path not in after_paths:
+            touched += 1
+
+    return (touched, written)
+
+
+def copy_container(container: str, dst: str, version: str):
+    """Copies the metadata of a container, with empty placeholders for its asset files.
+
+    Args:
+        container (str): Path to the container.
+        dst (str): Path to copy the container to.
+        version (str): Format version of the container.
+    """
+    os.makedirs(dst)
+    folder = status.metadata_folder_of(version) or paths.SYRE_FOLDER
+    if os.path.isdir(os.path.join(container, folder)):
+        shutil.copytree(os.path.join(container, folder), os.path.join(dst, folder))
+
+    if version != "0.9.x":
+        return
+
+    for name in (convert_0_9_x.CONTAINER_PATH, convert_0_9_x.SCRIPTS_PATH):
+        if os.path.exists(os.path.join(container, name)):
+            throttle.copyfile(os.path.join(container, name), os.path.join(dst, name))
+
+    for child in throttle.listdir(container):
+        asset_path = os.path.join(container, child, convert_0_9_x.ASSET_PATH)
+        if not os.path.exists(asset_path):
+            continue
+
+        os.makedirs(os.path.join(dst, child))
+        throttle.copyfile(asset_path, os.path.join(dst, child, convert_0_9_x.ASSET_PATH))
+        for name in throttle.listdir(os.path.join(container, child)):
+            if name != convert_0_9_x.ASSET_PATH and os.path.isfile(
+                os.path.join(container, child, name)
+            ):
+                open(os.path.join(dst, child, name), "w").close()
+
+
+def measure_container(
+    container: str,
+    versions: list[str],
+    analysis_map: dict[str, str],
+    scratch: str,
+    ctx: ConversionContext,
+) -> Sample:
+    """Converts a copy of a container through the chain.
+
+    Args:
+        container (str): Path to the container.
+        versions (list[str]): Versions the container is converted through.
+        analysis_map (dict[str, str]): Map from script file to analysis rid, for `0.9.x`.
+        scratch (str): Directory to copy the container into.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        Sample: One container, and the seconds, files touched, and bytes written to convert it.
+    """
+    copy = os.path.join(scratch, uuid().hex)
+    copy_container(container, copy, versions[0])
+    touched = 0
+    if versions[0] == "0.10.0":
+        # NOTE: Renamed for the whole project before its containers are converted.
+        os.rename(os.path.join(copy, ".thot"), os.path.join(copy, paths.SYRE_FOLDER))
+        touched += 1
+
+    before = snapshot(copy)
+    start = time.perf_counter()
+    for version in versions:
+        if version == "0.9.x":
+            convert_0_9_x.convert_container_unlocked(copy, analysis_map, ctx)
+        else:
+            CONTAINER_CONVERTERS[version](copy)
+    seconds = time.perf_counter() - start
+    (files, written) = changes(before, snapshot(copy))
+    shutil.rmtree(copy, ignore_errors=True)
+    return (1.0, seconds, float(touched + files), float(written))
+
+
+def child_containers(container: str, version: str) -> list[str]:
+    """
+    Args:
+        container (str): Path to a container.
+        version (str): Format version of the container.
+
+    Returns:
+        list[str]: Paths to the container's children.
+    """
+    folder = status.metadata_folder_of(version)
+    marker = convert_0_9_x.CONTAINER_PATH if folder is None else folder
+    children = []
+    with throttle.scandir(container) as entries:
+        for entry in entries:
+            if not entry.name.startswith(".") and entry.is_dir():
+                if os.path.exists(os.path.join(entry.path, marker)):
+                    children.append(entry.path)
+
+    return children
+
+
+def data_root_of(project: str, version: str) -> Optional[str]:
+    """
+    Args:
+        project (str): Path to the project's root.
+        version (str): Format version of the project.
+
+    Returns:
+        Optional[str]: Path to the project's root container, `None` if it has none.
+    """
+    if version == "0.9.x":
+        return os.path.join(project, convert_0_9_x.DEFAULT_DATA_DIR)
+
+    folder = status.metadata_folder_of(version)
+    properties = common.load_json(os.path.join(project, folder, paths.PROJECT_PROPERTIES_FILE))
+    if not properties.get("data_root"):
+        return None
+
+    return os.path.join(project, properties["data_root"])
+
+
+def estimate_project(
+    project: str,
+    final: str,
+    ctx: ConversionContext,
+    walks: int = DEFAULT_WALKS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    rng: Optional[random.Random] = None,
+) -> Estimate:
+    """Estimates the cost of converting a project's containers.
+
+    Args:
+        project (str): Path to the project's root.
+        final (str): Version to convert to.
+        ctx (ConversionContext): Conversion context.
+        walks (int, optional): Number of random walks. Defaults to DEFAULT_WALKS.
+        confidence (float, optional): Confidence level. Defaults to DEFAULT_CONFIDENCE.
+        rng (Optional[random.Random], optional): Random number generator. Defaults to None.
+
+    Returns:
+        Estimate: Estimated totals for the project.
+
+    Raises:
+        ValueError: If there are no walks, or the project's version can not be determined.
+    """
+    if walks < 1:
+        raise ValueError(f"at least one walk is required, got {walks}")
+
+    rng = rng or random.Random()
+    version = common.project_format_version(project)
+    if version is None:
+        raise ValueError(f"could not determine the version of `{project}`")
+
+    if VERSIONS.index(version) >= VERSIONS.index(final):
+        return empty_estimate(confidence)
+
+    root = data_root_of(project, version)
+    if root is None or not os.path.isdir(root):
+        return empty_estimate(confidence)
+
+    versions = chain_versions(version, final)
+    analysis_map = {}
+    if version == "0.9.x":
+        scripts = os.path.join(project, convert_0_9_x.SCRIPTS_DIR)
+        if os.path.isdir(scripts):
+            analysis_map = {name: str(uuid()) for name in throttle.listdir(scripts)}
+
+    measured: dict[str, Sample] = {}
+    totals: list[Sample] = []
+    scratch = tempfile.mkdtemp(prefix="syre-estimate-")
+    try:
+        for _ in range(walks):
+            total = [0.0] * len(FIELDS)
+            container = root
+            weight = 1.0
+            while True:
+                if container not in measured:
+                    measured[container] = measure_container(
+                        container, versions, analysis_map, scratch, ctx
+                    )
+
+                for (idx, value) in enumerate(measured[container]):
+                    total[idx] += weight * value
+
+                children = child_containers(container, version)
+                if not children:
+                    break
+
+                weight *= len(children)
+                container = rng.choice(children)
+
+            totals.append(tuple(total))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    logger.info(f"[{project}] measured {len(measured)} containers in {walks} walks")
+    means = {}
+    errors = {}
+    for (idx, field) in enumerate(FIELDS):
+        values = [total[idx] for total in totals]
+        means[field] = statistics.fmean(values)
+        errors[field] = statistics.stdev(values) / math.sqrt(len(values)) if len(values) > 1 else 0.0
+
+    return Estimate(means, errors, confidence)
+
+
+def estimate(
+    projects: list[str],
+    final: str,
+    ctx: ConversionContext,
+    walks: int = DEFAULT_WALKS,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: Optional[int] = None,
+) -> dict[str, Estimate]:
+    """Estimates the cost of converting projects.
+
+    Args:
+        projects (list[str]): Paths to the projects.
+        final (str): Version to convert to.
+        ctx (ConversionContext): Conversion context.
+        walks (int, optional): Number of random walks per project. Defaults to DEFAULT_WALKS.
+        confidence (float, optional): Confidence level. Defaults to DEFAULT_CONFIDENCE.
+        seed (Optional[int], optional): Seed of the sample. Defaults to None.
+
+    Returns:
+        dict[str, Estimate]: Estimate of each project.
+    """
+    rng = random.Random(seed)
+    return {
+        project: estimate_project(project, final, ctx, walks, confidence, rng)
+        for project in projects
+    }
+
+
+def format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB", "TiB"):
+        if size < 1024 or unit == "TiB":
+            return f"{size:.1f} {unit}"
+
+        size /= 1024
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    elif seconds < 60:
+        return f"{seconds:.1f} s"
+    elif seconds < 3600:
+        return f"{seconds / 60:.1f} min"
+
+    return f"{seconds / 3600:.1f} h"
+
+
+FORMATS = {
+    "containers": lambda value: f"{value:.0f}",
+    "seconds": format_duration,
+    "files": lambda value: f"{value:.0f}",
+    "bytes": format_bytes,
+}
+
+LABELS = {
+    "containers": "containers",
+    "seconds": "duration",
+    "files": "files touched",
+    "bytes": "bytes written",
+}
+
+
+def print_estimates(estimates: dict[str, Estimate]):
+    """Prints the estimate of each project, and their total.
+
+    Args:
+        estimates (dict[str, Estimate]): Estimates returned by `estimate`.
+    """
+
+    def print_estimate(name: str, estimate: Estimate):
+        print(f"{name}:")
+        for field in FIELDS:
+            (low, high) = estimate.interval(field)
+            fmt = FORMATS[field]
+            print(
+                f"    {LABELS[field]:<14} {fmt(estimate.means[field]):>12}"
+                f"  ({estimate.confidence:.0%} CI {fmt(low)} - {fmt(high)})"
+            )
+
+    total = None
+    for (project, estimate) in estimates.items():
+        print_estimate(project, estimate)
+        total = estimate if total is None else total + estimate
+
+    if total is not None and len(estimates) > 1:
+        print_estimate("total", total)
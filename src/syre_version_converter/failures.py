@@ -0,0 +1,107 @@
+"""
+Failed units of a `--keep-going` run.
+
+A unit is either a project or a container.
+A failed container is skipped by the remaining stages of the run,
+along with its descendants in `0.9.x` projects,
+and the rest of the project continues to be converted.
+Failed units are written to a retry file so only they are converted again.
+"""
+import os
+import json
+import logging
+import threading
+import traceback
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RETRY_FILE = "syre_converter_retry.json"
+
+PROJECT = "project"
+CONTAINER = "container"
+
+
+class Failures:
+    """Thread safe record of failed units."""
+
+    def __init__(self):
+        self.units: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._containers: set[str] = set()
+
+    def record(
+        self,
+        unit: str,
+        path: str,
+        version: Optional[str],
+        err: BaseException,
+    ):
+        """Records a failed unit.
+
+        Args:
+            unit (str): Kind of unit, `PROJECT` or `CONTAINER`.
+            path (str): Path to the project or container.
+            version (Optional[str]): Version the unit was being converted from.
+            err (BaseException): Error the unit failed with.
+        """
+        logger.error(f"[{path}] {unit} failed: {type(err).__name__}: {err}")
+        entry = {
+            "unit": unit,
+            "path": path,
+            "version": version,
+            "error": f"{type(err).__name__}: {err}",
+            "traceback": "".join(traceback.format_exception(err)),
+        }
+        with self._lock:
+            self.units.append(entry)
+            if unit == CONTAINER:
+                self._containers.add(os.path.abspath(path))
+
+    def failed(self, container: str) -> bool:
+        """
+        Args:
+            container (str): Path to a container.
+
+        Returns:
+            bool: If the container failed earlier in the run.
+        """
+        with self._lock:
+            return os.path.abspath(container) in self._containers
+
+    def write(self, path: str, final: str) -> bool:
+        """Writes the failed units to a retry file, if any failed.
+
+        Args:
+            path (str): Path to the retry file.
+            final (str): Version the units were being converted to.
+
+        Returns:
+            bool: If the file was written.
+        """
+        with self._lock:
+            units = list(self.units)
+
+        if not units:
+            return False
+
+        with open(path, "w") as f:
+            json.dump({"final": final, "units": units}, f, indent=4)
+
+        return True
+
+
+def load_retry(path: str) -> tuple[str, list[dict[str, Any]]]:
+    """Loads a retry file.
+
+    Args:
+        path (str): Path to the retry file.
+
+    Returns:
+        tuple[str, list[dict[str, Any]]]: Version the units were being converted to,
+            and the failed units.
+    """
+    with open(path, "r") as f:
+        retry = json.load(f)
+
+    return (retry["final"], retry["units"])
@@ -0,0 +1,277 @@
+"""
+Checks the references between resources of projects.
+
+Every rid of a project, i.e. of the project, its analyses, containers, and assets,
+is collected into one index in a single pass over the project,
+during which the references to rids are collected as well.
+The references are then checked against the index.
++ Duplicate rids are reported at each occurrence after the first.
++ References to rids that do not exist, or that are not an analysis, are reported as dangling.
+
+`0.9.x` projects do not have rids, so analyses are indexed by their file names instead.
+"""
+import os
+import logging
+from typing import Any, Iterator, Optional
+
+from . import paths, common, status, throttle
+from .context import ConversionContext
+from .convert_0_9_x import (
+    ASSET_PATH as ASSET_FILE_0_9_X,
+    CONTAINER_PATH as CONTAINER_FILE_0_9_X,
+    DEFAULT_DATA_DIR as DATA_DIR_0_9_X,
+    SCRIPT_ROOT_PREFIX as SCRIPT_ROOT_PREFIX_0_9_X,
+    SCRIPTS_DIR as SCRIPTS_DIR_0_9_X,
+    SCRIPTS_PATH as SCRIPTS_FILE_0_9_X,
+)
+
+logger = logging.getLogger(__name__)
+
+PROJECT = "project"
+ANALYSIS = "analysis"
+CONTAINER = "container"
+ASSET = "asset"
+
+
+class RidIndex:
+    """Index of the rids of a project, and the references to them."""
+
+    def __init__(self):
+        # rid -> (kind, path, location)
+        self.rids: dict[str, tuple[str, str, str]] = {}
+        # (path, location, rid)
+        self.references: list[tuple[str, str, str]] = []
+        self.errors: dict[str, list[str]] = {}
+
+    def add(self, rid: Any, kind: str, path: str, at: str):
+        """Indexes a rid, reporting it if already indexed.
+
+        Args:
+            rid (Any): Rid of the resource.
+            kind (str): Kind of the resource.
+            path (str): File the resource is in.
+            at (str): Location of the rid in the file.
+        """
+        if not isinstance(rid, str):
+            self.error(path, f"{at}: invalid rid `{rid}`")
+            return
+
+        first = self.rids.setdefault(rid, (kind, path, at))
+        if first[1:] != (path, at):
+            (first_kind, first_path, first_at) = first
+            self.error(
+                path,
+                f"{at}: duplicate rid `{rid}`, "
+                f"already used by {first_kind} at `{first_path}` {first_at}",
+            )
+
+    def refer(self, rid: Any, path: str, at: str):
+        """Records a reference to an analysis.
+
+        Args:
+            rid (Any): Referenced rid.
+            path (str): File the reference is in.
+            at (str): Location of the reference in the file.
+        """
+        self.references.append((path, at, rid))
+
+    def error(self, path: str, message: str):
+        """Reports an error in a file."""
+        self.errors.setdefault(path, []).append(message)
+
+    def check(self) -> dict[str, list[str]]:
+        """Checks the references against the index.
+
+        Returns:
+            dict[str, list[str]]: Map from file to its errors.
+        """
+        for (path, at, rid) in self.references:
+            if not isinstance(rid, str):
+                self.error(path, f"{at}: invalid rid `{rid}`")
+                continue
+
+            target = self.rids.get(rid)
+            if target is None:
+                self.error(path, f"{at}: dangling reference to `{rid}`")
+            elif target[0] != ANALYSIS:
+                self.error(path, f"{at}: reference to `{rid}` is a {target[0]}, not an analysis")
+
+        return self.errors
+
+
+def items_of(document: Any, at: str = "$") -> Iterator[tuple[Optional[str], Any, str]]:
+    """Iterates over a document that is either a list, or an object keyed by rid.
+
+    Args:
+        document (Any): List or object.
+        at (str, optional): Location of the document. Defaults to "$".
+
+    Yields:
+        tuple[Optional[str], Any, str]: Key, `None` for lists, value, and location of each item.
+    """
+    if isinstance(document, list):
+        for (idx, item) in enumerate(document):
+            yield (None, item, f"{at}[{idx}]")
+    elif isinstance(document, dict):
+        for (key, item) in document.items():
+            yield (key, item, f"{at}.{key}")
+
+
+def load(path: str, index: RidIndex) -> Any:
+    """
+    Args:
+        path (str): Path to a JSON file.
+        index (RidIndex): Index to report an unreadable file to.
+
+    Returns:
+        Any: The file's document, or `None` if it could not be read.
+    """
+    try:
+        return common.load_json(path)
+    except (OSError, ValueError) as err:
+        index.error(path, f"could not read: {err}")
+        return None
+
+
+def index_analyses(path: str, index: RidIndex):
+    analyses = load(path, index)
+    for (_, analysis, at) in items_of(analyses):
+        if isinstance(analysis, dict):
+            index.add(analysis.get("rid"), ANALYSIS, path, f"{at}.rid")
+
+
+def index_container(properties_path: str, folder: str, index: RidIndex):
+    container = load(properties_path, index)
+    if isinstance(container, dict):
+        index.add(container.get("rid"), CONTAINER, properties_path, "$.rid")
+        for key in ("analyses", "scripts"):
+            for (rid, association, at) in items_of(container.get(key), f"$.{key}"):
+                if rid is None:
+                    if not isinstance(association, dict):
+                        index.error(properties_path, f"{at}: invalid association")
+                        continue
+
+                    rid = association.get("analysis", association.get("script"))
+                    at = f"{at}.analysis" if "analysis" in association else f"{at}.script"
+
+                index.refer(rid, properties_path, at)
+
+    base_path = os.path.dirname(os.path.dirname(properties_path))
+    assets_path = os.path.join(base_path, folder, paths.ASSETS_FILE)
+    assets = load(assets_path, index)
+    for (_, asset, at) in items_of(assets):
+        if not isinstance(asset, dict):
+            continue
+
+        index.add(asset.get("rid"), ASSET, assets_path, f"{at}.rid")
+        creator = (asset.get("properties") or {}).get("creator")
+        if isinstance(creator, dict) and "Script" in creator:
+            index.refer(creator["Script"], assets_path, f"{at}.properties.creator.Script")
+
+
+def check_project(project: str, ctx: ConversionContext) -> dict[str, list[str]]:
+    """Checks the references of a project in a single pass.
+
+    Args:
+        project (str): Path to the project's root.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        dict[str, list[str]]: Map from file to its errors.
+            Projects that pass have no entries.
+    """
+    version = common.project_format_version(project)
+    if version == "0.9.x":
+        return check_project_0_9_x(project, ctx)
+
+    folder = status.metadata_folder_of(version)
+    if folder is None:
+        return {project: ["unknown format version"]}
+
+    index = RidIndex()
+    properties_path = os.path.join(project, folder, paths.PROJECT_PROPERTIES_FILE)
+    properties = load(properties_path, index)
+    if not isinstance(properties, dict):
+        return index.errors
+
+    index.add(properties.get("rid"), PROJECT, properties_path, "$.rid")
+    # NOTE: Analyses are in `scripts.json` before `0.10.2`.
+    for analyses_file in (paths.PROJECT_ANALYSES_FILE, "scripts.json"):
+        analyses_path = os.path.join(project, folder, analyses_file)
+        if os.path.exists(analyses_path):
+            index_analyses(analyses_path, index)
+            break
+
+    if not properties.get("data_root"):
+        index.error(properties_path, "$.data_root: not set")
+        return index.errors
+
+    data_root = os.path.join(project, properties["data_root"])
+    container_file = os.path.join(folder, paths.CONTAINER_PROPERTIES_FILE)
+    for container_path in ctx.find_files(data_root, container_file):
+        index_container(container_path, folder, index)
+
+    return index.check()
+
+
+def check_project_0_9_x(project: str, ctx: ConversionContext) -> dict[str, list[str]]:
+    """Checks the references of a `0.9.x` project to its scripts, by file name.
+
+    Args:
+        project (str): Path to the project's root.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        dict[str, list[str]]: Map from file to its errors.
+    """
+    index = RidIndex()
+    scripts_path = os.path.join(project, SCRIPTS_DIR_0_9_X)
+    try:
+        scripts = throttle.listdir(scripts_path)
+    except OSError:
+        scripts = []
+
+    for script in scripts:
+        if script.endswith(".py"):
+            index.add(script, ANALYSIS, scripts_path, script)
+
+    data_root = os.path.join(project, DATA_DIR_0_9_X)
+    for container_path in ctx.find_files(data_root, CONTAINER_FILE_0_9_X):
+        scripts_file = os.path.join(os.path.dirname(container_path), SCRIPTS_FILE_0_9_X)
+        if not os.path.exists(scripts_file):
+            continue
+
+        for (_, association, at) in items_of(load(scripts_file, index)):
+            script = association.get("script") if isinstance(association, dict) else None
+            if isinstance(script, str) and script.startswith(SCRIPT_ROOT_PREFIX_0_9_X):
+                script = script.removeprefix(SCRIPT_ROOT_PREFIX_0_9_X)
+
+            index.refer(script, scripts_file, f"{at}.script")
+
+    for asset_path in ctx.find_files(data_root, ASSET_FILE_0_9_X):
+        asset = load(asset_path, index)
+        if isinstance(asset, dict) and asset.get("creator_type") == "script":
+            creator = asset.get("creator")
+            if creator is not None:
+                index.refer(os.path.basename(creator), asset_path, "$.creator")
+
+    return index.check()
+
+
+def check(projects: list[str], ctx: ConversionContext) -> dict[str, dict[str, list[str]]]:
+    """Checks the references of projects.
+
+    Args:
+        projects (list[str]): Paths to the projects.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        dict[str, dict[str, list[str]]]: Map from project to its files with errors,
+            in the format of `verify.verify`.
+    """
+    report = {}
+    for project in projects:
+        logger.info(f"[{project}] checking references")
+        report[project] = check_project(project, ctx)
+
+    return report
@@ -0,0 +1,384 @@
+"""
+Advisory locks for projects and containers.
+
+A lock is a file in the metadata folder of a project or container,
+`.thot` if it exists, otherwise `.syre`, so it moves with the folder when
+`.thot` is renamed. Held locks are refreshed periodically and are considered
+stale if their owner process is gone or they have not been refreshed in time.
+A metadata folder created for a lock is removed with it if nothing else was written to it.
+"""
+import os
+import json
+import time
+import errno
+import socket
+import logging
+import threading
+from typing import Any, Callable, Optional
+from uuid import uuid4 as uuid
+
+from . import paths, common, trace
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILE = "converter.lock"
+THOT_FOLDER = ".thot"
+DEFAULT_TIMEOUT = 300.0
+STALE_AFTER = 120.0
+POLL_INTERVAL = 0.1
+
+
+class LockMetrics:
+    """Aggregate lock statistics of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.contended = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.stale_broken = 0
+        self.timeouts = 0
+
+    def record_wait(self, wait: float, contended: bool):
+        with self._lock:
+            self.acquired += 1
+            self.contended += int(contended)
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def record_stale(self):
+        with self._lock:
+            self.stale_broken += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def log(self):
+        logger.info(
+            f"locks acquired: {self.acquired}, contended: {self.contended}, "
+            f"wait: {self.total_wait:.3f}s total, {self.max_wait:.3f}s max, "
+            f"stale broken: {self.stale_broken}, timeouts: {self.timeouts}"
+        )
+
+
+METRICS = LockMetrics()
+
+_held: set["Lock"] = set()
+_held_lock = threading.Lock()
+
+
+def metadata_dir_of(base_path: str) -> str:
+    """
+    Args:
+        base_path (str): Path to a project or container.
+
+    Returns:
+        str: Path to the `.thot` folder if it exists, otherwise the `.syre` folder.
+    """
+    thot_path = os.path.join(base_path, THOT_FOLDER)
+    if os.path.isdir(thot_path):
+        return thot_path
+
+    return paths.syre_dir_of(base_path)
+
+
+def pid_alive(pid: int) -> bool:
+    """
+    Args:
+        pid (int): Process id.
+
+    Returns:
+        bool: If a process with the id exists on this host.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        return True
+
+    return True
+
+
+class Lock:
+    """Advisory lock on a project or container folder."""
+
+    def __init__(
+        self,
+        base_path: str,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        stale_after: float = STALE_AFTER,
+        system: Optional[str] = None,
+    ):
+        """
+        Args:
+            base_path (str): Path to the project or container.
+            timeout (Optional[float], optional): Maximum time to wait for the lock in seconds.
+                `None` waits indefinitely. Defaults to DEFAULT_TIMEOUT.
+            stale_after (float, optional): Time in seconds after which a lock
+                that has not been refreshed is considered stale. Defaults to STALE_AFTER.
+            system (Optional[str], optional): System the folder belongs to,
+                used to hide a metadata folder created for the lock.
+                Defaults to the current system.
+        """
+        self.base_path = base_path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.system = paths.get_system() if system is None else system
+        self._created_dir: Optional[str] = None
+        self._owner = {"host": socket.gethostname(), "pid": os.getpid(), "token": str(uuid())}
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def path(self) -> str:
+        """
+        Returns:
+            str: Current path of the lock file.
+        """
+        return os.path.join(metadata_dir_of(self.base_path), LOCK_FILE)
+
+    def acquire(self):
+        """Acquires the lock, waiting for it if held elsewhere.
+
+        Raises:
+            NotADirectoryError: If the path is not a folder.
+            TimeoutError: If the lock could not be acquired within the timeout.
+        """
+        if not os.path.isdir(self.base_path):
+            raise NotADirectoryError(f"can not lock `{self.base_path}`, it is not a folder")
+
+        with trace.span("lock", "lock", path=self.base_path):
+            try:
+                self._wait()
+            except BaseException:
+                self._remove_created_dir()
+                raise
+
+        self._stop.clear()
+        self._heartbeat = threading.Thread(target=self._refresh, daemon=True)
+        self._heartbeat.start()
+        with _held_lock:
+            _held.add(self)
+
+    def release(self):
+        """Releases the lock if it is held by this object."""
+        self._stop.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+            self._heartbeat = None
+
+        with _held_lock:
+            _held.discard(self)
+
+        path = self.path()
+        if self._read(path).get("token") == self._owner["token"]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        self._remove_created_dir()
+
+    def owner(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Owner of the lock as recorded in the lock file.
+        """
+        return self._read(self.path())
+
+    def __enter__(self) -> "Lock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *_):
+        self.release()
+
+    def _wait(self):
+        """Waits until the lock file is created by this object."""
+        start = time.monotonic()
+        contended = False
+        while True:
+            if self._try_create():
+                METRICS.record_wait(time.monotonic() - start, contended)
+                return
+
+            contended = True
+            if self._break_if_stale():
+                continue
+
+            if self.timeout is not None and time.monotonic() - start > self.timeout:
+                METRICS.record_timeout()
+                raise TimeoutError(f"could not lock `{self.base_path}`, held by {self.owner()}")
+
+            time.sleep(POLL_INTERVAL)
+
+    def _try_create(self) -> bool:
+        path = self.path()
+        metadata_dir = os.path.dirname(path)
+        if not os.path.exists(metadata_dir):
+            try:
+                os.mkdir(metadata_dir)
+            except FileExistsError:
+                pass
+            except FileNotFoundError:
+                raise NotADirectoryError(f"can not lock `{self.base_path}`, it was removed")
+            else:
+                self._created_dir = metadata_dir
+                if self.system == "Windows":
+                    common.hide_dir(metadata_dir)
+
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        except FileNotFoundError:
+            # NOTE: The metadata folder was renamed, e.g. `.thot` to `.syre`.
+            return False
+
+        with os.fdopen(fd, "w") as f:
+            json.dump({**self._owner, "created": time.time()}, f)
+
+        return True
+
+    def _remove_created_dir(self):
+        if self._created_dir is None:
+            return
+
+        try:
+            os.rmdir(self._created_dir)
+        except OSError:
+            # NOTE: Not empty, e.g. the conversion wrote its files to it.
+            pass
+
+        self._created_dir = None
+
+    def _read(self, path: str) -> dict[str, Any]:
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _is_stale(self, path: str) -> bool:
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except FileNotFoundError:
+            return False
+
+        if age > self.stale_after:
+            return True
+
+        owner = self._read(path)
+        if owner.get("host") == self._owner["host"] and isinstance(owner.get("pid"), int):
+            return not pid_alive(owner["pid"])
+
+        return False
+
+    def _break_if_stale(self) -> bool:
+        path = self.path()
+        if not self._is_stale(path):
+            return False
+
+        # NOTE: Rename before removing so only one waiter can break the lock.
+        broken_path = f"{path}.{self._owner['token']}"
+        try:
+            os.rename(path, broken_path)
+        except OSError as err:
+            if err.errno == errno.ENOENT:
+                return True
+            raise
+
+        if not self._is_stale(broken_path):
+            # Another waiter replaced the stale lock in the meantime, restore it.
+            try:
+                os.link(broken_path, path)
+            except OSError:
+                pass
+            os.remove(broken_path)
+            return False
+
+        logger.warning(f"breaking stale lock of `{self.base_path}` held by {self._read(broken_path)}")
+        os.remove(broken_path)
+        METRICS.record_stale()
+        return True
+
+    def _refresh(self):
+        while not self._stop.wait(self.stale_after / 4):
+            try:
+                os.utime(self.path())
+            except OSError:
+                pass
+
+
+def release_all():
+    """Releases all locks held by this process."""
+    with _held_lock:
+        held = list(_held)
+
+    for lock in held:
+        lock.release()
+
+
+def locked_stages(
+    read: Callable[[str], Any],
+    transform: Callable[[Any], Any],
+    write: Callable[[Any], None],
+    container_of: Callable[[str], str],
+    timeout: Optional[float] = DEFAULT_TIMEOUT,
+    system: Optional[str] = None,
+) -> tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+    """Wraps pipeline stages to hold a container's lock from reading until writing.
+
+    Args:
+        read (Callable[[str], Any]): Reader stage.
+        transform (Callable[[Any], Any]): Transform stage.
+        write (Callable[[Any], None]): Writer stage.
+        container_of (Callable[[str], str]): Maps a source item to its container path.
+        timeout (Optional[float], optional): Lock timeout. Defaults to DEFAULT_TIMEOUT.
+        system (Optional[str], optional): System the containers belong to.
+            Defaults to the current system.
+
+    Returns:
+        tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+            Wrapped reader, transform, and writer stages.
+    """
+
+    def locked_read(item: str) -> Any:
+        lock = Lock(container_of(item), timeout=timeout, system=system)
+        lock.acquire()
+        try:
+            result = read(item)
+        except BaseException:
+            lock.release()
+            raise
+
+        if result is None:
+            lock.release()
+            return None
+
+        return (lock, result)
+
+    def locked_transform(item: tuple[Lock, Any]) -> Any:
+        (lock, value) = item
+        try:
+            result = transform(value)
+        except BaseException:
+            lock.release()
+            raise
+
+        if result is None:
+            lock.release()
+            return None
+
+        return (lock, result)
+
+    def locked_write(item: tuple[Lock, Any]):
+        (lock, value) = item
+        try:
+            write(value)
+        finally:
+            lock.release()
+
+    return (locked_read, locked_transform, locked_write)
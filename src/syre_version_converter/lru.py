@@ -0,0 +1,90 @@
+"""
+Bounded least recently used cache, with hit rate statistics.
+"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+
+class LruCache(Generic[V]):
+    """Maps keys to values, evicting the least recently used entry once full.
+    Safe to share between threads.
+    """
+
+    def __init__(self, name: str, maxsize: int):
+        """
+        Args:
+            name (str): Name of the cache in its statistics.
+            maxsize (int): Maximum number of entries. `0` disables the cache.
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], V]) -> V:
+        """
+        Args:
+            key (Hashable): Key of the value.
+            compute (Callable[[], V]): Computes the value if it is not cached.
+                Called without holding the cache's lock,
+                so concurrent misses of the same key may each compute it.
+
+        Returns:
+            V: The cached or computed value.
+        """
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = compute()
+        if self.maxsize <= 0:
+            return value
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+        return value
+
+    def clear(self):
+        """Removes all entries. Statistics are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        Returns:
+            float: Fraction of lookups that were hits, `0` if there were none.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def log(self):
+        """Logs the statistics of the cache, if it was used."""
+        if self.hits + self.misses == 0:
+            return
+
+        logger.info(
+            f"{self.name} cache hits: {self.hits}, misses: {self.misses}, "
+            f"hit rate: {self.hit_rate:.1%}, evictions: {self.evictions}, "
+            f"entries: {len(self._entries)}/{self.maxsize}"
+        )
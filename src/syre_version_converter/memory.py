@@ -0,0 +1,189 @@
+"""
+Memory budget for conversion runs.
+
+Memory use is sampled from the process' resident set size when available,
+otherwise, if enabled, from `tracemalloc`, which slows the whole process down.
+Samples are reused for a short interval, as they are taken for every item queued.
+Queue sizes, worker counts, and whether large files are streamed are adjusted to stay under the budget.
+"""
+import os
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+SIZE_UNITS = {
+    "": 1,
+    "K": 1024,
+    "M": 1024**2,
+    "G": 1024**3,
+    "T": 1024**4,
+}
+
+# Approximate size of a parsed JSON document relative to its file size.
+JSON_EXPANSION = 8
+
+STATM_PATH = "/proc/self/statm"
+
+# Seconds a memory sample is reused for.
+SAMPLE_INTERVAL = 0.05
+
+
+def parse_size(size: str) -> int:
+    """Parses a size with an optional unit suffix, e.g. `512M` or `2G`.
+
+    Args:
+        size (str): Size to parse.
+
+    Returns:
+        int: Size in bytes.
+    """
+    size = size.strip().upper().removesuffix("B").removesuffix("I")
+    unit = size[-1:] if size[-1:] in SIZE_UNITS else ""
+    value = size[: len(size) - len(unit)]
+    try:
+        return int(float(value) * SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"invalid size `{size}`")
+
+
+def rss() -> Optional[int]:
+    """
+    Returns:
+        Optional[int]: Current resident set size of the process in bytes,
+            or `None` if it is not available.
+    """
+    try:
+        with open(STATM_PATH, "r") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class MemoryBudget:
+    """Tracks memory use against a maximum and adapts work to stay under it."""
+
+    def __init__(self, max_bytes: int, trace_allocations: bool = False):
+        """
+        Args:
+            max_bytes (int): Maximum memory to use in bytes.
+            trace_allocations (bool, optional): Measure memory use with `tracemalloc`
+                if the resident set size is not available. Defaults to False,
+                in which case memory use is unknown and work is not adapted.
+        """
+        self.max_bytes = max_bytes
+        self.peaks: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stages: list[str] = []
+        self._use_rss = rss() is not None
+        self._use_tracemalloc = not self._use_rss and trace_allocations
+        self._current = 0
+        self._sampled_at: Optional[float] = None
+        if not self._use_rss and not trace_allocations:
+            logger.warning(
+                "memory use is not available on this system, "
+                "use `--trace-allocations` to measure it with `tracemalloc`"
+            )
+        if self._use_tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def usage(self) -> int:
+        """Current memory use, sampled at most every `SAMPLE_INTERVAL` seconds.
+
+        Returns:
+            int: Current memory use in bytes.
+        """
+        with self._lock:
+            if (
+                self._sampled_at is not None
+                and time.monotonic() - self._sampled_at < SAMPLE_INTERVAL
+            ):
+                return self._current
+
+        return self.sample()
+
+    def sample(self) -> int:
+        """Samples current memory use, recording it against the active stages.
+
+        Returns:
+            int: Current memory use in bytes.
+        """
+        if self._use_rss:
+            current = rss() or 0
+        elif self._use_tracemalloc:
+            (current, _) = tracemalloc.get_traced_memory()
+        else:
+            current = 0
+
+        with self._lock:
+            self._current = current
+            self._sampled_at = time.monotonic()
+            for stage in self._stages:
+                self.peaks[stage] = max(self.peaks.get(stage, 0), current)
+
+        return current
+
+    def pressure(self) -> float:
+        """
+        Returns:
+            float: Fraction of the budget in use.
+        """
+        return self.usage() / self.max_bytes
+
+    def scale(self, default: int) -> int:
+        """Scales a batch size or worker count to the current memory pressure.
+
+        Args:
+            default (int): Value to use when there is no memory pressure.
+
+        Returns:
+            int: Scaled value, at least 1.
+        """
+        pressure = self.pressure()
+        if pressure >= 0.9:
+            return 1
+        elif pressure >= 0.75:
+            return max(default // 4, 1)
+        elif pressure >= 0.5:
+            return max(default // 2, 1)
+
+        return default
+
+    def should_stream(self, file_size: int) -> bool:
+        """
+        Args:
+            file_size (int): Size of a JSON file in bytes.
+
+        Returns:
+            bool: If the file should be streamed rather than loaded whole.
+        """
+        headroom = self.max_bytes - self.usage()
+        return file_size * JSON_EXPANSION > headroom / 2
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Records peak memory use while the stage is active.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        with self._lock:
+            self._stages.append(name)
+        self.sample()
+        try:
+            yield
+        finally:
+            self.sample()
+            with self._lock:
+                self._stages.remove(name)
+
+    def log_peaks(self):
+        """Logs the peak memory use of each stage."""
+        for (stage, peak) in self.peaks.items():
+            logger.info(f"[{stage}] peak memory {peak / SIZE_UNITS['M']:.1f} MiB")
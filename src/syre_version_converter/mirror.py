@@ -0,0 +1,161 @@
+"""
+Mirrors a project into a new tree for out-of-place conversion.
+
+Metadata files, which converters rewrite, are copied.
+All other files are hardlinked, or reflinked or copied if hardlinking is not possible,
+so the source project is never modified.
+"""
+import os
+import errno
+import logging
+import shutil
+
+from . import paths, throttle
+from .lock import LOCK_FILE
+from .convert_0_9_x import ASSET_PATH, CONTAINER_PATH, SCRIPTS_PATH
+
+logger = logging.getLogger(__name__)
+
+METADATA_FOLDERS = {paths.SYRE_FOLDER, ".thot"}
+METADATA_FILES = {ASSET_PATH, CONTAINER_PATH, SCRIPTS_PATH}
+
+# Linux `FICLONE` ioctl.
+FICLONE = 0x40049409
+
+
+def is_metadata(relative_path: str) -> bool:
+    """
+    Args:
+        relative_path (str): Path relative to the project root.
+
+    Returns:
+        bool: If the file is metadata that a converter may rewrite.
+    """
+    parts = os.path.normpath(relative_path).split(os.sep)
+    if parts[-1] in METADATA_FILES:
+        return True
+
+    return any(part in METADATA_FOLDERS for part in parts[:-1])
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Creates a copy-on-write clone of a file, if supported.
+
+    Args:
+        src (str): Source file.
+        dst (str): Destination file. Must not exist.
+
+    Returns:
+        bool: If the clone was created.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    with throttle.open(src, "rb") as f_src:
+        with throttle.open(dst, "xb") as f_dst:
+            try:
+                fcntl.ioctl(f_dst.fileno(), FICLONE, f_src.fileno())
+                return True
+            except OSError:
+                pass
+
+    os.remove(dst)
+    return False
+
+
+def link_file(src: str, dst: str):
+    """Links a data file into the destination without copying its contents, if possible.
+    Tries a hardlink, then a reflink, then falls back to a copy.
+
+    Args:
+        src (str): Source file.
+        dst (str): Destination file.
+    """
+    try:
+        os.link(src, dst)
+        return
+    except OSError as err:
+        if err.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+
+    if not reflink(src, dst):
+        throttle.charge(ops=0, nbytes=os.stat(src).st_size)
+        shutil.copy2(src, dst)
+
+
+def destination_of(project: str, output_root: str) -> str:
+    """
+    Args:
+        project (str): Path to the project's root.
+        output_root (str): Root folder for converted projects.
+
+    Returns:
+        str: Path the project is mirrored to.
+    """
+    return os.path.join(output_root, os.path.basename(os.path.normpath(project)))
+
+
+def check_destinations(projects: list[str], output_root: str):
+    """Checks that projects are mirrored to different folders.
+    Projects are mirrored to a folder with the same name, so projects with the same name collide.
+
+    Args:
+        projects (list[str]): Paths to the projects' roots.
+        output_root (str): Root folder for converted projects.
+
+    Raises:
+        ValueError: If several projects would be mirrored to the same folder.
+    """
+    sources: dict[str, set[str]] = {}
+    for project in projects:
+        sources.setdefault(destination_of(project, output_root), set()).add(
+            os.path.abspath(project)
+        )
+
+    for (dst, srcs) in sources.items():
+        if len(srcs) > 1:
+            names = ", ".join(f"`{src}`" for src in sorted(srcs))
+            raise ValueError(
+                f"projects {names} would all be mirrored to `{dst}`, "
+                "convert them into different output folders"
+            )
+
+
+def mirror_project(src: str, dst: str) -> str:
+    """Mirrors a project into a new tree.
+
+    Args:
+        src (str): Path to the project's root.
+        dst (str): Path to mirror the project to. Must not exist, or be empty.
+
+    Returns:
+        str: Path to the mirrored project.
+
+    Raises:
+        FileExistsError: If the destination is not empty.
+    """
+    if os.path.exists(dst) and len(throttle.listdir(dst)) > 0:
+        raise FileExistsError(f"destination `{dst}` is not empty")
+
+    logger.info(f"mirroring `{src}` to `{dst}`")
+    for (root, dirs, files) in os.walk(src):
+        throttle.charge()
+        relative_root = os.path.relpath(root, src)
+        dst_root = os.path.normpath(os.path.join(dst, relative_root))
+        os.makedirs(dst_root, exist_ok=True)
+        for file in files:
+            if file == LOCK_FILE:
+                continue
+
+            src_file = os.path.join(root, file)
+            dst_file = os.path.join(dst_root, file)
+            if is_metadata(os.path.join(relative_root, file)):
+                # NOTE: Only the contents are copied so the copy is writable
+                # even if the source is read-only.
+                throttle.copyfile(src_file, dst_file)
+            else:
+                link_file(src_file, dst_file)
+
+    return dst
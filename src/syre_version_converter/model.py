@@ -0,0 +1,96 @@
+"""
+Compact in-memory model of assets.
+
+Assets created during a conversion are held as slotted objects rather than nested dicts,
+and only expanded to JSON documents one at a time as they are written.
+Fields shared by many assets, e.g. empty tags, creators, and creation times, are shared.
+
+See `benchmarks` for the memory use of the model compared to plain dicts.
+"""
+from typing import Any, Optional
+
+USER_CREATOR = ("User", None)
+
+
+class Asset:
+    """An asset in the `0.11.0` format."""
+
+    __slots__ = (
+        "rid",
+        "created",
+        "creator",
+        "name",
+        "kind",
+        "description",
+        "tags",
+        "metadata",
+        "path",
+    )
+
+    def __init__(
+        self,
+        rid: str,
+        path: str,
+        created: Optional[str] = None,
+        creator: tuple[str, Optional[str]] = USER_CREATOR,
+        name: Optional[str] = None,
+        kind: Optional[str] = None,
+        description: Optional[str] = None,
+        tags: tuple[str, ...] = (),
+        metadata: Optional[dict[str, Any]] = None,
+    ):
+        """
+        Args:
+            rid (str): Resource id.
+            path (str): Path of the asset's file relative to its container.
+            created (Optional[str], optional): Creation timestamp. Defaults to None.
+            creator (tuple[str, Optional[str]], optional): Kind of creator,
+                `"User"` or `"Script"`, and its id. Defaults to USER_CREATOR.
+            name (Optional[str], optional): Name. Defaults to None.
+            kind (Optional[str], optional): Kind. Defaults to None.
+            description (Optional[str], optional): Description. Defaults to None.
+            tags (tuple[str, ...], optional): Tags. Defaults to ().
+            metadata (Optional[dict[str, Any]], optional): Metadata,
+                `None` if empty. Defaults to None.
+        """
+        self.rid = rid
+        self.path = path
+        self.created = created
+        self.creator = creator
+        self.name = name
+        self.kind = kind
+        self.description = description
+        self.tags = tags
+        self.metadata = metadata or None
+
+    def to_json(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: The asset's JSON document.
+        """
+        (creator_kind, creator_id) = self.creator
+        return {
+            "rid": self.rid,
+            "properties": {
+                "created": self.created,
+                "creator": {creator_kind: creator_id},
+                "name": self.name,
+                "kind": self.kind,
+                "description": self.description,
+                "tags": list(self.tags),
+                "metadata": {} if self.metadata is None else self.metadata,
+            },
+            "path": self.path,
+        }
+
+
+def json_default(obj: Any) -> Any:
+    """`default` for `json.dump`, serializing model objects.
+
+    Raises:
+        TypeError: If the object is not serializable.
+    """
+    if isinstance(obj, Asset):
+        return obj.to_json()
+
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
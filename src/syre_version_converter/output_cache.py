@@ -0,0 +1,276 @@
+"""
+Content addressed cache of converted container files.
+
+Projects cloned from templates contain many byte identical container files.
+Each container's input files are hashed along with the version they are converted from,
+and the converted files are stored under the hash,
+so identical containers are parsed and transformed only once, across projects and runs.
+
+Entries are files in a directory, evicted least recently used first
+once the cache grows past its size limit.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Iterator, Optional
+
+from . import common, throttle, trace
+from .model import json_default
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 1024**3
+# Containers whose input files are larger than this in total are not cached.
+MAX_ENTRY_BYTES = 4 * 1024**2
+# Changing how a version is converted must change this, so stale entries are not used.
+FORMAT = "1"
+LOW_WATER = 0.9
+
+HIT = "hit"
+MISS = "miss"
+BYPASS = "bypass"
+
+
+class OutputCache:
+    """Maps the hash of a container's input files to its converted files.
+    Safe to share between threads and processes.
+    """
+
+    def __init__(self, root: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root (str): Directory of the cache, created if it does not exist.
+            max_bytes (int, optional): Size the cache is kept under. Defaults to DEFAULT_MAX_BYTES.
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self._size = sum(size for (_, _, size) in self._entries())
+        if self._size > max_bytes:
+            self.evict()
+
+    def key(self, step: str, files: dict[str, bytes]) -> str:
+        """
+        Args:
+            step (str): Version the files are converted from.
+            files (dict[str, bytes]): Map from path relative to the container to contents.
+
+        Returns:
+            str: Key of the files.
+        """
+        digest = hashlib.sha256(f"{FORMAT}\0{step}\0".encode())
+        for (role, contents) in sorted(files.items()):
+            digest.update(f"{role}\0{len(contents)}\0".encode())
+            digest.update(contents)
+
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[dict[str, str]]:
+        """
+        Args:
+            key (str): Key of the entry.
+
+        Returns:
+            Optional[dict[str, str]]: Map from path relative to the container to converted contents,
+                or `None` if the entry does not exist.
+        """
+        path = self._path_of(key)
+        try:
+            with open(path, "rb") as f:
+                outputs = json.loads(f.read())
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        return outputs
+
+    def put(self, key: str, outputs: dict[str, str]):
+        """
+        Args:
+            key (str): Key of the entry.
+            outputs (dict[str, str]): Map from path relative to the container to converted contents.
+        """
+        path = self._path_of(key)
+        contents = json.dumps(outputs).encode()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        path_tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(path_tmp, "wb") as f:
+            f.write(contents)
+
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+
+        os.replace(path_tmp, path)
+        with self._lock:
+            self._size += len(contents) - replaced
+            over = self._size > self.max_bytes
+
+        if over:
+            self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache is well under its size limit."""
+        entries = sorted(self._entries())
+        size = sum(size for (_, _, size) in entries)
+        for (_, path, entry_size) in entries:
+            if size <= self.max_bytes * LOW_WATER:
+                break
+
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+            size -= entry_size
+            with self._lock:
+                self.evicted += 1
+
+        with self._lock:
+            self._size = size
+
+    def stages(
+        self,
+        step: str,
+        files: list[str],
+        read: Callable[[str], Any],
+        load: Callable[[str, dict[str, bytes]], Any],
+        transform: Callable[[Any], Any],
+        container_of: Callable[[str], str],
+    ) -> tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+        """Wraps pipeline stages so containers are looked up in the cache before being converted.
+        The transform must return `None` or a map from file path to document, as written by
+        `pipeline.write_documents`.
+
+        Args:
+            step (str): Version the stages convert from.
+            files (list[str]): Paths of the files the stages read, relative to the container.
+            read (Callable[[str], Any]): Reader stage, used for containers that are not cached.
+            load (Callable[[str, dict[str, bytes]], Any]): Loads a source item from
+                the contents of its files, which were already read to look them up.
+            transform (Callable[[Any], Any]): Transform stage.
+            container_of (Callable[[str], str]): Maps a source item to its container path.
+
+        Returns:
+            tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+                Reader, transform, and writer stages.
+        """
+
+        def cached_read(item: str) -> Any:
+            container = container_of(item)
+            inputs = self._read_inputs(container, files)
+            if inputs is None:
+                with self._lock:
+                    self.bypassed += 1
+                return (BYPASS, container, None, read(item))
+
+            key = self.key(step, inputs)
+            outputs = self.get(key)
+            if outputs is not None:
+                with self._lock:
+                    self.hits += 1
+                return (HIT, container, key, outputs) if outputs else None
+
+            with self._lock:
+                self.misses += 1
+            return (MISS, container, key, load(item, inputs))
+
+        def cached_transform(item: tuple[str, str, Optional[str], Any]) -> Any:
+            (kind, container, key, value) = item
+            if kind == HIT:
+                return (container, value)
+
+            documents = None if value is None else transform(value)
+            outputs = {}
+            for (path, document) in (documents or {}).items():
+                role = os.path.relpath(path, container)
+                if isinstance(document, (bytes, Iterator)):
+                    outputs[role] = document
+                else:
+                    outputs[role] = json.dumps(document, indent=4, default=json_default)
+
+            # NOTE: Documents patched as bytes are cheap to convert again,
+            # and streamed documents are too large to cache, so neither is cached.
+            if kind == MISS and all(isinstance(output, str) for output in outputs.values()):
+                self.put(key, outputs)
+
+            return (container, outputs) if outputs else None
+
+        def cached_write(item: tuple[str, dict[str, Any]]):
+            (container, outputs) = item
+            for (role, contents) in outputs.items():
+                path = os.path.join(container, role)
+                if not isinstance(contents, str):
+                    common.write_document(path, contents)
+                    continue
+
+                with trace.span("json.dump", "json", path=path):
+                    with throttle.open(path, "w") as f:
+                        f.write(contents)
+
+        cached_read.__name__ = read.__name__
+        cached_transform.__name__ = transform.__name__
+        cached_write.__name__ = "write_documents"
+        return (cached_read, cached_transform, cached_write)
+
+    def log(self):
+        """Logs how many containers were converted from the cache."""
+        logger.info(
+            f"output cache: {self.hits} hits, {self.misses} misses, {self.bypassed} bypassed, "
+            f"{self.evicted} evicted, {self._size} bytes"
+        )
+
+    def _read_inputs(self, container: str, files: list[str]) -> Optional[dict[str, bytes]]:
+        """
+        Returns:
+            Optional[dict[str, bytes]]: Contents of the files,
+                or `None` if one is missing or they are too large to cache.
+        """
+        try:
+            size = sum(os.path.getsize(os.path.join(container, role)) for role in files)
+        except FileNotFoundError:
+            return None
+
+        if size > MAX_ENTRY_BYTES:
+            return None
+
+        contents = {}
+        for role in files:
+            with throttle.open(os.path.join(container, role), "rb") as f:
+                contents[role] = f.read()
+
+        return contents
+
+    def _path_of(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def _entries(self) -> list[tuple[float, str, int]]:
+        """
+        Returns:
+            list[tuple[float, str, int]]: Last use, path, and size of each entry.
+        """
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+
+        return entries
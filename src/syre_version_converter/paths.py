@@ -1,5 +1,6 @@
 import os
 import platform
+from typing import Optional
 
 SYRE_FOLDER = ".syre"
 USER_MANIFEST_FILE = "users.json"
@@ -40,12 +41,18 @@ def get_system() -> str:
     return system
 
 
-def system_data_dir() -> str:
+def system_data_dir(system: Optional[str] = None) -> str:
     """
+    Args:
+        system (Optional[str], optional): System to get the directory for.
+            Defaults to the current system.
+
     Returns:
         str: Absolute path to the app data directory.
     """
-    system = get_system()
+    if system is None:
+        system = get_system()
+
     home = os.path.expanduser("~")
     if system == "Windows":
         return os.path.join(home, "AppData", "Roaming")
@@ -55,74 +62,106 @@ def system_data_dir() -> str:
     raise RuntimeError("Could not get data dir for OS")
 
 
-def config_local_dir() -> str:
+def config_local_dir(system: Optional[str] = None) -> str:
     """
+    Args:
+        system (Optional[str], optional): System to get the directory for.
+            Defaults to the current system.
+
     Returns:
         str: Path of the Syre local config dir.
     """
-    system = get_system()
+    if system is None:
+        system = get_system()
+
     if system == "Windows":
-        return os.path.join(system_data_dir(), "syre", "syre-local")
+        return os.path.join(system_data_dir(system), "syre", "syre-local")
     elif system == "Darwin":
-        return os.path.join(system_data_dir(), "ai.syre.syre-local")
+        return os.path.join(system_data_dir(system), "ai.syre.syre-local")
 
     raise RuntimeError("Could not get Syre local config dir for OS")
 
 
-def config_desktop_dir() -> str:
+def config_desktop_dir(system: Optional[str] = None) -> str:
     """
+    Args:
+        system (Optional[str], optional): System to get the directory for.
+            Defaults to the current system.
+
     Returns:
         str: Path of the Syre desktop config dir.
     """
-    system = get_system()
+    if system is None:
+        system = get_system()
+
     if system == "Windows":
-        return os.path.join(system_data_dir(), "syre", "syre-desktop")
+        return os.path.join(system_data_dir(system), "syre", "syre-desktop")
     elif system == "Darwin":
-        return os.path.join(system_data_dir(), "ai.syre.syre-desktop")
+        return os.path.join(system_data_dir(system), "ai.syre.syre-desktop")
 
     raise RuntimeError("Could not get Syre desktop config dir for OS")
 
 
-def config_user_manifest() -> str:
-    """
+def config_file_of(
+    file: str, local_dir: Optional[str] = None, system: Optional[str] = None
+) -> str:
+    """Path to a file in the Syre local config dir.
+
+    Args:
+        file (str): Name of the config file.
+        local_dir (Optional[str], optional): Syre local config dir.
+            Defaults to the dir of the system.
+        system (Optional[str], optional): System the config belongs to.
+            Defaults to the current system.
+
     Returns:
-        str: Path to the Syre user manifest file.
+        str: Path to the config file.
     """
-    system = get_system()
+    if system is None:
+        system = get_system()
+    if local_dir is None:
+        local_dir = config_local_dir(system)
+
     if system == "Windows":
-        return os.path.join(config_local_dir(), "config", USER_MANIFEST_FILE)
-    elif system == "Darwin":
-        return os.path.join(config_local_dir(), USER_MANIFEST_FILE)
+        return os.path.join(local_dir, "config", file)
+
+    return os.path.join(local_dir, file)
 
-    raise RuntimeError("Could not get Syre user manifest for OS")
 
+def config_user_manifest(local_dir: Optional[str] = None, system: Optional[str] = None) -> str:
+    """
+    Args:
+        local_dir (Optional[str], optional): Syre local config dir.
+        system (Optional[str], optional): System the config belongs to.
 
-def config_project_manifest() -> str:
+    Returns:
+        str: Path to the Syre user manifest file.
     """
+    return config_file_of(USER_MANIFEST_FILE, local_dir, system)
+
+
+def config_project_manifest(local_dir: Optional[str] = None, system: Optional[str] = None) -> str:
+    """
+    Args:
+        local_dir (Optional[str], optional): Syre local config dir.
+        system (Optional[str], optional): System the config belongs to.
+
     Returns:
         str: Path to the Syre project manifest file.
     """
-    system = get_system()
-    if system == "Windows":
-        return os.path.join(config_local_dir(), "config", PROJECT_MANIFEST_FILE)
-    elif system == "Darwin":
-        return os.path.join(config_local_dir(), PROJECT_MANIFEST_FILE)
+    return config_file_of(PROJECT_MANIFEST_FILE, local_dir, system)
 
-    raise RuntimeError("Could not get Syre project manifest for OS")
 
-
-def config_local_settings() -> str:
+def config_local_settings(local_dir: Optional[str] = None, system: Optional[str] = None) -> str:
     """
+    Args:
+        local_dir (Optional[str], optional): Syre local config dir.
+        system (Optional[str], optional): System the config belongs to.
+
     Returns:
         str: Path to the Syre local config file.
     """
-    system = get_system()
-    if system == "Windows":
-        return os.path.join(config_local_dir(), "config", LOCAL_CONFIG_FILE)
-    elif system == "Darwin":
-        return os.path.join(config_local_dir(), LOCAL_CONFIG_FILE)
-
-    raise RuntimeError("Could not get Syre local config for OS")
+    return config_file_of(LOCAL_CONFIG_FILE, local_dir, system)
 
 
 def syre_dir_of(base_path: str) -> str:
@@ -0,0 +1,307 @@
+"""
+Streaming conversion pipeline.
+
+Items from a source flow through a sequence of stages, each stage
+running in its own thread and connected to the next by a bounded queue.
+Discovery, reading, transforming, and writing overlap while the number of
+items in flight stays bounded.
+"""
+import os
+import queue
+import threading
+from typing import Any, Callable, Iterable, Optional
+
+from . import common, lock, trace
+from .failures import CONTAINER
+from .context import ConversionContext
+from .memory import MemoryBudget
+from .tuning import Slots
+
+QUEUE_SIZE = 64
+POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+def run(
+    source: Iterable[Any],
+    *stages: Callable[[Any], Any],
+    queue_size: int = QUEUE_SIZE,
+    memory: Optional[MemoryBudget] = None,
+):
+    """Runs items from the source through the stages.
+
+    + The source is iterated in its own thread.
+    + Each stage except the last runs in its own thread.
+    + The last stage runs in the calling thread.
+    + A stage returning `None` drops the item.
+    + The first error raised by the source or any stage stops the pipeline and is re-raised.
+
+    Args:
+        source (Iterable[Any]): Items to process. Iterated lazily.
+        *stages (Callable[[Any], Any]): Stages to pass each item through, in order.
+        queue_size (int, optional): Maximum number of items waiting between stages.
+            Defaults to QUEUE_SIZE.
+        memory (Optional[MemoryBudget], optional): Memory budget.
+            Fewer items are allowed to wait between stages as memory use grows.
+            Defaults to None.
+    """
+    if len(stages) == 0:
+        raise ValueError("pipeline requires at least one stage")
+
+    queues = [queue.Queue(maxsize=max(queue_size, 1)) for _ in stages]
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def put(q: queue.Queue, item: Any) -> bool:
+        while not stop.is_set():
+            if memory is not None and q.qsize() >= memory.scale(queue_size):
+                stop.wait(POLL_INTERVAL / 10)
+                continue
+
+            try:
+                q.put(item, timeout=POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def get(q: queue.Queue) -> Any:
+        while not stop.is_set():
+            try:
+                return q.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                continue
+
+        return _DONE
+
+    def produce():
+        try:
+            for item in source:
+                if not put(queues[0], item):
+                    return
+        except BaseException as err:
+            errors.append(err)
+            stop.set()
+            return
+
+        put(queues[0], _DONE)
+
+    def consume(stage: Callable[[Any], Any], q_in: queue.Queue, q_out: queue.Queue):
+        try:
+            while True:
+                item = get(q_in)
+                if item is _DONE:
+                    break
+
+                result = stage(item)
+                if result is not None and not put(q_out, result):
+                    return
+        except BaseException as err:
+            errors.append(err)
+            stop.set()
+            return
+
+        put(q_out, _DONE)
+
+    threads = [threading.Thread(target=produce, name="pipeline-source", daemon=True)]
+    for idx, stage in enumerate(stages[:-1]):
+        threads.append(
+            threading.Thread(
+                target=consume,
+                args=(stage, queues[idx], queues[idx + 1]),
+                name=f"pipeline-{getattr(stage, '__name__', idx)}",
+                daemon=True,
+            )
+        )
+
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = get(queues[-1])
+            if item is _DONE:
+                break
+
+            stages[-1](item)
+    except BaseException as err:
+        errors.insert(0, err)
+        stop.set()
+    finally:
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+def run_containers(
+    source: Iterable[str],
+    read: Callable[[str], Any],
+    transform: Callable[[Any], Any],
+    write: Callable[[Any], None],
+    ctx: Optional[ConversionContext] = None,
+    version: Optional[str] = None,
+    files: Optional[list[str]] = None,
+    load: Optional[Callable[[str, dict[str, bytes]], Any]] = None,
+):
+    """Runs a reader, transform, and writer over the files of containers,
+    applying the memory budget, concurrency slots, container locks, failure isolation,
+    and output cache of the context.
+
+    Args:
+        source (Iterable[str]): Paths to a file in the `.syre` folder of each container.
+        read (Callable[[str], Any]): Reader stage.
+        transform (Callable[[Any], Any]): Transform stage.
+        write (Callable[[Any], None]): Writer stage.
+        ctx (Optional[ConversionContext], optional): Conversion context. Defaults to None.
+        version (Optional[str], optional): Version converted from, recorded with failures.
+            Defaults to None.
+        files (Optional[list[str]], optional): Paths of the files the stages read,
+            relative to the container. Defaults to None.
+        load (Optional[Callable[[str, dict[str, bytes]], Any]], optional): Loads a source item
+            from the contents of its `files`, as `read` would.
+            If given with `files`, the output is cached with `ctx.output_cache`,
+            in which case `write` must be `write_documents`. Defaults to None.
+    """
+    container_of = lambda path: os.path.dirname(os.path.dirname(path))
+    stages = (read, transform, write)
+    if ctx is not None and ctx.output_cache is not None and files is not None and load is not None:
+        stages = ctx.output_cache.stages(version, files, read, load, transform, container_of)
+
+    if trace.enabled():
+        stages = tuple(traced_stage(stage) for stage in stages)
+
+    if ctx is not None and ctx.slots is not None:
+        stages = tuple(slotted_stage(stage, ctx.slots) for stage in stages)
+
+    if ctx is not None and ctx.failures is not None:
+        failures = ctx.failures
+        stages = isolated_stages(
+            *stages,
+            container_of=container_of,
+            is_failed=failures.failed,
+            on_error=lambda container, err: failures.record(CONTAINER, container, version, err),
+        )
+
+    if ctx is not None and ctx.container_locks:
+        stages = lock.locked_stages(
+            *stages,
+            container_of=container_of,
+            timeout=ctx.lock_timeout,
+            system=ctx.system,
+        )
+
+    run(source, *stages, memory=None if ctx is None else ctx.memory)
+
+
+def isolated_stages(
+    read: Callable[[str], Any],
+    transform: Callable[[Any], Any],
+    write: Callable[[Any], None],
+    container_of: Callable[[str], str],
+    is_failed: Callable[[str], bool],
+    on_error: Callable[[str, Exception], None],
+) -> tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+    """Wraps pipeline stages so an error only drops the container it occurred in.
+    Containers that failed earlier are skipped.
+
+    Args:
+        read (Callable[[str], Any]): Reader stage.
+        transform (Callable[[Any], Any]): Transform stage.
+        write (Callable[[Any], None]): Writer stage.
+        container_of (Callable[[str], str]): Maps a source item to its container path.
+        is_failed (Callable[[str], bool]): If a container failed earlier.
+        on_error (Callable[[str, Exception], None]): Called with the container and error
+            when a stage fails.
+
+    Returns:
+        tuple[Callable[[str], Any], Callable[[Any], Any], Callable[[Any], None]]:
+            Wrapped reader, transform, and writer stages.
+    """
+
+    def isolated_read(item: str) -> Any:
+        container = container_of(item)
+        if is_failed(container):
+            return None
+
+        try:
+            result = read(item)
+        except Exception as err:
+            on_error(container, err)
+            return None
+
+        return None if result is None else (container, result)
+
+    def isolated_transform(item: tuple[str, Any]) -> Any:
+        (container, value) = item
+        try:
+            result = transform(value)
+        except Exception as err:
+            on_error(container, err)
+            return None
+
+        return None if result is None else (container, result)
+
+    def isolated_write(item: tuple[str, Any]):
+        (container, value) = item
+        try:
+            write(value)
+        except Exception as err:
+            on_error(container, err)
+
+    isolated_read.__name__ = read.__name__
+    isolated_transform.__name__ = transform.__name__
+    isolated_write.__name__ = write.__name__
+    return (isolated_read, isolated_transform, isolated_write)
+
+
+def traced_stage(stage: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    """Wraps a stage to record a span for each item.
+
+    Args:
+        stage (Callable[[Any], Any]): Stage to wrap.
+
+    Returns:
+        Callable[[Any], Any]: Wrapped stage, with the same name.
+    """
+
+    def wrapper(item: Any) -> Any:
+        with trace.span(stage.__name__, "container"):
+            return stage(item)
+
+    wrapper.__name__ = stage.__name__
+    return wrapper
+
+
+def slotted_stage(stage: Callable[[Any], Any], slots: Slots) -> Callable[[Any], Any]:
+    """Wraps a stage so each item waits for one of the slots,
+    bounding the items in flight across all pipelines and trees sharing them.
+
+    Args:
+        stage (Callable[[Any], Any]): Stage to wrap.
+        slots (Slots): Concurrency limit, e.g. an `AutoTuner`.
+
+    Returns:
+        Callable[[Any], Any]: Wrapped stage, with the same name.
+    """
+
+    def wrapper(item: Any) -> Any:
+        with slots.slot():
+            return stage(item)
+
+    wrapper.__name__ = stage.__name__
+    return wrapper
+
+
+def write_documents(documents: dict[str, Any]):
+    """Writer stage. Writes JSON documents to their files.
+
+    Args:
+        documents (dict[str, Any]): Map from file path to document.
+            See `common.write_document`.
+    """
+    for (path, document) in documents.items():
+        common.write_document(path, document)
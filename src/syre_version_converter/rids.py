@@ -0,0 +1,155 @@
+"""
+Resource ids and creation times of resources created by converters.
+
+By default every resource gets a random rid and the current time.
+In deterministic mode the rid of a project is derived from its absolute path,
+so projects with the same folder name in different places get different rids.
+The rids of its analyses, containers, and assets are derived from the project's rid
+and their path relative to the project, and all resources share the time of the run,
+so converting the same input again gives identical output.
+Resources outside of a project are derived from their absolute path.
+"""
+import os
+import datetime as dt
+import threading
+from uuid import UUID, uuid4, uuid5
+from typing import Optional
+
+from . import common
+
+# Namespace of project rids derived in deterministic mode.
+NAMESPACE = UUID("7ac8f714-cade-46e9-865e-96ff265782e6")
+
+PROJECT = "project"
+ANALYSIS = "analysis"
+CONTAINER = "container"
+ASSET = "asset"
+
+# Environment variable with the timestamp of deterministic runs, in seconds since the epoch.
+# See https://reproducible-builds.org/specs/source-date-epoch/.
+SOURCE_DATE_EPOCH = "SOURCE_DATE_EPOCH"
+
+
+class Rids:
+    """Creates rids and timestamps. Safe to share between threads."""
+
+    def __init__(self, deterministic: bool = False, timestamp: Optional[dt.datetime] = None):
+        """
+        Args:
+            deterministic (bool, optional): Derive rids from stable inputs
+                and use a single timestamp. Defaults to False.
+            timestamp (Optional[dt.datetime], optional): Timestamp of the run
+                in deterministic mode. Defaults to `SOURCE_DATE_EPOCH` if set,
+                otherwise the time the run started.
+        """
+        if timestamp is None:
+            epoch = os.environ.get(SOURCE_DATE_EPOCH)
+            timestamp = dt.datetime.now() if epoch is None else from_epoch(int(epoch))
+
+        self.deterministic = deterministic
+        self.run_timestamp = timestamp
+        self._projects: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def project(self, project: str) -> str:
+        """
+        Args:
+            project (str): Path to the project's root.
+
+        Returns:
+            str: Rid for the project.
+        """
+        if not self.deterministic:
+            return str(uuid4())
+
+        root = os.path.abspath(project)
+        rid = str(uuid5(NAMESPACE, f"{PROJECT}:{root}"))
+        with self._lock:
+            self._projects[root] = rid
+
+        return rid
+
+    def resource(self, kind: str, path: str) -> str:
+        """
+        Args:
+            kind (str): Kind of resource, e.g. `CONTAINER`.
+            path (str): Path of the resource in its project.
+
+        Returns:
+            str: Rid for the resource.
+        """
+        if not self.deterministic:
+            return str(uuid4())
+
+        path = os.path.abspath(path)
+        project = self._project_of(path)
+        if project is None:
+            return str(uuid5(NAMESPACE, f"{kind}:{path}"))
+
+        (root, project_rid) = project
+        relative_path = os.path.relpath(path, root).replace(os.sep, "/")
+        return str(uuid5(UUID(project_rid), f"{kind}:{relative_path}"))
+
+    def timestamp(self, timespec: str = "auto") -> str:
+        """
+        Args:
+            timespec (str, optional): See `datetime.isoformat`. Defaults to "auto".
+
+        Returns:
+            str: Timestamp for a created resource.
+        """
+        moment = self.run_timestamp if self.deterministic else dt.datetime.now()
+        return moment.isoformat(timespec=timespec) + "Z"
+
+    def _project_of(self, path: str) -> Optional[tuple[str, str]]:
+        candidate = path
+        while True:
+            with self._lock:
+                rid = self._projects.get(candidate)
+            if rid is not None:
+                return (candidate, rid)
+
+            parent = os.path.dirname(candidate)
+            if parent == candidate:
+                break
+
+            candidate = parent
+
+        root = common.project_of(path)
+        if root is None:
+            return None
+
+        return (root, self.project(root))
+
+
+def from_epoch(seconds: int) -> dt.datetime:
+    """
+    Args:
+        seconds (int): Seconds since the epoch.
+
+    Returns:
+        dt.datetime: The UTC time, without a time zone.
+    """
+    return dt.datetime.fromtimestamp(seconds, dt.timezone.utc).replace(tzinfo=None)
+
+
+def parse_timestamp(value: str) -> dt.datetime:
+    """
+    Args:
+        value (str): ISO 8601 timestamp, e.g. `2024-01-01T00:00:00Z`.
+            Timestamps with a time zone are converted to UTC.
+
+    Returns:
+        dt.datetime: The time, without a time zone.
+
+    Raises:
+        ValueError: If the timestamp is invalid.
+    """
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+
+    timestamp = dt.datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(dt.timezone.utc).replace(tzinfo=None)
+
+    return timestamp
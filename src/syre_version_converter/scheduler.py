@@ -0,0 +1,147 @@
+"""
+Work-stealing scheduler for tree shaped work.
+
+Each worker owns a deque of items.
+Workers take their own work from the back of their deque, depth first,
+and steal from the front of other workers' deques, taking the items
+closest to the root, when they run out.
+"""
+import threading
+from collections import deque
+from typing import Any, Callable, Iterable, Optional, TypeVar
+
+from .memory import MemoryBudget
+from .tuning import Slots
+
+T = TypeVar("T")
+
+POLL_INTERVAL = 0.1
+
+_EMPTY = object()
+
+
+def run_tree(
+    roots: Iterable[T],
+    visit: Callable[[T], Iterable[T]],
+    workers: int = 1,
+    memory: Optional[MemoryBudget] = None,
+    slots: Optional[Slots] = None,
+    cost: Optional[Callable[[T], Any]] = None,
+):
+    """Visits every item of a tree.
+    An item's children are only scheduled once the item has been visited.
+
+    + With a single worker the tree is visited depth first in the calling thread.
+    + The first error raised by `visit` stops all workers and is re-raised.
+
+    Args:
+        roots (Iterable[T]): Items to start from.
+        visit (Callable[[T], Iterable[T]]): Processes an item, returning its children.
+        workers (int, optional): Number of worker threads. Defaults to 1.
+        memory (Optional[MemoryBudget], optional): Memory budget.
+            Fewer workers take new items as memory use grows. Defaults to None.
+        slots (Optional[Slots], optional): Concurrency limit, e.g. an `AutoTuner`.
+            Only as many workers as it allows take new items,
+            and each visit waits for one of its slots, which are shared with other trees.
+            Defaults to None.
+        cost (Optional[Callable[[T], Any]], optional): Estimates the cost of a root's tree.
+            If given, roots are taken from a shared queue largest first
+            by whichever worker is free, before stealing. Defaults to None.
+    """
+    if cost is not None:
+        roots = sorted(roots, key=cost, reverse=True)
+
+    if workers <= 1:
+        stack = list(reversed(list(roots)))
+        while stack:
+            item = stack.pop()
+            stack.extend(reversed(list(visit(item))))
+
+        return
+
+    deques: list[deque] = [deque() for _ in range(workers)]
+    shared: deque = deque()
+    pending = 0
+    for (idx, root) in enumerate(roots):
+        if cost is None:
+            deques[idx % workers].append(root)
+        else:
+            shared.append(root)
+        pending += 1
+
+    cond = threading.Condition()
+    errors: list[BaseException] = []
+
+    def take(idx: int):
+        try:
+            return deques[idx].pop()
+        except IndexError:
+            pass
+
+        try:
+            return shared.popleft()
+        except IndexError:
+            pass
+
+        for offset in range(1, workers):
+            try:
+                return deques[(idx + offset) % workers].popleft()
+            except IndexError:
+                continue
+
+        return _EMPTY
+
+    def active(idx: int) -> bool:
+        if idx == 0:
+            return True
+        if slots is not None and idx >= slots.limit:
+            return False
+        if memory is not None and idx >= memory.scale(workers):
+            return False
+
+        return True
+
+    def work(idx: int):
+        nonlocal pending
+        while not errors:
+            item = take(idx) if active(idx) else _EMPTY
+
+            if item is _EMPTY:
+                with cond:
+                    if pending == 0 or errors:
+                        return
+
+                    cond.wait(POLL_INTERVAL)
+                continue
+
+            try:
+                if slots is None:
+                    children = list(visit(item))
+                else:
+                    with slots.slot():
+                        children = list(visit(item))
+            except BaseException as err:
+                with cond:
+                    errors.append(err)
+                    cond.notify_all()
+                return
+
+            with cond:
+                # NOTE: Count children before publishing them so `pending`
+                # can not reach zero while work remains.
+                pending += len(children) - 1
+                deques[idx].extend(reversed(children))
+                if len(children) > 0 or pending == 0:
+                    cond.notify_all()
+
+    threads = [
+        threading.Thread(target=work, args=(idx,), name=f"worker-{idx}", daemon=True)
+        for idx in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
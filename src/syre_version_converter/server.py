@@ -0,0 +1,404 @@
+"""
+Conversion job server on a Unix domain socket.
+
+Keeps one process, and its context, catalog, and caches, alive for many conversions.
+Clients send requests as JSON objects, one per line, and receive events the same way.
+
+# Requests
++ `{"op": "convert", "project": <path>, "final": <version>}`
+    Converts a project from its detected version, or `initial` if given.
+    `final` defaults to the final version the server was started with.
++ `{"op": "plan", "project": <path>, "final": <version>}`
+    Lists the versions a project would be converted through.
++ `{"op": "status", "project": <path>}`
+    Reports the format version and size of a project.
++ `{"op": "verify", "project": <path>, "final": <version>}`
+    Verifies a project against the schema of a version.
++ `{"op": "cancel", "job": <id>}`
+    Cancels a job. Queued jobs are dropped,
+    running conversions stop before their next stage.
++ `{"op": "jobs"}`
+    Lists the queued and running jobs of the server.
+
+Jobs accept an integer `priority`, higher runs first, defaulting to 0.
+Jobs are queued and run on a shared pool of workers,
+and are forgotten once they finish.
+
+# Events
+Each job request is answered with `{"job": <id>, "state": "queued"}`,
+followed by `{"job": <id>, "event": "stage" | "log", ...}` events while it runs,
+and a final `{"job": <id>, "state": "done" | "failed" | "cancelled", ...}` event
+with its `result` or `error`.
+"""
+import os
+import json
+import queue
+import socket
+import logging
+import itertools
+import threading
+import socketserver
+from typing import Any, Callable, Optional
+
+from . import common, lock, status, verify, trace
+from .chain import CONVERTERS, VERSIONS, chain_versions, run_chain
+from .context import ConversionContext
+
+logger = logging.getLogger(__name__)
+
+JOB_OPS = ("convert", "plan", "status", "verify")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+
+class JobCancelled(Exception):
+    """Raised in a running job once it is cancelled."""
+
+
+class Job:
+    """A request run by the server, and the clients following it."""
+
+    def __init__(self, id: int, request: dict[str, Any], priority: int):
+        self.id = id
+        self.request = request
+        self.priority = priority
+        self.state = QUEUED
+        self.cancelled = threading.Event()
+        self._lock = threading.RLock()
+        self._subscribers: list[Callable[[dict[str, Any]], bool]] = []
+
+    def subscribe(self, send: Callable[[dict[str, Any]], bool]):
+        """
+        Args:
+            send (Callable[[dict[str, Any]], bool]): Called with each event of the job.
+                Returns `False` once the client is gone.
+        """
+        with self._lock:
+            self._subscribers.append(send)
+
+    def emit(self, event: dict[str, Any]):
+        """Sends an event to the job's clients.
+
+        Args:
+            event (dict[str, Any]): Event to send.
+        """
+        event = {"job": self.id, **event}
+        with self._lock:
+            self._subscribers = [send for send in self._subscribers if send(event)]
+
+    def finish(self, state: str, **fields: Any):
+        """Sets the final state of the job and sends it to its clients,
+        which are then dropped.
+
+        Args:
+            state (str): Final state.
+            **fields (Any): Fields of the final event, e.g. `result` or `error`.
+        """
+        self.state = state
+        self.emit({"state": state, **fields})
+        with self._lock:
+            self._subscribers.clear()
+
+    def check_cancelled(self):
+        """
+        Raises:
+            JobCancelled: If the job was cancelled.
+        """
+        if self.cancelled.is_set():
+            raise JobCancelled()
+
+    def describe(self) -> dict[str, Any]:
+        """
+        Returns:
+            dict[str, Any]: Summary of the job.
+        """
+        return {
+            "job": self.id,
+            "op": self.request["op"],
+            "project": self.request.get("project"),
+            "priority": self.priority,
+            "state": self.state,
+        }
+
+
+class JobLogHandler(logging.Handler):
+    """Forwards log records emitted by a job's thread to its clients."""
+
+    def __init__(self):
+        super().__init__()
+        self._jobs: dict[int, Job] = {}
+
+    def attach(self, job: Optional[Job]):
+        """Sets the job of the current thread, `None` to detach it."""
+        if job is None:
+            self._jobs.pop(threading.get_ident(), None)
+        else:
+            self._jobs[threading.get_ident()] = job
+
+    def emit(self, record: logging.LogRecord):
+        job = self._jobs.get(threading.get_ident())
+        if job is not None:
+            job.emit({"event": "log", "level": record.levelname, "message": record.getMessage()})
+
+
+class JobServer:
+    """Runs jobs from a priority queue on a pool of workers."""
+
+    def __init__(self, ctx: ConversionContext, final: str, workers: int = 1):
+        """
+        Args:
+            ctx (ConversionContext): Context shared by all jobs.
+            final (str): Version to convert to if a job does not give one.
+            workers (int, optional): Number of jobs to run at once. Defaults to 1.
+        """
+        self.ctx = ctx
+        self.final = final
+        # Queued and running jobs. Finished jobs are removed.
+        self.jobs: dict[int, Job] = {}
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._log_handler = JobLogHandler()
+        logging.getLogger(__package__).addHandler(self._log_handler)
+        self._workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{idx}", daemon=True)
+            for idx in range(max(workers, 1))
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(
+        self, request: dict[str, Any], send: Callable[[dict[str, Any]], bool]
+    ) -> Job:
+        """Queues a job.
+
+        Args:
+            request (dict[str, Any]): Job request.
+            send (Callable[[dict[str, Any]], bool]): Client to send the job's events to.
+
+        Returns:
+            Job: The queued job.
+        """
+        priority = int(request.get("priority", 0))
+        with self._lock:
+            job = Job(next(self._ids), request, priority)
+            self.jobs[job.id] = job
+
+        job.subscribe(send)
+        job.emit({"state": QUEUED})
+        self._queue.put((-priority, job.id, job))
+        return job
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancels a job.
+
+        Args:
+            job_id (int): Id of the job.
+
+        Returns:
+            bool: If the job was queued or running.
+        """
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state not in (QUEUED, RUNNING):
+                return False
+
+            job.cancelled.set()
+            queued = job.state == QUEUED
+            if queued:
+                job.state = CANCELLED
+
+        if queued:
+            self._finish(job, CANCELLED)
+
+        return True
+
+    def describe(self) -> list[dict[str, Any]]:
+        """
+        Returns:
+            list[dict[str, Any]]: Summaries of the queued and running jobs of the server.
+        """
+        with self._lock:
+            return [job.describe() for job in self.jobs.values()]
+
+    def _work(self):
+        while True:
+            (_, _, job) = self._queue.get()
+            with self._lock:
+                if job.cancelled.is_set():
+                    continue
+
+                job.state = RUNNING
+
+            self._log_handler.attach(job)
+            try:
+                with trace.span(job.request["op"], "job", job=job.id):
+                    result = self.run(job)
+            except JobCancelled:
+                self._finish(job, CANCELLED)
+            except Exception as err:
+                logger.exception(f"job {job.id} failed")
+                self._finish(job, FAILED, error=f"{type(err).__name__}: {err}")
+            else:
+                self._finish(job, DONE, result=result)
+            finally:
+                self._log_handler.attach(None)
+
+    def _finish(self, job: Job, state: str, **fields: Any):
+        with self._lock:
+            self.jobs.pop(job.id, None)
+
+        job.finish(state, **fields)
+
+    def run(self, job: Job) -> Any:
+        """Runs a job.
+
+        Args:
+            job (Job): Job to run.
+
+        Returns:
+            Any: Result of the job.
+
+        Raises:
+            ValueError: If the request is invalid.
+        """
+        request = job.request
+        op = request["op"]
+        project = request.get("project")
+        if project is None or not os.path.isdir(project):
+            raise ValueError(f"project `{project}` does not exist")
+
+        if op == "status":
+            return status.project_status(project, self.ctx)
+
+        final = request.get("final", self.final)
+        if final not in VERSIONS:
+            raise ValueError(f"unknown version `{final}`")
+
+        if op == "verify":
+            return verify.verify([project], final, self.ctx)[project]
+
+        initial = request.get("initial") or common.project_format_version(project)
+        if initial is None:
+            raise ValueError(f"could not determine the version of `{project}`")
+
+        versions = chain_versions(initial, final)
+        if op == "plan":
+            return {"initial": initial, "final": final, "versions": versions}
+
+        for stage in run_chain(initial, final):
+            self.ctx.run_once(stage)
+
+        with lock.Lock(project, timeout=self.ctx.lock_timeout, system=self.ctx.system):
+            for version in versions:
+                job.check_cancelled()
+                convert = CONVERTERS[version]
+                stage = convert.__module__.rsplit(".", 1)[-1]
+                job.emit({"event": "stage", "stage": stage, "version": version})
+                with trace.span(stage, "stage", path=project):
+                    convert(project, self.ctx)
+
+        return {"initial": initial, "final": final, "versions": versions}
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    """Reads requests from a client, one JSON object per line."""
+
+    server: "UnixJobServer"
+
+    def setup(self):
+        super().setup()
+        self._send_lock = threading.Lock()
+        self._connected = True
+
+    def send(self, event: dict[str, Any]) -> bool:
+        """Sends an event to the client.
+
+        Returns:
+            bool: If the client is still connected.
+        """
+        with self._send_lock:
+            if not self._connected:
+                return False
+
+            try:
+                self.wfile.write(json.dumps(event).encode() + b"\n")
+                self.wfile.flush()
+            except OSError:
+                self._connected = False
+
+            return self._connected
+
+    def handle(self):
+        jobs = self.server.jobs
+        for line in self.rfile:
+            if not line.strip():
+                continue
+
+            try:
+                request = json.loads(line)
+                op = request["op"]
+            except (ValueError, TypeError, KeyError) as err:
+                self.send({"error": f"invalid request: {err}"})
+                continue
+
+            if op in JOB_OPS:
+                priority = request.get("priority", 0)
+                if isinstance(priority, bool) or not isinstance(priority, int):
+                    self.send({"error": f"invalid priority `{priority}`, expected an integer"})
+                    continue
+
+                jobs.submit(request, self.send)
+            elif op == "cancel":
+                self.send({"job": request.get("job"), "cancelled": jobs.cancel(request.get("job"))})
+            elif op == "jobs":
+                self.send({"jobs": jobs.describe()})
+            else:
+                self.send({"error": f"unknown op `{op}`"})
+
+
+class UnixJobServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: str, jobs: JobServer):
+        self.jobs = jobs
+        super().__init__(path, RequestHandler)
+
+
+def serve(path: str, ctx: ConversionContext, final: str, workers: Optional[int] = None):
+    """Serves jobs on a Unix domain socket until interrupted.
+
+    Args:
+        path (str): Path of the socket.
+        ctx (ConversionContext): Context shared by all jobs.
+        final (str): Version to convert to if a job does not give one.
+        workers (Optional[int], optional): Number of jobs to run at once.
+            Defaults to `ctx.jobs`.
+
+    Raises:
+        FileExistsError: If another server is listening on the socket.
+    """
+    if os.path.exists(path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(path)
+            except OSError:
+                # NOTE: Left behind by a server that is gone.
+                os.remove(path)
+            else:
+                raise FileExistsError(f"a server is already listening on `{path}`")
+
+    jobs = JobServer(ctx, final, workers or ctx.jobs)
+    with UnixJobServer(path, jobs) as server:
+        logger.info(f"serving on `{path}`")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(path)
+            lock.release_all()
@@ -0,0 +1,106 @@
+"""
+Estimates the cost of converting projects and subtrees,
+so the largest can be started first.
+
+Costs are `(containers, metadata bytes)` tuples, compared in that order.
+They are taken from the catalog if it covers the tree,
+otherwise from a quick scan of its directories that does not read any files.
+"""
+import os
+from typing import Optional
+
+# NOTE: `convert_0_9_x` imports this module, so its names are looked up when used.
+from . import convert_0_9_x, throttle
+from .context import ConversionContext
+
+Cost = tuple[int, int]
+
+# Maximum number of directories a quick scan visits.
+# Larger trees are all considered equally large.
+SCAN_LIMIT = 100_000
+
+METADATA_FOLDERS = (".syre", ".thot")
+CONTAINER_FILES = ("container.json", "assets.json")
+
+
+def scan_cost(root: str, limit: int = SCAN_LIMIT) -> Cost:
+    """Estimates the cost of a tree by scanning its directories.
+
+    Args:
+        root (str): Root of the tree.
+        limit (int, optional): Maximum number of directories to visit. Defaults to SCAN_LIMIT.
+
+    Returns:
+        Cost: Number of containers and bytes of metadata in the tree.
+    """
+    metadata_files = (
+        convert_0_9_x.CONTAINER_PATH,
+        convert_0_9_x.SCRIPTS_PATH,
+        convert_0_9_x.ASSET_PATH,
+    )
+    containers = 0
+    metadata_bytes = 0
+    stack = [root]
+    visited = 0
+    while stack and visited < limit:
+        path = stack.pop()
+        visited += 1
+        try:
+            entries = throttle.scandir(path)
+        except OSError:
+            continue
+
+        is_container = False
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.name in METADATA_FOLDERS and entry.is_dir():
+                        is_container = True
+                        for file in CONTAINER_FILES:
+                            try:
+                                metadata_bytes += os.stat(os.path.join(entry.path, file)).st_size
+                            except OSError:
+                                pass
+                    elif entry.name in metadata_files:
+                        is_container = is_container or entry.name == convert_0_9_x.CONTAINER_PATH
+                        metadata_bytes += entry.stat().st_size
+                    elif not entry.name.startswith(".") and entry.is_dir():
+                        stack.append(entry.path)
+                except OSError:
+                    continue
+
+        containers += int(is_container)
+
+    return (containers, metadata_bytes)
+
+
+def estimate_cost(root: str, ctx: Optional[ConversionContext] = None) -> Cost:
+    """Estimates the cost of converting a tree.
+
+    Args:
+        root (str): Root of the tree.
+        ctx (Optional[ConversionContext], optional): Conversion context.
+            Its catalog is used if it covers the tree. Defaults to None.
+
+    Returns:
+        Cost: Number of containers and bytes of metadata in the tree.
+    """
+    if ctx is not None and ctx.catalog is not None:
+        cost = ctx.catalog.subtree_cost(root)
+        if cost is not None:
+            return cost
+
+    return scan_cost(root)
+
+
+def largest_first(roots: list[str], ctx: Optional[ConversionContext] = None) -> list[str]:
+    """
+    Args:
+        roots (list[str]): Roots of trees.
+        ctx (Optional[ConversionContext], optional): Conversion context. Defaults to None.
+
+    Returns:
+        list[str]: The roots, ordered by descending estimated cost.
+    """
+    costs = {root: estimate_cost(root, ctx) for root in roots}
+    return sorted(roots, key=lambda root: costs[root], reverse=True)
@@ -0,0 +1,75 @@
+"""
+Reports the format version and size of projects.
+"""
+import os
+from typing import Any, Optional
+
+from . import common
+from .context import ConversionContext
+from .convert_0_9_x import CONTAINER_PATH as CONTAINER_FILE_0_9_X
+
+
+def metadata_folder_of(version: Optional[str]) -> Optional[str]:
+    """
+    Args:
+        version (Optional[str]): Format version of a project.
+
+    Returns:
+        Optional[str]: Name of the metadata folder of containers in the version,
+            or `None` if containers do not have one.
+    """
+    if version is None or version == "0.9.x":
+        return None
+    elif version == "0.10.0":
+        return ".thot"
+
+    return ".syre"
+
+
+def project_status(project: str, ctx: ConversionContext) -> dict[str, Any]:
+    """Collects the status of a project.
+    Uses the catalog, if there is one, to avoid walking the project.
+
+    Args:
+        project (str): Path to the project's root.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        dict[str, Any]: The project's format version, number of containers,
+            and number of assets, `None` if not available.
+    """
+    version = common.project_format_version(project)
+    folder = metadata_folder_of(version)
+    if folder is None:
+        containers = sum(1 for _ in ctx.find_files(project, CONTAINER_FILE_0_9_X))
+        return {"version": version, "containers": containers, "assets": None}
+
+    containers = 0
+    assets = 0
+    for properties_path in ctx.find_files(project, os.path.join(folder, "container.json")):
+        containers += 1
+        if ctx.catalog is not None:
+            container = os.path.dirname(os.path.dirname(properties_path))
+            assets += len(ctx.catalog.assets(container, folder))
+
+    return {
+        "version": version,
+        "containers": containers,
+        "assets": assets if ctx.catalog is not None else None,
+    }
+
+
+def print_status(projects: list[str], ctx: ConversionContext):
+    """Prints the status of projects.
+
+    Args:
+        projects (list[str]): Paths to the projects.
+        ctx (ConversionContext): Conversion context.
+    """
+    for project in projects:
+        status = project_status(project, ctx)
+        assets = "-" if status["assets"] is None else status["assets"]
+        print(
+            f"{project}: version {status['version'] or 'unknown'}, "
+            f"{status['containers']} containers, {assets} assets"
+        )
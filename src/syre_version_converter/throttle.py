@@ -0,0 +1,291 @@
+"""
+I/O rate limiting, to leave capacity of shared storage to other users.
+
+Filesystem operations and bytes transferred are limited by token buckets.
+Each open, rename, and directory listing is an operation,
+data read and written counts towards bytes.
+Lock files and the catalog database are not limited.
+
+Limits can be changed while running through a control file,
+which is re-read when it is modified or the process receives `SIGHUP`.
+Until throttling is enabled the helpers cost a single check.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+from typing import Any, Iterator, Optional, Union
+
+from .memory import parse_size
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the control file for modifications.
+CONTROL_INTERVAL = 1.0
+
+_open = open
+
+
+class TokenBucket:
+    """Token bucket allowing bursts of up to one second at its rate.
+    Requests larger than the burst are allowed by going into debt,
+    which later requests wait out.
+    """
+
+    def __init__(self, rate: Optional[float] = None):
+        """
+        Args:
+            rate (Optional[float], optional): Tokens per second, `None` for no limit.
+                Defaults to None.
+        """
+        self._lock = threading.Lock()
+        self.rate = rate
+        self._tokens = rate or 0.0
+        self._updated = time.monotonic()
+
+    def set_rate(self, rate: Optional[float]):
+        """
+        Args:
+            rate (Optional[float]): Tokens per second, `None` for no limit.
+        """
+        with self._lock:
+            self._refill()
+            self.rate = rate
+            self._tokens = 0.0 if rate is None else min(self._tokens, rate)
+
+    def take(self, tokens: float):
+        """Takes tokens from the bucket, waiting until they are available.
+
+        Args:
+            tokens (float): Number of tokens.
+        """
+        with self._lock:
+            if self.rate is None:
+                return
+
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.rate is not None:
+            self._tokens = min(self._tokens + (now - self._updated) * self.rate, self.rate)
+
+        self._updated = now
+
+
+class Throttle:
+    """Limits operations and bytes per second. Safe to share between threads."""
+
+    def __init__(
+        self,
+        ops_per_second: Optional[float] = None,
+        bytes_per_second: Optional[float] = None,
+        control: Optional[str] = None,
+    ):
+        """
+        Args:
+            ops_per_second (Optional[float], optional): Maximum operations per second.
+                Defaults to None, no limit.
+            bytes_per_second (Optional[float], optional): Maximum bytes per second.
+                Defaults to None, no limit.
+            control (Optional[str], optional): Path to a control file,
+                a JSON object with `ops_per_second` and `bytes_per_second` keys.
+                Its limits replace the initial ones. Defaults to None.
+        """
+        self.ops = TokenBucket(ops_per_second)
+        self.bytes = TokenBucket(bytes_per_second)
+        self.control = control
+        self._control_lock = threading.Lock()
+        self._control_mtime: Optional[int] = None
+        self._next_check = 0.0
+        self._reload = True
+
+    def charge(self, ops: int = 1, nbytes: int = 0):
+        """Waits until the operations and bytes are within the limits.
+
+        Args:
+            ops (int, optional): Number of operations. Defaults to 1.
+            nbytes (int, optional): Number of bytes. Defaults to 0.
+        """
+        if self.control is not None:
+            self._check_control()
+
+        if ops:
+            self.ops.take(ops)
+        if nbytes:
+            self.bytes.take(nbytes)
+
+    def request_reload(self):
+        """Re-reads the control file on the next operation.
+        Only sets a flag, so is safe to call from a signal handler.
+        """
+        self._reload = True
+
+    def _check_control(self):
+        now = time.monotonic()
+        if not self._reload and now < self._next_check:
+            return
+
+        with self._control_lock:
+            if not self._reload and now < self._next_check:
+                return
+
+            self._next_check = now + CONTROL_INTERVAL
+            forced = self._reload
+            self._reload = False
+            try:
+                mtime = os.stat(self.control).st_mtime_ns
+            except OSError:
+                return
+
+            if not forced and mtime == self._control_mtime:
+                return
+
+            self._control_mtime = mtime
+            try:
+                with _open(self.control, "r") as f:
+                    limits = json.load(f)
+
+                ops_per_second = _rate(limits.get("ops_per_second"))
+                bytes_per_second = _rate(limits.get("bytes_per_second"))
+            except (OSError, ValueError, AttributeError) as err:
+                logger.warning(f"invalid I/O control file `{self.control}`: {err}")
+                return
+
+            self.ops.set_rate(ops_per_second)
+            self.bytes.set_rate(bytes_per_second)
+            logger.info(
+                f"I/O limits: {ops_per_second or 'unlimited'} ops/s, "
+                f"{bytes_per_second or 'unlimited'} bytes/s"
+            )
+
+
+def _rate(value: Union[None, int, float, str]) -> Optional[float]:
+    if value is None:
+        return None
+    elif isinstance(value, str):
+        value = parse_size(value)
+
+    value = float(value)
+    if value <= 0:
+        raise ValueError(f"rate must be positive, got `{value}`")
+
+    return value
+
+
+class ThrottledFile:
+    """File whose reads and writes are charged to the throttle."""
+
+    def __init__(self, f: Any, throttle: Throttle):
+        self._f = f
+        self._throttle = throttle
+
+    def read(self, size: int = -1) -> Union[str, bytes]:
+        data = self._f.read(size)
+        self._throttle.charge(ops=0, nbytes=len(data))
+        return data
+
+    def readline(self, size: int = -1) -> Union[str, bytes]:
+        data = self._f.readline(size)
+        self._throttle.charge(ops=0, nbytes=len(data))
+        return data
+
+    def write(self, data: Union[str, bytes]) -> int:
+        self._throttle.charge(ops=0, nbytes=len(data))
+        return self._f.write(data)
+
+    def __iter__(self) -> Iterator[Union[str, bytes]]:
+        return iter(self.readline, self._f.read(0))
+
+    def __enter__(self) -> "ThrottledFile":
+        self._f.__enter__()
+        return self
+
+    def __exit__(self, *exc: Any):
+        return self._f.__exit__(*exc)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._f, name)
+
+
+_throttle: Optional[Throttle] = None
+
+
+def enable(
+    ops_per_second: Optional[float] = None,
+    bytes_per_second: Optional[float] = None,
+    control: Optional[str] = None,
+) -> Throttle:
+    """Starts limiting I/O. See `Throttle`.
+
+    Returns:
+        Throttle: The active throttle.
+    """
+    global _throttle
+    _throttle = Throttle(ops_per_second, bytes_per_second, control)
+    return _throttle
+
+
+def reload():
+    """Re-reads the control file of the active throttle on the next operation, if there is one."""
+    if _throttle is not None:
+        _throttle.request_reload()
+
+
+def charge(ops: int = 1, nbytes: int = 0):
+    """Waits until the operations and bytes are within the limits, if throttling is enabled.
+
+    Args:
+        ops (int, optional): Number of operations. Defaults to 1.
+        nbytes (int, optional): Number of bytes. Defaults to 0.
+    """
+    if _throttle is not None:
+        _throttle.charge(ops, nbytes)
+
+
+def open(file: Union[str, int], mode: str = "r", **kwargs: Any) -> Any:
+    """See `open`. Reads and writes of the file are throttled."""
+    if _throttle is None:
+        return _open(file, mode, **kwargs)
+
+    _throttle.charge()
+    return ThrottledFile(_open(file, mode, **kwargs), _throttle)
+
+
+def listdir(*args: Any, **kwargs: Any) -> list[str]:
+    """See `os.listdir`."""
+    charge()
+    return os.listdir(*args, **kwargs)
+
+
+def scandir(*args: Any, **kwargs: Any) -> Iterator[os.DirEntry]:
+    """See `os.scandir`."""
+    charge()
+    return os.scandir(*args, **kwargs)
+
+
+def rename(*args: Any, **kwargs: Any):
+    """See `os.rename`."""
+    charge()
+    os.rename(*args, **kwargs)
+
+
+def replace(*args: Any, **kwargs: Any):
+    """See `os.replace`."""
+    charge()
+    os.replace(*args, **kwargs)
+
+
+def copyfile(src: str, dst: str):
+    """See `shutil.copyfile`. Charges the size of the file."""
+    if _throttle is not None:
+        _throttle.charge(ops=2, nbytes=os.stat(src).st_size)
+
+    shutil.copyfile(src, dst)
@@ -0,0 +1,145 @@
+"""
+Timeline tracing in the Chrome trace event format.
+
+Spans are only recorded once tracing is enabled,
+otherwise `span` and `traced` cost a single check.
+Traces can be viewed with `chrome://tracing` or Perfetto.
+"""
+import os
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Iterator, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Tracer:
+    """Collects complete events of spans."""
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._start = time.perf_counter_ns()
+        self._threads: set[int] = set()
+
+    @contextmanager
+    def span(self, name: str, category: str = "function", **args: Any) -> Iterator[None]:
+        """Records a span around the block.
+
+        Args:
+            name (str): Name of the span.
+            category (str, optional): Category of the span. Defaults to "function".
+            **args (Any): Values to attach to the span.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            tid = threading.get_native_id()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": (start - self._start) / 1000,
+                "dur": (end - start) / 1000,
+                "pid": os.getpid(),
+                "tid": tid,
+            }
+            if args:
+                event["args"] = args
+
+            with self._lock:
+                if tid not in self._threads:
+                    self._threads.add(tid)
+                    self.events.append(
+                        {
+                            "name": "thread_name",
+                            "ph": "M",
+                            "pid": os.getpid(),
+                            "tid": tid,
+                            "args": {"name": threading.current_thread().name},
+                        }
+                    )
+
+                self.events.append(event)
+
+    def write(self, path: str):
+        """Writes the trace to a file.
+
+        Args:
+            path (str): Path to the trace file.
+        """
+        with self._lock:
+            events = list(self.events)
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable() -> Tracer:
+    """Starts recording spans.
+
+    Returns:
+        Tracer: The active tracer.
+    """
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+
+    return _tracer
+
+
+def enabled() -> bool:
+    """
+    Returns:
+        bool: If spans are being recorded.
+    """
+    return _tracer is not None
+
+
+def span(name: str, category: str = "function", **args: Any) -> ContextManager[None]:
+    """Records a span around a block, if tracing is enabled.
+
+    Args:
+        name (str): Name of the span.
+        category (str, optional): Category of the span. Defaults to "function".
+        **args (Any): Values to attach to the span.
+
+    Returns:
+        ContextManager[None]: Context manager recording the span.
+    """
+    if _tracer is None:
+        return nullcontext()
+
+    return _tracer.span(name, category, **args)
+
+
+def traced(f: F) -> F:
+    """Decorator recording a span for each call of a function, if tracing is enabled."""
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        if _tracer is None:
+            return f(*args, **kwargs)
+
+        with _tracer.span(f.__name__):
+            return f(*args, **kwargs)
+
+    return wrapper
+
+
+def write(path: str):
+    """Writes the recorded trace to a file. Does nothing if tracing is not enabled.
+
+    Args:
+        path (str): Path to the trace file.
+    """
+    if _tracer is not None:
+        _tracer.write(path)
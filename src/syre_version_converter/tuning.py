@@ -0,0 +1,239 @@
+"""
+Adaptive concurrency.
+
+The number of containers converted at once is tuned at run time by hill climbing:
+the throughput of each window of completed conversions is compared to the previous one,
+concurrency keeps moving in the same direction while throughput improves
+and reverses once it drops.
+The search is bounded by the CPUs available to the process, including cgroup CPU limits.
+
+A single tuner, or fixed `Slots` without tuning, is shared by every project of a run,
+so its limit bounds the conversions in flight across all of them.
+"""
+import os
+import math
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+PROC_CGROUP = "/proc/self/cgroup"
+
+# Conversions mostly wait on I/O, so more workers than CPUs are useful.
+WORKERS_PER_CPU = 4
+MAX_WORKERS = 64
+
+WINDOW_SECONDS = 0.5
+MIN_SAMPLES = 4
+# Relative throughput change considered noise.
+TOLERANCE = 0.05
+
+
+def cgroup_cpu_limit() -> Optional[float]:
+    """
+    Returns:
+        Optional[float]: Number of CPUs the process' cgroups allow,
+            or `None` if they do not limit it.
+    """
+    try:
+        with open(PROC_CGROUP, "r") as f:
+            entries = [line.strip().split(":", 2) for line in f if line.strip()]
+    except OSError:
+        return None
+
+    limits = []
+    for (_, controllers, group) in entries:
+        if controllers == "":
+            # cgroup v2, the limit of any ancestor applies.
+            group_path = os.path.join(CGROUP_ROOT, group.lstrip("/"))
+            while True:
+                limit = _cpu_max(os.path.join(group_path, "cpu.max"))
+                if limit is not None:
+                    limits.append(limit)
+                if os.path.normpath(group_path) == os.path.normpath(CGROUP_ROOT):
+                    break
+                group_path = os.path.dirname(group_path)
+        elif "cpu" in controllers.split(","):
+            for mount in ("cpu", "cpu,cpuacct", "cpuacct,cpu"):
+                base = os.path.join(CGROUP_ROOT, mount)
+                for path in {os.path.join(base, group.lstrip("/")), base}:
+                    limit = _cfs_quota(path)
+                    if limit is not None:
+                        limits.append(limit)
+
+    return min(limits) if limits else None
+
+
+def _cpu_max(path: str) -> Optional[float]:
+    try:
+        with open(path, "r") as f:
+            (quota, period) = f.read().split()[:2]
+    except (OSError, ValueError):
+        return None
+
+    if quota == "max":
+        return None
+
+    return int(quota) / int(period)
+
+
+def _cfs_quota(path: str) -> Optional[float]:
+    try:
+        with open(os.path.join(path, "cpu.cfs_quota_us"), "r") as f:
+            quota = int(f.read())
+        with open(os.path.join(path, "cpu.cfs_period_us"), "r") as f:
+            period = int(f.read())
+    except (OSError, ValueError):
+        return None
+
+    if quota <= 0 or period <= 0:
+        return None
+
+    return quota / period
+
+
+def cpu_limit() -> int:
+    """
+    Returns:
+        int: Number of CPUs available to the process,
+            respecting its CPU affinity and cgroup CPU limits.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+
+    return max(cpus, 1)
+
+
+class Slots:
+    """Bounds the number of concurrent conversions to a fixed limit.
+    Safe to share between threads.
+    """
+
+    def __init__(self, limit: int):
+        """
+        Args:
+            limit (int): Maximum number of conversions in flight.
+        """
+        self.limit = max(limit, 1)
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._in_flight = 0
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Waits until fewer conversions than the limit are in flight,
+        then counts one in flight until the block exits, recording its latency.
+        Blocks must not be nested.
+        """
+        with self._released:
+            while self._in_flight >= self.limit:
+                self._released.wait()
+            self._in_flight += 1
+
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            latency = time.monotonic() - start
+            with self._released:
+                self._in_flight -= 1
+                self._released.notify_all()
+
+            self.record(latency)
+
+    def record(self, latency: float):
+        """Records a completed conversion.
+
+        Args:
+            latency (float): Time the conversion took in seconds.
+        """
+
+
+class AutoTuner(Slots):
+    """Tunes the number of concurrent conversions from their observed latency and throughput.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, initial: Optional[int] = None):
+        """
+        Args:
+            max_workers (Optional[int], optional): Maximum concurrency.
+                Defaults to `WORKERS_PER_CPU` per available CPU, at most `MAX_WORKERS`.
+            initial (Optional[int], optional): Concurrency to start at.
+                Defaults to the number of available CPUs.
+        """
+        self.cpus = cpu_limit()
+        if max_workers is None:
+            max_workers = min(self.cpus * WORKERS_PER_CPU, MAX_WORKERS)
+
+        self.max_workers = max(max_workers, 1)
+        super().__init__(min(initial or self.cpus, self.max_workers))
+        self.best = (self.limit, 0.0)
+        self._direction = 1
+        self._previous: Optional[float] = None
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._latency = 0.0
+
+    def record(self, latency: float):
+        """Records a completed conversion, adjusting the concurrency at the end of each window.
+
+        Args:
+            latency (float): Time the conversion took in seconds.
+        """
+        with self._lock:
+            self._count += 1
+            self._latency += latency
+            elapsed = time.monotonic() - self._window_start
+            if elapsed >= WINDOW_SECONDS and self._count >= MIN_SAMPLES:
+                self._adjust(elapsed)
+                self._released.notify_all()
+
+    def _adjust(self, elapsed: float):
+        throughput = self._count / elapsed
+        mean_latency = self._latency / self._count
+        if throughput > self.best[1]:
+            self.best = (self.limit, throughput)
+
+        if self._previous is not None and throughput < self._previous * (1 - TOLERANCE):
+            self._direction = -self._direction
+
+        limit = min(max(self.limit + self._direction, 1), self.max_workers)
+        if limit in (1, self.max_workers):
+            # NOTE: Turn around at the bounds so the search keeps probing.
+            self._direction = 1 if limit == 1 else -1
+
+        logger.debug(
+            f"concurrency {self.limit} -> {limit}: "
+            f"{throughput:.1f} conversions/s, {mean_latency * 1000:.1f} ms mean latency"
+        )
+        self.limit = limit
+        self._previous = throughput
+        self._window_start = time.monotonic()
+        self._count = 0
+        self._latency = 0.0
+
+    def print_summary(self):
+        """Prints the chosen concurrency."""
+        (best, throughput) = self.best
+        if throughput == 0:
+            print(
+                f"auto-tuned concurrency: {self.limit}, too few conversions to tune "
+                f"({self.cpus} CPUs available, at most {self.max_workers})"
+            )
+            return
+
+        print(
+            f"auto-tuned concurrency: {self.limit} (best {best} at {throughput:.1f} conversions/s, "
+            f"{self.cpus} CPUs available, at most {self.max_workers})"
+        )
@@ -0,0 +1,367 @@
+"""
+Verifies converted projects against the schema of their version.
+
+# Schemas
+Schemas are described with plain Python values and compiled into validators once.
++ A type matches values of that type. `int` does not match `bool`.
++ A tuple matches any of its members.
++ A single element list matches a list whose items all match the element.
++ A `MapOf` matches an object whose values all match its schema.
++ A dict matches an object with the given keys.
+    Keys whose schema is `MISSING` or includes it may be absent.
+    Keys whose schema is `ABSENT` must be absent.
+    Other keys are allowed.
+"""
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator
+
+from . import paths, common
+from .context import ConversionContext
+
+logger = logging.getLogger(__name__)
+
+Validator = Callable[[Any, str], list[str]]
+
+CHUNK_SIZE = 64
+
+
+class MapOf:
+    """Object with arbitrary keys whose values match a schema."""
+
+    def __init__(self, schema: Any):
+        self.schema = schema
+
+
+MISSING = object()
+ABSENT = object()
+
+
+def compile_schema(schema: Any) -> Validator:
+    """Compiles a schema into a validator.
+
+    Args:
+        schema (Any): Schema to compile.
+
+    Returns:
+        Validator: Function taking a value and its location,
+            returning a list of errors.
+    """
+    if schema is ABSENT:
+        return lambda value, at: [f"{at}: should not exist"]
+
+    if isinstance(schema, type):
+        name = schema.__name__
+        if schema is int:
+            matches = lambda value: isinstance(value, int) and not isinstance(value, bool)
+        elif schema is float:
+            matches = lambda value: isinstance(value, (int, float)) and not isinstance(value, bool)
+        else:
+            matches = lambda value: isinstance(value, schema)
+
+        return lambda value, at: [] if matches(value) else [
+            f"{at}: expected `{name}`, found `{type(value).__name__}`"
+        ]
+
+    if isinstance(schema, tuple):
+        options = [compile_schema(option) for option in schema if option is not MISSING]
+
+        def validate_any(value: Any, at: str) -> list[str]:
+            errors = []
+            for option in options:
+                option_errors = option(value, at)
+                if len(option_errors) == 0:
+                    return []
+
+                errors += option_errors
+
+            return errors
+
+        return validate_any
+
+    if isinstance(schema, list):
+        if len(schema) != 1:
+            raise ValueError("list schemas must have exactly one element")
+
+        validate_item = compile_schema(schema[0])
+
+        def validate_list(value: Any, at: str) -> list[str]:
+            if not isinstance(value, list):
+                return [f"{at}: expected list, found `{type(value).__name__}`"]
+
+            errors = []
+            for (idx, item) in enumerate(value):
+                errors += validate_item(item, f"{at}[{idx}]")
+
+            return errors
+
+        return validate_list
+
+    if isinstance(schema, MapOf):
+        validate_value = compile_schema(schema.schema)
+
+        def validate_map(value: Any, at: str) -> list[str]:
+            if not isinstance(value, dict):
+                return [f"{at}: expected object, found `{type(value).__name__}`"]
+
+            errors = []
+            for (key, item) in value.items():
+                errors += validate_value(item, f"{at}.{key}")
+
+            return errors
+
+        return validate_map
+
+    if isinstance(schema, dict):
+        required = []
+        optional = []
+        forbidden = []
+        for (key, key_schema) in schema.items():
+            if key_schema is ABSENT:
+                forbidden.append(key)
+            elif key_schema is MISSING or (isinstance(key_schema, tuple) and MISSING in key_schema):
+                optional.append((key, compile_schema(key_schema)))
+            else:
+                required.append((key, compile_schema(key_schema)))
+
+        def validate_object(value: Any, at: str) -> list[str]:
+            if not isinstance(value, dict):
+                return [f"{at}: expected object, found `{type(value).__name__}`"]
+
+            errors = []
+            for (key, validate_key) in required:
+                if key not in value:
+                    errors.append(f"{at}.{key}: missing")
+                else:
+                    errors += validate_key(value[key], f"{at}.{key}")
+
+            for (key, validate_key) in optional:
+                if key in value:
+                    errors += validate_key(value[key], f"{at}.{key}")
+
+            for key in forbidden:
+                if key in value:
+                    errors.append(f"{at}.{key}: should not exist")
+
+            return errors
+
+        return validate_object
+
+    if schema is object:
+        return lambda value, at: []
+
+    raise TypeError(f"invalid schema `{schema}`")
+
+
+NULL = type(None)
+OPTIONAL_STR = (str, NULL)
+
+SCHEMAS_0_11_0 = {
+    paths.PROJECT_PROPERTIES_FILE: {
+        "rid": str,
+        "name": str,
+        "description": (str, NULL, MISSING),
+        "data_root": (str, NULL, MISSING),
+        "analysis_root": (str, NULL, MISSING),
+        "meta_level": (int, MISSING),
+        "created": ABSENT,
+        "creator": ABSENT,
+    },
+    paths.PROJECT_SETTINGS_FILE: {
+        "local_format_version": str,
+        "created": str,
+        "creator": object,
+        "permissions": MapOf(object),
+    },
+    paths.PROJECT_ANALYSES_FILE: [
+        {
+            "type": str,
+            "rid": str,
+            "path": str,
+        }
+    ],
+    paths.CONTAINER_PROPERTIES_FILE: {
+        "rid": str,
+        "properties": {
+            "name": OPTIONAL_STR,
+            "kind": (str, NULL, MISSING),
+            "description": (str, NULL, MISSING),
+            "tags": [str],
+            "metadata": MapOf(object),
+            "created": ABSENT,
+            "creator": ABSENT,
+        },
+        "analyses": [
+            {
+                "analysis": str,
+                "autorun": bool,
+                "priority": int,
+                "script": ABSENT,
+            }
+        ],
+        "scripts": ABSENT,
+    },
+    paths.CONTAINER_SETTINGS_FILE: {
+        "created": (str, NULL),
+        "creator": object,
+        "permissions": MapOf(object),
+    },
+    paths.ASSETS_FILE: [
+        {
+            "rid": str,
+            "properties": {
+                "name": (str, NULL, MISSING),
+                "kind": (str, NULL, MISSING),
+                "description": (str, NULL, MISSING),
+                "tags": ([str], MISSING),
+                "metadata": (MapOf(object), MISSING),
+            },
+            "path": str,
+        }
+    ],
+}
+
+VALIDATORS = {
+    "0.11.0": {file: compile_schema(schema) for (file, schema) in SCHEMAS_0_11_0.items()},
+}
+
+
+def verify_file(path: str, version: str = "0.11.0") -> tuple[str, list[str]]:
+    """Verifies a single file.
+    The kind of file is determined from its name.
+
+    Args:
+        path (str): Path to the file.
+        version (str, optional): Version to verify against. Defaults to "0.11.0".
+
+    Returns:
+        tuple[str, list[str]]: The path and its errors.
+    """
+    (_, errors) = load_and_verify(path, version)
+    return (path, errors)
+
+
+def load_and_verify(path: str, version: str) -> tuple[Any, list[str]]:
+    """Loads and verifies a single file.
+
+    Args:
+        path (str): Path to the file.
+        version (str): Version to verify against.
+
+    Returns:
+        tuple[Any, list[str]]: The file's document, `None` if it could not be read,
+            and its errors.
+    """
+    validate = VALIDATORS[version][os.path.basename(path)]
+    try:
+        document = common.load_json(path)
+    except FileNotFoundError:
+        return (None, ["missing"])
+    except (OSError, ValueError) as err:
+        return (None, [f"could not read: {err}"])
+
+    return (document, validate(document, "$"))
+
+
+def project_files(project: str, data_root: str, ctx: ConversionContext) -> Iterator[str]:
+    """Lists the files of a project to verify, except for its properties file.
+
+    Args:
+        project (str): Path to the project's root.
+        data_root (str): Path to the project's data root.
+        ctx (ConversionContext): Conversion context.
+
+    Yields:
+        str: Paths of files to verify.
+    """
+    yield paths.project_settings_of(project)
+    yield paths.project_analyses_of(project)
+    for properties_path in ctx.find_files(data_root, paths.container_properties()):
+        container = os.path.dirname(os.path.dirname(properties_path))
+        yield properties_path
+        yield paths.container_settings_of(container)
+        yield paths.assets_of(container)
+
+
+def verify(
+    projects: list[str], version: str, ctx: ConversionContext
+) -> dict[str, dict[str, list[str]]]:
+    """Verifies projects against the schema of a version.
+    Files are verified in parallel using `ctx.jobs` processes,
+    or one per available CPU if concurrency is auto-tuned.
+
+    Args:
+        projects (list[str]): Paths to the projects.
+        version (str): Version to verify against.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        dict[str, dict[str, list[str]]]: Map from project to its files with errors.
+            Projects that pass have no entries.
+    """
+    if version not in VALIDATORS:
+        raise ValueError(f"verification is not available for `{version}`")
+
+    report: dict[str, dict[str, list[str]]] = {project: {} for project in projects}
+    owners: dict[str, str] = {}
+    files = []
+    for project in projects:
+        # NOTE: The project properties are needed to find the data root,
+        # so are verified here to only read them once.
+        properties_path = paths.project_properties_of(project)
+        (properties, errors) = load_and_verify(properties_path, version)
+        if len(errors) > 0:
+            report[project][properties_path] = errors
+            continue
+
+        if not properties.get("data_root"):
+            report[project][properties_path] = ["$.data_root: not set"]
+            continue
+
+        data_root = os.path.join(project, properties["data_root"])
+        for path in project_files(project, data_root, ctx):
+            owners[path] = project
+            files.append(path)
+
+    versions = [version] * len(files)
+    # NOTE: Verification is CPU bound, so is not tuned.
+    jobs = ctx.jobs if ctx.tuner is None else ctx.tuner.cpus
+    if jobs <= 1:
+        results = map(verify_file, files, versions)
+        for (path, errors) in results:
+            if len(errors) > 0:
+                report[owners[path]][path] = errors
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(verify_file, files, versions, chunksize=CHUNK_SIZE)
+            for (path, errors) in results:
+                if len(errors) > 0:
+                    report[owners[path]][path] = errors
+
+    return report
+
+
+def print_report(report: dict[str, dict[str, list[str]]]) -> bool:
+    """Prints a verification report.
+
+    Args:
+        report (dict[str, dict[str, list[str]]]): Report returned by `verify`.
+
+    Returns:
+        bool: If all projects passed.
+    """
+    passed = True
+    for (project, failures) in report.items():
+        if len(failures) == 0:
+            print(f"[PASS] {project}")
+            continue
+
+        passed = False
+        print(f"[FAIL] {project} ({len(failures)} files)")
+        for (path, errors) in failures.items():
+            print(f"    {path}")
+            for error in errors:
+                print(f"        {error}")
+
+    return passed
@@ -0,0 +1,266 @@
+"""
+Watches the project manifest and registered projects,
+converting projects to the final version as they appear.
+
+Uses `inotify` on Linux, falling back to polling on other systems.
+"""
+import os
+import ctypes
+import ctypes.util
+import logging
+import select
+import struct
+import time
+from typing import Optional
+
+from . import paths, common, convert_0_9_x, lock
+from .chain import VERSIONS, convert_chain
+from .context import ConversionContext
+
+logger = logging.getLogger(__name__)
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal `inotify` binding reporting which watched directories changed."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("could not find libc")
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "could not initialize inotify")
+
+        self._watches: dict[int, str] = {}
+        self._paths: dict[str, int] = {}
+
+    def add(self, path: str):
+        """Watch a directory. Does nothing if the directory is already watched.
+
+        Args:
+            path (str): Directory to watch.
+        """
+        if path in self._paths:
+            return
+
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            logger.info(f"could not watch `{path}`")
+            return
+
+        self._watches[wd] = path
+        self._paths[path] = wd
+
+    def read(self, timeout: float) -> set[str]:
+        """Wait for events.
+
+        Args:
+            timeout (float): Maximum time to wait in seconds.
+
+        Returns:
+            set[str]: Watched directories with events.
+        """
+        (ready, _, _) = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                buf = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+
+            offset = 0
+            while offset < len(buf):
+                (wd, mask, _, name_len) = EVENT_HEADER.unpack_from(buf, offset)
+                offset += EVENT_HEADER.size + name_len
+                path = self._watches.get(wd)
+                if path is None:
+                    continue
+
+                changed.add(path)
+                if mask & IN_IGNORED:
+                    del self._watches[wd]
+                    del self._paths[path]
+
+        return changed
+
+    def close(self):
+        os.close(self._fd)
+
+
+def project_signature(project_path: str) -> tuple:
+    """
+    Args:
+        project_path (str): Path to the project's root.
+
+    Returns:
+        tuple: Modification times of the files that determine a project's format version.
+    """
+    signature = []
+    for path in [
+        project_path,
+        paths.syre_dir_of(project_path),
+        paths.project_properties_of(project_path),
+        paths.project_settings_of(project_path),
+    ]:
+        try:
+            signature.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            signature.append(None)
+
+    return tuple(signature)
+
+
+def convert_if_stale(
+    project_path: str, initial: str, final: str, ctx: ConversionContext
+) -> bool:
+    """Converts a project to the final version if its format is older.
+
+    Args:
+        project_path (str): Path to the project's root.
+        initial (str): Oldest version to convert from.
+        final (str): Final version.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        bool: If the project was converted.
+    """
+    if not os.path.isdir(project_path):
+        logger.info(f"[{project_path}] project does not exist")
+        return False
+
+    version = common.project_format_version(project_path)
+    if version is None:
+        logger.warning(f"[{project_path}] could not determine project version")
+        return False
+
+    # NOTE: Projects without `.syre/project.json` are detected as `0.9.x`,
+    # including new projects whose files are still being written.
+    if version == "0.9.x" and not convert_0_9_x.is_project(project_path):
+        logger.info(f"[{project_path}] no `0.9.x` files found, waiting for the project to be written")
+        return False
+
+    version_idx = VERSIONS.index(version)
+    if version_idx < VERSIONS.index(initial) or version_idx >= VERSIONS.index(final):
+        return False
+
+    logger.info(f"[{project_path}] converting from `{version}` to `{final}`")
+    with lock.Lock(project_path, timeout=ctx.lock_timeout, system=ctx.system):
+        for convert in convert_chain(version, final):
+            convert(project_path, ctx)
+
+    return True
+
+
+def watched_projects(project: Optional[str], ctx: ConversionContext) -> list[str]:
+    """
+    Args:
+        project (Optional[str]): Single project to watch, or `None` to watch the manifest.
+        ctx (ConversionContext): Conversion context.
+
+    Returns:
+        list[str]: Paths of the projects to watch.
+    """
+    if project is not None:
+        return [project]
+
+    try:
+        # NOTE: Not `ctx.projects`, the manifest changes while watching.
+        return common.project_paths(ctx.project_manifest)
+    except (OSError, ValueError) as err:
+        logger.warning(f"could not read project manifest: {err}")
+        return []
+
+
+def watch(
+    initial: str,
+    final: str,
+    project: Optional[str] = None,
+    interval: float = 5.0,
+    ctx: Optional[ConversionContext] = None,
+):
+    """Watch projects and convert any that are in a stale format.
+    Runs until interrupted.
+
+    Args:
+        initial (str): Oldest version to convert from.
+        final (str): Final version.
+        project (Optional[str], optional): Only watch the given project,
+            otherwise watch all projects in the project manifest. Defaults to None.
+        interval (float, optional): Polling interval in seconds.
+            Also used as a periodic rescan when `inotify` is available. Defaults to 5.0.
+        ctx (Optional[ConversionContext], optional): Conversion context.
+            Defaults to a new context.
+    """
+    if ctx is None:
+        ctx = ConversionContext()
+
+    try:
+        inotify = Inotify()
+    except (OSError, AttributeError) as err:
+        logger.info(f"inotify unavailable ({err}), polling every {interval}s")
+        inotify = None
+
+    manifest_dir = None if project is not None else os.path.dirname(ctx.project_manifest)
+    signatures: dict[str, tuple] = {}
+    try:
+        while True:
+            projects = watched_projects(project, ctx)
+            for project_path in projects:
+                signature = project_signature(project_path)
+                if signatures.get(project_path) == signature:
+                    continue
+
+                try:
+                    convert_if_stale(project_path, initial, final, ctx)
+                except Exception:
+                    logger.exception(f"[{project_path}] conversion failed")
+
+                signatures[project_path] = project_signature(project_path)
+
+            for removed in set(signatures) - set(projects):
+                del signatures[removed]
+
+            if inotify is None:
+                time.sleep(interval)
+                continue
+
+            if manifest_dir is not None:
+                inotify.add(manifest_dir)
+            for project_path in projects:
+                if not os.path.isdir(project_path):
+                    # NOTE: Watch the parent to notice the project being created.
+                    parent = os.path.dirname(os.path.normpath(project_path))
+                    if os.path.isdir(parent):
+                        inotify.add(parent)
+                    continue
+
+                for path in [project_path, paths.syre_dir_of(project_path)]:
+                    if os.path.isdir(path):
+                        inotify.add(path)
+
+            changed = inotify.read(interval)
+            if changed:
+                # NOTE: Let writers finish before inspecting the project.
+                time.sleep(0.1)
+                inotify.read(0)
+    finally:
+        if inotify is not None:
+            inotify.close()
@@ -0,0 +1,103 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import json
+
+from syre_version_converter import pipeline
+from syre_version_converter.context import ConversionContext
+from syre_version_converter.failures import CONTAINER, PROJECT, Failures, load_retry
+
+
+def make_containers(root: str, names: list[str]) -> list[str]:
+    sources = []
+    for name in names:
+        syre_path = os.path.join(root, name, ".syre")
+        os.makedirs(syre_path)
+        source = os.path.join(syre_path, "container.json")
+        with open(source, "w") as f:
+            json.dump({"name": name}, f)
+
+        sources.append(source)
+
+    return sources
+
+
+def read_json(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def test_isolated_stages_drop_only_failed_containers():
+    errors = []
+    written = []
+
+    def transform(value: str) -> str:
+        if value == "b":
+            raise ValueError(value)
+        return value.upper()
+
+    stages = pipeline.isolated_stages(
+        lambda item: item.split("/")[0],
+        transform,
+        written.append,
+        container_of=lambda item: item.split("/")[0],
+        is_failed=lambda container: container == "c",
+        on_error=lambda container, err: errors.append((container, str(err))),
+    )
+    pipeline.run(["a/x", "b/x", "c/x", "d/x"], *stages)
+
+    assert written == ["A", "D"]
+    assert errors == [("b", "b")]
+
+
+def test_run_containers_records_failed_containers(tmp_path):
+    sources = make_containers(str(tmp_path), ["a", "b", "c"])
+    ctx = ConversionContext(config_dir=str(tmp_path), failures=Failures())
+
+    def transform(container: dict) -> dict:
+        if container["name"] == "b":
+            raise RuntimeError("corrupt")
+        return container
+
+    written = []
+    pipeline.run_containers(
+        sources,
+        read_json,
+        transform,
+        lambda container: written.append(container["name"]),
+        ctx,
+        version="0.10.2",
+    )
+
+    assert written == ["a", "c"]
+    assert [(unit["unit"], unit["path"], unit["version"]) for unit in ctx.failures.units] == [
+        (CONTAINER, str(tmp_path / "b"), "0.10.2")
+    ]
+    assert ctx.failures.failed(str(tmp_path / "b"))
+    assert not ctx.failures.failed(str(tmp_path / "a"))
+
+
+def test_retry_file_round_trip(tmp_path):
+    failures = Failures()
+    failures.record(PROJECT, "/projects/p", "0.10.0", KeyError("data_root"))
+    failures.record(CONTAINER, "/projects/q/data/c", "0.9.x", ValueError("bad"))
+    retry_file = str(tmp_path / "retry.json")
+
+    assert failures.write(retry_file, "0.11.0")
+    (final, units) = load_retry(retry_file)
+
+    assert final == "0.11.0"
+    assert units == failures.units
+    assert [(unit["unit"], unit["path"], unit["version"]) for unit in units] == [
+        (PROJECT, "/projects/p", "0.10.0"),
+        (CONTAINER, "/projects/q/data/c", "0.9.x"),
+    ]
+    assert units[1]["error"] == "ValueError: bad"
+
+
+def test_retry_file_not_written_without_failures(tmp_path):
+    retry_file = tmp_path / "retry.json"
+
+    assert not Failures().write(str(retry_file), "0.11.0")
+    assert not retry_file.exists()
@@ -0,0 +1,89 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import sys
+import json
+import time
+import socket
+import subprocess
+
+import pytest
+
+from syre_version_converter import lock
+
+
+def write_lock(base_path: str, owner: dict) -> str:
+    path = os.path.join(base_path, ".syre", lock.LOCK_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(owner, f)
+
+    return path
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_lock_is_exclusive_and_released(tmp_path):
+    with lock.Lock(str(tmp_path), timeout=1) as held:
+        path = held.path()
+        assert held.owner()["pid"] == os.getpid()
+        with pytest.raises(TimeoutError):
+            lock.Lock(str(tmp_path), timeout=0.2).acquire()
+
+    assert not os.path.exists(path)
+
+
+def test_lock_times_out_on_live_owner(tmp_path):
+    write_lock(str(tmp_path), {"host": socket.gethostname(), "pid": os.getpid(), "token": "other"})
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        lock.Lock(str(tmp_path), timeout=0.3).acquire()
+
+    assert time.monotonic() - start < 5
+    with open(os.path.join(tmp_path, ".syre", lock.LOCK_FILE), "r") as f:
+        assert json.load(f)["token"] == "other"
+
+
+def test_lock_breaks_lock_of_dead_process(tmp_path):
+    write_lock(str(tmp_path), {"host": socket.gethostname(), "pid": dead_pid(), "token": "dead"})
+
+    with lock.Lock(str(tmp_path), timeout=1) as held:
+        assert held.owner()["token"] != "dead"
+
+
+def test_lock_breaks_lock_not_refreshed(tmp_path):
+    path = write_lock(str(tmp_path), {"host": "elsewhere", "pid": 1, "token": "old"})
+    old = time.time() - 60
+    os.utime(path, (old, old))
+
+    with lock.Lock(str(tmp_path), timeout=1, stale_after=30) as held:
+        assert held.owner()["token"] != "old"
+
+
+def test_lock_removes_metadata_folder_it_created(tmp_path):
+    with pytest.raises(RuntimeError):
+        with lock.Lock(str(tmp_path), timeout=1):
+            assert os.path.isdir(tmp_path / ".syre")
+            raise RuntimeError
+
+    assert os.listdir(tmp_path) == []
+
+
+def test_lock_keeps_metadata_folder_written_to(tmp_path):
+    with lock.Lock(str(tmp_path), timeout=1):
+        (tmp_path / ".syre" / "project.json").write_text("{}")
+
+    assert os.listdir(tmp_path / ".syre") == ["project.json"]
+
+
+def test_lock_rejects_missing_folder(tmp_path):
+    with pytest.raises(NotADirectoryError):
+        lock.Lock(str(tmp_path / "missing"), timeout=1).acquire()
+
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,138 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import json
+
+from syre_version_converter import common, output_cache, pipeline
+from syre_version_converter.output_cache import OutputCache
+
+PROPERTIES = os.path.join(".syre", "container.json")
+
+
+def make_container(root: str, name: str, properties: dict) -> str:
+    path = os.path.join(root, name, PROPERTIES)
+    os.makedirs(os.path.dirname(path))
+    with open(path, "w") as f:
+        json.dump(properties, f)
+
+    return path
+
+
+def convert(cache: OutputCache, sources: list[str]) -> list[str]:
+    """Renames `scripts` to `analyses` through the cache.
+
+    Returns:
+        list[str]: Containers that were transformed rather than read from the cache.
+    """
+    transformed = []
+
+    def read(path: str) -> tuple[str, dict]:
+        return (path, common.load_json(path))
+
+    def load(path: str, contents: dict[str, bytes]) -> tuple[str, dict]:
+        return (path, common.parse_json(contents[PROPERTIES]))
+
+    def transform(item: tuple[str, dict]) -> dict[str, dict]:
+        (path, properties) = item
+        transformed.append(os.path.dirname(os.path.dirname(path)))
+        properties["analyses"] = properties.pop("scripts")
+        return {path: properties}
+
+    stages = cache.stages(
+        "0.10.1",
+        [PROPERTIES],
+        read,
+        load,
+        transform,
+        lambda path: os.path.dirname(os.path.dirname(path)),
+    )
+    pipeline.run(sources, *stages)
+    return transformed
+
+
+def test_identical_containers_hit(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    sources = [
+        make_container(str(tmp_path), name, {"name": "c", "scripts": {}}) for name in "abc"
+    ]
+
+    # NOTE: Converted one at a time, as the reader stage may look up
+    # the next container before the previous one is stored.
+    transformed = [container for source in sources for container in convert(cache, [source])]
+
+    assert transformed == [os.path.join(str(tmp_path), "a")]
+    assert (cache.hits, cache.misses) == (2, 1)
+    for source in sources:
+        assert common.load_json(source) == {"name": "c", "analyses": {}}
+
+
+def test_cache_is_shared_across_runs(tmp_path):
+    cache_root = str(tmp_path / "cache")
+    first = make_container(str(tmp_path), "a", {"scripts": {"s": 1}})
+    second = make_container(str(tmp_path), "b", {"scripts": {"s": 1}})
+    convert(OutputCache(cache_root), [first])
+
+    cache = OutputCache(cache_root)
+    assert convert(cache, [second]) == []
+    assert cache.hits == 1
+    assert common.load_json(second) == {"analyses": {"s": 1}}
+
+
+def test_different_containers_miss(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    sources = [
+        make_container(str(tmp_path), name, {"name": name, "scripts": {}}) for name in "ab"
+    ]
+
+    assert len(convert(cache, sources)) == 2
+    assert (cache.hits, cache.misses) == (0, 2)
+
+
+def test_large_containers_bypass(tmp_path, monkeypatch):
+    monkeypatch.setattr(output_cache, "MAX_ENTRY_BYTES", 8)
+    cache = OutputCache(str(tmp_path / "cache"))
+    sources = [make_container(str(tmp_path), name, {"scripts": {}}) for name in "ab"]
+
+    assert len(convert(cache, sources)) == 2
+    assert (cache.hits, cache.misses, cache.bypassed) == (0, 0, 2)
+
+
+def test_put_replacing_entry_keeps_size(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"))
+    cache.put("ab" * 32, {"container.json": "x" * 100})
+    size = cache._size
+    cache.put("ab" * 32, {"container.json": "x" * 10})
+
+    assert cache._size == size - 90
+    assert cache.get("ab" * 32) == {"container.json": "x" * 10}
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = OutputCache(str(tmp_path / "cache"), max_bytes=3500)
+    keys = [f"{idx:02d}" * 32 for idx in range(3)]
+    for (idx, key) in enumerate(keys):
+        cache.put(key, {"container.json": "x" * 1000})
+        os.utime(cache._path_of(key), (idx, idx))
+
+    # NOTE: Reading an entry marks it as used.
+    assert cache.get(keys[0]) is not None
+    cache.put("03" * 32, {"container.json": "x" * 1000})
+
+    assert cache.evicted == 1
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache._size <= cache.max_bytes * output_cache.LOW_WATER
+
+
+def test_evicts_on_open_when_over_size(tmp_path):
+    cache_root = str(tmp_path / "cache")
+    cache = OutputCache(cache_root)
+    for idx in range(4):
+        cache.put(f"{idx:02d}" * 32, {"container.json": "x" * 1000})
+
+    cache = OutputCache(cache_root, max_bytes=2500)
+
+    assert cache.evicted == 2
+    assert cache._size <= 2500
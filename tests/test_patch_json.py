@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import json
+
+from syre_version_converter import common
+from syre_version_converter.convert_0_10_0 import patch_relative_paths
+from syre_version_converter.convert_0_10_1 import SCRIPTS_KEY, patch_container_associations
+
+
+def test_patch_json_rejects_matches_at_other_depths():
+    buf = b'{"scripts": [], "name": "scripts", "child": {"scripts": 1}}'
+    patched = common.patch_json(buf, SCRIPTS_KEY, 1, lambda match: b'"analyses"' + match.group(1))
+
+    assert patched is None
+
+
+def test_patch_json_counts_replacements():
+    buf = b'[{"scripts": 1}, {"scripts" : 2}]'
+    patched = common.patch_json(buf, SCRIPTS_KEY, 2, lambda match: b'"analyses"' + match.group(1))
+
+    assert patched == (b'[{"analyses": 1}, {"analyses" : 2}]', 2)
+
+
+def test_patch_json_skips_matches_in_strings():
+    # NOTE: The key is `x "scripts`, so the match starts inside it.
+    buf = b'{"x \\"scripts": 1}'
+    patched = common.patch_json(buf, SCRIPTS_KEY, 1, lambda match: b'"analyses"' + match.group(1))
+
+    assert patched is None
+
+
+def test_patch_container_associations_renames_key_in_place():
+    properties = {
+        "rid": "c1",
+        "properties": {"name": "root", "metadata": {"note": "scripts"}},
+        "scripts": {"a1": {"autorun": True, "priority": 0}},
+        "parent": None,
+    }
+    buf = json.dumps(properties, indent=4).encode()
+
+    patched = patch_container_associations(buf)
+
+    assert patched == buf.replace(b'"scripts":', b'"analyses":')
+    expected = {
+        key if key != "scripts" else "analyses": value for (key, value) in properties.items()
+    }
+    assert list(json.loads(patched).items()) == list(expected.items())
+
+
+def test_patch_container_associations_loads_converted_and_nested():
+    assert patch_container_associations(b'{"analyses": {}}') is None
+    assert patch_container_associations(b'{"properties": {"scripts": {}}}') is None
+
+
+def test_patch_relative_paths_unwraps_enum():
+    assets = {
+        "a1": {"rid": "a1", "path": {"Relative": "data/f.txt"}, "name": None},
+        "a2": {"rid": "a2", "path": {"Relative": "g \"Relative\".txt"}},
+    }
+    buf = json.dumps(assets, indent=4).encode()
+
+    patched = patch_relative_paths(buf)
+
+    assert patched is not None
+    assert json.loads(patched) == {
+        "a1": {"rid": "a1", "path": "data/f.txt", "name": None},
+        "a2": {"rid": "a2", "path": 'g "Relative".txt'},
+    }
+
+
+def test_patch_relative_paths_loads_other_shapes():
+    buf = b'{"a1": {"path": {"Relative": "f.txt"}, "metadata": {"Relative": 1}}}'
+
+    assert patch_relative_paths(buf) is None
@@ -0,0 +1,106 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import time
+import threading
+
+import pytest
+
+from syre_version_converter import pipeline
+from syre_version_converter.tuning import Slots
+
+
+def test_run_passes_items_through_stages_in_order():
+    written = []
+    pipeline.run(range(100), lambda x: x + 1, lambda x: x * 2, written.append, queue_size=4)
+
+    assert written == [(x + 1) * 2 for x in range(100)]
+
+
+def test_run_runs_last_stage_in_calling_thread():
+    threads = set()
+    pipeline.run(range(10), lambda x: x, lambda _: threads.add(threading.current_thread()))
+
+    assert threads == {threading.current_thread()}
+
+
+def test_run_drops_items_a_stage_returns_none_for():
+    written = []
+    pipeline.run(
+        range(10),
+        lambda x: x if x % 2 == 0 else None,
+        lambda x: None if x == 4 else x,
+        written.append,
+    )
+
+    assert written == [0, 2, 6, 8]
+
+
+def test_run_requires_a_stage():
+    with pytest.raises(ValueError):
+        pipeline.run(range(10))
+
+
+@pytest.mark.parametrize("failing", [0, 1, 2])
+def test_run_reraises_first_stage_error(failing: int):
+    def stage(idx: int):
+        def apply(x: int) -> int:
+            if idx == failing and x == 50:
+                raise RuntimeError(f"stage {idx}")
+            return x
+
+        return apply
+
+    written = []
+    with pytest.raises(RuntimeError, match=f"stage {failing}"):
+        pipeline.run(
+            range(10_000),
+            stage(0),
+            stage(1),
+            lambda x: written.append(stage(2)(x)),
+            queue_size=2,
+        )
+
+    # NOTE: The source is not drained after the error.
+    assert len(written) < 10_000
+
+
+def test_run_reraises_source_error():
+    def source():
+        yield 1
+        raise KeyError("source")
+
+    written = []
+    with pytest.raises(KeyError, match="source"):
+        pipeline.run(source(), lambda x: x, written.append)
+
+    assert written in ([], [1])
+
+
+def test_slotted_stages_share_limit_across_pipelines():
+    slots = Slots(2)
+    lock = threading.Lock()
+    in_flight = 0
+    peak = 0
+
+    def stage(x: int) -> int:
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.001)
+        with lock:
+            in_flight -= 1
+        return x
+
+    def convert():
+        stages = [pipeline.slotted_stage(stage, slots) for _ in range(3)]
+        pipeline.run(range(20), *stages)
+
+    threads = [threading.Thread(target=convert) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert peak == 2
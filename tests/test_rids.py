@@ -0,0 +1,74 @@
+# SPDX-FileCopyrightText: 2024-present Brian Carlsen <carlsen.bri@gmail.com>
+#
+# SPDX-License-Identifier: MIT
+import os
+import datetime as dt
+from uuid import UUID, uuid5
+
+from syre_version_converter import rids
+from syre_version_converter.rids import ASSET, CONTAINER, Rids, from_epoch, parse_timestamp
+
+TIMESTAMP = dt.datetime(2024, 1, 1)
+
+
+def test_deterministic_rids_are_stable(tmp_path):
+    project = str(tmp_path / "project")
+    container = os.path.join(project, "data", "c")
+    first = Rids(deterministic=True, timestamp=TIMESTAMP)
+    second = Rids(deterministic=True, timestamp=TIMESTAMP)
+
+    assert first.project(project) == second.project(project + os.sep)
+    assert first.resource(CONTAINER, container) == second.resource(CONTAINER, container)
+    assert first.timestamp() == second.timestamp() == "2024-01-01T00:00:00Z"
+
+
+def test_deterministic_rids_differ_by_kind_and_path(tmp_path):
+    project = str(tmp_path / "project")
+    generator = Rids(deterministic=True, timestamp=TIMESTAMP)
+    generator.project(project)
+    container = os.path.join(project, "data", "c")
+
+    resources = {
+        generator.resource(CONTAINER, container),
+        generator.resource(ASSET, container),
+        generator.resource(CONTAINER, os.path.join(project, "data", "d")),
+    }
+    assert len(resources) == 3
+
+
+def test_deterministic_project_rids_differ_for_same_folder_name(tmp_path):
+    generator = Rids(deterministic=True, timestamp=TIMESTAMP)
+
+    assert generator.project(str(tmp_path / "a" / "project")) != generator.project(
+        str(tmp_path / "b" / "project")
+    )
+
+
+def test_deterministic_resource_rids_are_relative_to_project(tmp_path):
+    project = str(tmp_path / "project")
+    generator = Rids(deterministic=True, timestamp=TIMESTAMP)
+    project_rid = generator.project(project)
+
+    rid = generator.resource(CONTAINER, os.path.join(project, "data", "c"))
+
+    assert UUID(rid).version == 5
+    assert rid == str(uuid5(UUID(project_rid), f"{CONTAINER}:data/c"))
+
+
+def test_random_rids_differ(tmp_path):
+    generator = Rids()
+
+    assert generator.project(str(tmp_path)) != generator.project(str(tmp_path))
+    assert generator.resource(ASSET, str(tmp_path)) != generator.resource(ASSET, str(tmp_path))
+
+
+def test_source_date_epoch(monkeypatch):
+    monkeypatch.setenv(rids.SOURCE_DATE_EPOCH, "1704067200")
+
+    assert Rids(deterministic=True).run_timestamp == TIMESTAMP
+    assert from_epoch(1704067200) == TIMESTAMP
+
+
+def test_parse_timestamp_converts_to_utc():
+    assert parse_timestamp("2024-01-01T00:00:00Z") == TIMESTAMP
+    assert parse_timestamp("2024-01-01T02:00:00+02:00") == TIMESTAMP